@@ -1,5 +1,6 @@
 import streamlit as st
-from db import get_teams_for_display, get_season_points, show_sidebar_navigation
+from db import get_teams_for_display, get_season_points, get_recent_games
+from navigation import show_sidebar_navigation
 
 st.set_page_config(
     page_title="Mリーグダッシュボード",
@@ -106,5 +107,26 @@ if not season_df.empty:
 else:
     st.info("シーズンデータがありません")
 
+st.markdown("---")
+
+# 最新の対局結果（全シーズンの新しい順）
+st.subheader("🆕 最新の対局結果")
+
+recent_games = get_recent_games(limit=5)
+if not recent_games.empty:
+    st.dataframe(
+        recent_games[["game_date", "table_type", "game_number", "results"]],
+        column_config={
+            "game_date": "対局日",
+            "table_type": "卓区分",
+            "game_number": "対局番号",
+            "results": "結果（順位順）"
+        },
+        hide_index=True,
+        width='stretch'
+    )
+else:
+    st.info("対局記録がありません")
+
 st.markdown("---")
 st.caption("※ データはサンプルです。実際のMリーグ公式記録とは異なる場合があります。")
@@ -0,0 +1,420 @@
+#!/usr/bin/env python3
+"""
+ベンチマーク
+db.py のデータ取得関数（get_*）と分析処理（レーティング遡及計算・連続記録・直対行列・
+座席／試合番号別の集計）を、規模の異なる合成データベースで計測し、基準値と比較します
+
+使い方:
+    python benchmark.py                        # small・medium で計測し、基準値と比較
+    python benchmark.py --sizes small medium large
+    python benchmark.py --only pair streak     # 名前にいずれかを含む計測項目のみ
+    python benchmark.py --update-baseline      # 計測結果を基準値として保存
+    python benchmark.py --threshold 0.5        # 時間が基準値より 50% 以上悪化したら回帰とみなす
+
+計測項目ごとに
+- 時間: --repeat 回以上（短い処理は合計0.2秒になるまで）実行した最小値
+  （秒。実行中はガベージコレクションを止める）
+- メモリ: tracemalloc で計測した Python 側のピークメモリ（KB。SQLite 内部の確保分は含まない）
+- クエリ数: sqlite3 の set_trace_callback で数えた実行 SQL 文の数（トリガー内の文は含まない）
+を記録します。時間が基準値の (1 + --threshold) 倍、メモリが (1 + --memory-threshold) 倍を
+超えた場合と、クエリ数が基準値より増えた場合を回帰として表示し、終了コード 1 を返します。
+時間は実行環境と負荷で大きく揺れるため、しきい値を緩く（既定で2倍）しています。
+別のマシンで比較する場合は、先に変更前のコードで基準値を取り直してください。
+
+合成データベースは generate_league.py で data/benchmark/<規模>.db に生成し、次回以降は
+再利用します（規模の設定を変えた場合は --regenerate で作り直します）。
+"""
+
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import sys
+import time
+import tracemalloc
+import unicodedata
+from collections import namedtuple
+
+import db
+import generate_league
+
+BENCH_DIR = "data/benchmark"
+BASELINE_PATH = "benchmark_baseline.json"
+
+# 規模ごとの generate_league.py の引数（シードは固定）
+BENCH_SEED = 1
+SIZES = {
+    "small": [],
+    "medium": ["--seasons", "10", "--teams", "16", "--tables-per-day", "2", "--days", "120"],
+    "large": ["--seasons", "13", "--teams", "40", "--tables-per-day", "10", "--days", "120"],
+}
+DEFAULT_SIZES = ["small", "medium"]
+
+# 回帰とみなす悪化の割合（時間は計測のぶれが大きいため、メモリより緩くする）
+DEFAULT_THRESHOLD = 1.0
+DEFAULT_MEMORY_THRESHOLD = 0.2
+# 短い処理は合計でこの秒数になるまで（最大 MAX_REPEAT 回）繰り返し、最小値を取る
+MIN_CASE_SECONDS = 0.2
+MAX_REPEAT = 100
+# これより短い時間差は回帰とみなさない（秒。計測のぶれ）
+MIN_TIME_DIFF = 0.01
+# これより小さいメモリ差は回帰とみなさない（KB）
+MIN_MEMORY_DIFF = 64
+
+# 回帰の表示書式
+METRIC_FORMATS = {"time": "{:.4f}s", "peak_kb": "{:,}KB", "queries": "{:,}文"}
+
+# 計測項目: name は「関数名[引数の説明]」、writes はデータベースを書き換える処理
+# （実行のたびに元のデータベースの複製に対して実行する）
+Case = namedtuple("Case", ["name", "run", "writes"], defaults=[False])
+
+
+# ========== 計測項目 ==========
+
+def sample_context(conn):
+    """計測に使う代表値（最新シーズン・対局数の多いチームと選手・最新の対局）と分析の入力データ"""
+    cursor = conn.cursor()
+    cursor.execute("SELECT MAX(season) FROM game_results")
+    season = cursor.fetchone()[0]
+    cursor.execute("""
+        SELECT pt.team_id
+        FROM game_results gr
+        JOIN player_teams pt ON gr.player_id = pt.player_id AND gr.season = pt.season
+        WHERE gr.season = ?
+        GROUP BY pt.team_id
+        ORDER BY COUNT(*) DESC, pt.team_id
+        LIMIT 1
+    """, (season,))
+    team_id = cursor.fetchone()[0]
+    cursor.execute("""
+        SELECT player_id FROM game_results
+        GROUP BY player_id
+        ORDER BY COUNT(*) DESC, player_id
+        LIMIT 1
+    """)
+    player_id = cursor.fetchone()[0]
+    cursor.execute("""
+        SELECT season, game_date, table_type, game_number FROM game_results
+        ORDER BY game_date DESC, game_number DESC
+        LIMIT 1
+    """)
+    game = cursor.fetchone()
+
+    records = db.get_game_records(conn=conn)
+    player_matrix = db.get_pair_matrix("player")
+    top_players = records.groupby("player_id").size().nlargest(20).index.tolist()
+    return {
+        "season": season,
+        "team_id": team_id,
+        "player_id": player_id,
+        "game": game,
+        "records": records,
+        "player_matrix": player_matrix,
+        "top_players": top_players,
+    }
+
+
+GETTER_CASES = [
+    Case("get_teams", lambda c: db.get_teams()),
+    Case("get_team_colors", lambda c: db.get_team_colors()),
+    Case("get_team_name", lambda c: db.get_team_name(c["team_id"], c["season"])),
+    Case("get_current_team_name", lambda c: db.get_current_team_name(c["team_id"])),
+    Case("get_team_names_for_season", lambda c: db.get_team_names_for_season(c["season"])),
+    Case("get_all_team_names", lambda c: db.get_all_team_names()),
+    Case("get_season_points", lambda c: db.get_season_points()),
+    Case("get_seasons", lambda c: db.get_seasons()),
+    Case("get_season_data", lambda c: db.get_season_data(c["season"])),
+    Case("get_cumulative_points", lambda c: db.get_cumulative_points()),
+    Case("get_team_history", lambda c: db.get_team_history(c["team_id"])),
+    Case("get_teams_for_display", lambda c: db.get_teams_for_display()),
+    Case("get_players", lambda c: db.get_players()),
+    Case("get_player", lambda c: db.get_player(c["player_id"])),
+    Case("get_player_teams", lambda c: db.get_player_teams(c["player_id"])),
+    Case("get_player_current_team", lambda c: db.get_player_current_team(c["player_id"])),
+    Case("get_player_season_stats", lambda c: db.get_player_season_stats(c["player_id"])),
+    Case("get_all_player_stats_for_season", lambda c: db.get_all_player_stats_for_season(c["season"])),
+    Case("get_players_by_team", lambda c: db.get_players_by_team(c["team_id"], c["season"])),
+    Case("get_player_seasons", lambda c: db.get_player_seasons()),
+    Case("get_player_season_ranking", lambda c: db.get_player_season_ranking(c["season"])),
+    Case("get_player_cumulative_stats", lambda c: db.get_player_cumulative_stats()),
+    Case("get_player_history", lambda c: db.get_player_history(c["player_id"])),
+    Case("get_player_all_stats", lambda c: db.get_player_all_stats()),
+    Case("get_player_ratings", lambda c: db.get_player_ratings()),
+    Case("get_player_rating_history", lambda c: db.get_player_rating_history(c["player_id"])),
+    Case("get_pair_entities[player]", lambda c: db.get_pair_entities("player")),
+    Case("get_pair_stats[player,season]", lambda c: db.get_pair_stats("player", c["season"])),
+    Case("get_pair_stats[team,all]", lambda c: db.get_pair_stats("team")),
+    Case("get_season_partials[all]", lambda c: db.get_season_partials()),
+    Case("get_journal_seq", lambda c: db.get_journal_seq()),
+    Case("get_table_versions[game_results]", lambda c: db.get_table_versions("game_results")),
+    Case("get_subscriber_seq", lambda c: db.get_subscriber_seq("benchmark")),
+    Case("get_game_durations[all]", lambda c: db.get_game_durations()),
+    Case("get_game_detail", lambda c: db.get_game_detail(*c["game"])),
+    Case("get_recent_games", lambda c: db.get_recent_games()),
+    Case("get_game_records[all]", lambda c: db.get_game_records()),
+    Case("search_games[season]", lambda c: db.search_games(c["season"])),
+    Case("search_games[season,player]", lambda c: db.search_games(c["season"], player_id=c["player_id"])),
+]
+
+KERNEL_CASES = [
+    # レーティング
+    Case("initialize_ratings_from_games", lambda c: db.initialize_ratings_from_games(), writes=True),
+    # 連続記録
+    Case("compute_streaks[player,1位]",
+         lambda c: db.compute_streaks(c["records"], ["player_id", "player_name"], lambda rank: rank == 1)),
+    Case("compute_streaks[team,連対]",
+         lambda c: db.compute_streaks(c["records"], ["team_id", "team_name"], lambda rank: rank <= 2)),
+    # 直対行列
+    Case("get_pair_matrix[player]", lambda c: db.get_pair_matrix("player")),
+    Case("get_pair_matrix[team]", lambda c: db.get_pair_matrix("team")),
+    Case("pair_matrix_submatrix[top20]",
+         lambda c: db.pair_matrix_submatrix(c["player_matrix"], c["top_players"])),
+    # 座席・試合番号別
+    Case("get_cube_rollup[seat,team]", lambda c: db.get_cube_rollup(["seat_name", "team_id"], season=c["season"])),
+    Case("get_cube_rollup[game_number,player]", lambda c: db.get_cube_rollup(["game_number", "player_id"])),
+    Case("merge_partials[seat]", lambda c: db.merge_partials(db.get_season_partials(), ["seat_name"])),
+    Case("compute_group_breakdown[game_number,player]",
+         lambda c: db.compute_group_breakdown(c["records"], "game_number", ["player_id", "player_name"])),
+    Case("compute_group_breakdown[seat,team]",
+         lambda c: db.compute_group_breakdown(c["records"], "seat_name", ["team_id", "team_name"])),
+]
+
+CASES = GETTER_CASES + KERNEL_CASES
+
+
+def uncovered_getters():
+    """計測項目に含まれていない db.py の get_* 関数"""
+    covered = {case.name.split("[")[0] for case in CASES}
+    return sorted(
+        name for name in dir(db)
+        if name.startswith("get_") and callable(getattr(db, name))
+        and name != "get_connection" and name not in covered
+    )
+
+
+# ========== 計測 ==========
+
+@contextlib.contextmanager
+def count_queries():
+    """db.get_connection で開いた接続で実行された SQL 文を数える"""
+    counter = {"queries": 0}
+    original = db.get_connection
+
+    def trace(statement):
+        if not statement.startswith("--"):  # トリガー内の文
+            counter["queries"] += 1
+
+    def traced_connection():
+        conn = original()
+        conn.set_trace_callback(trace)
+        return conn
+
+    db.get_connection = traced_connection
+    try:
+        yield counter
+    finally:
+        db.get_connection = original
+
+
+@contextlib.contextmanager
+def scratch_database(enabled):
+    """書き換えを伴う計測では、元のデータベースの複製に接続先を切り替える"""
+    if not enabled:
+        yield
+        return
+    original = db.DB_PATH
+    scratch = f"{original}.scratch"
+    shutil.copyfile(original, scratch)
+    db.DB_PATH = scratch
+    try:
+        yield
+    finally:
+        db.DB_PATH = original
+        os.remove(scratch)
+
+
+def _timed(run, ctx):
+    """1回実行した時間（timeit と同じく、実行中はガベージコレクションを止める）"""
+    gc.collect()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        run(ctx)
+        return time.perf_counter() - start
+    finally:
+        gc.enable()
+
+
+def run_case(case, ctx, repeat):
+    """1項目を計測して {"time", "peak_kb", "queries"} を返す"""
+    times = []
+    while len(times) < repeat or (sum(times) < MIN_CASE_SECONDS and len(times) < MAX_REPEAT):
+        db.clear_season_partials()
+        with scratch_database(case.writes):
+            times.append(_timed(case.run, ctx))
+
+    # メモリとクエリ数は計測の影響で時間が延びるため、別に1回実行する
+    db.clear_season_partials()
+    with scratch_database(case.writes), count_queries() as counter:
+        tracemalloc.start()
+        case.run(ctx)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    return {"time": min(times), "peak_kb": peak // 1024, "queries": counter["queries"]}
+
+
+def prepare_database(size, regenerate):
+    """規模に対応する合成データベースを用意（なければ generate_league.py で生成）"""
+    path = os.path.join(BENCH_DIR, f"{size}.db")
+    if os.path.exists(path) and not regenerate:
+        return path
+
+    print(f"🎲 {size} のデータベースを生成中...")
+    args = generate_league.parse_args(["--db", path, "--seed", str(BENCH_SEED)] + SIZES[size])
+    if os.path.exists(path):
+        os.remove(path)
+    os.makedirs(BENCH_DIR, exist_ok=True)
+    with contextlib.redirect_stdout(io.StringIO()):
+        total_rows, _, elapsed = generate_league.generate(args)
+    print(f"   半荘記録 {total_rows:,}行（{elapsed:.1f}秒）")
+    return path
+
+
+def run_size(size, cases, repeat, regenerate):
+    """1規模分の全項目を計測"""
+    db.DB_PATH = prepare_database(size, regenerate)
+    conn = sqlite3.connect(db.DB_PATH)
+    rows = conn.execute("SELECT COUNT(*) FROM game_results").fetchone()[0]
+    ctx = sample_context(conn)
+    conn.close()
+
+    print(f"\n📏 {size}（半荘記録 {rows:,}行）")
+    results = {}
+    for case in cases:
+        results[case.name] = result = run_case(case, ctx, repeat)
+        print(f"  {_pad(case.name, 46)} {result['time']:9.4f}s {result['peak_kb']:9,}KB {result['queries']:8,}文")
+    return {"rows": rows, "cases": results}
+
+
+# ========== 基準値との比較 ==========
+
+def _pad(text, width):
+    """全角文字を2桁として width 桁に左詰め"""
+    used = sum(2 if unicodedata.east_asian_width(c) in "WF" else 1 for c in text)
+    return text + " " * max(width - used, 0)
+
+
+def find_regressions(current, baseline, threshold, memory_threshold):
+    """
+    基準値と比べて悪化した項目を列挙
+    Args:
+        threshold: 時間の悪化の割合のしきい値
+        memory_threshold: ピークメモリの悪化の割合のしきい値
+    Returns:
+        [(規模, 項目名, 指標, 基準値, 今回の値)]
+    """
+    regressions = []
+    for size, measured in current.items():
+        base_cases = baseline.get(size, {}).get("cases", {})
+        for name, result in measured["cases"].items():
+            base = base_cases.get(name)
+            if base is None:
+                continue
+            if (result["time"] > base["time"] * (1 + threshold)
+                    and result["time"] - base["time"] > MIN_TIME_DIFF):
+                regressions.append((size, name, "time", base["time"], result["time"]))
+            if (result["peak_kb"] > base["peak_kb"] * (1 + memory_threshold)
+                    and result["peak_kb"] - base["peak_kb"] > MIN_MEMORY_DIFF):
+                regressions.append((size, name, "peak_kb", base["peak_kb"], result["peak_kb"]))
+            if result["queries"] > base["queries"]:
+                regressions.append((size, name, "queries", base["queries"], result["queries"]))
+    return regressions
+
+
+def load_baseline(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_baseline(path, current, previous):
+    """計測した規模の結果で基準値を更新（計測しなかった規模は残す）"""
+    sizes = dict(previous["sizes"]) if previous else {}
+    sizes.update(current)
+    baseline = {
+        "environment": {
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+        },
+        "sizes": sizes,
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(baseline, f, ensure_ascii=False, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="db.py の取得関数と分析処理のベンチマーク")
+    parser.add_argument("--sizes", nargs="+", choices=list(SIZES), default=DEFAULT_SIZES, help="計測する規模")
+    parser.add_argument("--only", nargs="+", help="名前にいずれかの文字列を含む項目のみ計測")
+    parser.add_argument("--repeat", type=int, default=5, help="時間の最低計測回数（最小値を記録）")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="回帰とみなす時間の悪化の割合（1.0 = 2倍）")
+    parser.add_argument("--memory-threshold", type=float, default=DEFAULT_MEMORY_THRESHOLD,
+                        help="回帰とみなすピークメモリの悪化の割合（0.2 = 20%%）")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="基準値の JSON ファイル")
+    parser.add_argument("--update-baseline", action="store_true", help="計測結果を基準値として保存")
+    parser.add_argument("--regenerate", action="store_true", help="合成データベースを作り直す")
+    args = parser.parse_args()
+
+    cases = CASES
+    if args.only:
+        cases = [case for case in CASES if any(word in case.name for word in args.only)]
+        if not cases:
+            parser.error("--only に一致する計測項目がありません")
+
+    print("=" * 60)
+    print(f"⏱️ ベンチマーク（{', '.join(args.sizes)} / {len(cases)}項目 / {args.repeat}回以上計測の最小値）")
+    print("=" * 60)
+    missing = uncovered_getters()
+    if missing:
+        print(f"⚠️ 計測項目に含まれていない取得関数: {', '.join(missing)}")
+
+    current = {size: run_size(size, cases, args.repeat, args.regenerate) for size in args.sizes}
+
+    baseline = load_baseline(args.baseline)
+    if args.update_baseline:
+        save_baseline(args.baseline, current, baseline)
+        print(f"\n💾 基準値を保存しました: {args.baseline}")
+        return
+
+    if baseline is None:
+        print(f"\nℹ️ 基準値 {args.baseline} がありません（--update-baseline で作成）")
+        return
+
+    regressions = find_regressions(current, baseline["sizes"], args.threshold, args.memory_threshold)
+    thresholds = f"しきい値 時間 +{args.threshold:.0%} / メモリ +{args.memory_threshold:.0%}"
+    print("\n" + "=" * 60)
+    if not regressions:
+        print(f"✅ 回帰はありません（{thresholds}）")
+        return
+
+    print(f"❌ 基準値からの回帰: {len(regressions)}件（{thresholds}）")
+    for size, name, metric, base, value in regressions:
+        unit = METRIC_FORMATS[metric]
+        print(f"  {size:7} {_pad(name, 46)} {unit.format(base):>12} → {unit.format(value)}")
+    if any(metric == "time" for _, _, metric, _, _ in regressions):
+        print("\nℹ️ 時間は負荷で揺れるため、--only で該当の項目を再計測して確認してください")
+    sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+グラフ生成モジュール
+
+ランキング画面など複数ページで共通の Plotly 図を組み立てる。
+行ごとにトレースを追加せず、1本のトレースに色・テキスト・ホバー情報を配列で渡すことで、
+棒の本数が増えても図の JSON が大きくならないようにする。
+図は描画対象のデータごとにキャッシュする。
+Plotly は図を作るときに読み込む（グラフを描かない画面・タブの起動を遅くしないため）。
+"""
+
+import streamlit as st
+
+# 色が未設定の場合の棒の色
+DEFAULT_BAR_COLOR = "#888888"
+
+
+def _hover_template(hover):
+    """ホバー表示のテンプレート（customdata の列順は hover の順）"""
+    lines = ["<b>%{y}</b>"]
+    for i, (label, _, fmt) in enumerate(hover):
+        value = f"%{{customdata[{i}]{':' + fmt if fmt else ''}}}"
+        lines.append(f"{label}: {value}" if label else value)
+    return "<br>".join(lines) + "<extra></extra>"
+
+
+@st.cache_data(show_spinner=False)
+def ranking_bar_chart(df, label_col, value_col, title, xaxis_title,
+                      color_col=None, color=DEFAULT_BAR_COLOR, hover=(),
+                      height=400, margin_left=20):
+    """
+    ランキングの横棒グラフ（1トレース）
+    Args:
+        df: 表示する行（下から順に描画されるため、昇順に並べて渡す）
+        label_col: 棒のラベル（y軸）の列
+        value_col: 棒の長さ（x軸）の列。棒の外側に符号付きで表示する
+        color_col: 棒ごとの色の列（未設定の行は color）
+        color: color_col がない場合の全体の色
+        hover: ホバーに表示する (ラベル, 列, 書式) のタプル列。ラベルが None なら値のみ表示
+    """
+    import plotly.graph_objects as go
+
+    if color_col is not None:
+        colors = df[color_col].fillna(color).tolist()
+    else:
+        colors = color
+
+    customdata = df[[column for _, column, _ in hover]].to_numpy() if hover else None
+
+    fig = go.Figure(go.Bar(
+        y=df[label_col],
+        x=df[value_col],
+        orientation="h",
+        marker_color=colors,
+        texttemplate="%{x:+.1f}",
+        textposition="outside",
+        customdata=customdata,
+        hovertemplate=_hover_template(hover),
+        showlegend=False
+    ))
+
+    fig.update_layout(
+        title=title,
+        xaxis_title=xaxis_title,
+        yaxis_title="",
+        height=height,
+        margin=dict(l=margin_left, r=100, t=50, b=50),
+        xaxis=dict(zeroline=True, zerolinecolor="gray", zerolinewidth=2)
+    )
+    return fig
+
+
+# ========== 累積ポイント推移 ==========
+# 半荘ごとの累積ポイントを系列（チーム・選手）ごとに折れ線で描画する。
+# 点数が多くなるため SVG ではなく WebGL（Scattergl）で描画し、
+# 1系列あたり RACE_MAX_POINTS を超える長い履歴はサーバー側で間引いてから送る。
+
+# 推移グラフ1系列あたりの最大点数
+RACE_MAX_POINTS = 1000
+
+# 半荘の並び順（通算半荘番号の基準）
+RACE_ORDER = ["season", "game_date", "table_type", "game_number"]
+
+
+def cumulative_race(df, entity_col, value_col="points", entity_ids=None):
+    """
+    半荘ごとの累積ポイント推移
+    Args:
+        df: 半荘記録（1行 = 1人分。RACE_ORDER の列と entity_col, value_col を持つ）
+        entity_col: 系列の列（team_id / player_id など。同じ半荘の複数行は合算）
+        entity_ids: 対象の系列（None で全系列。通算半荘番号は全体から求める）
+    Returns:
+        DataFrame(entity_col, RACE_ORDER..., value_col, game_index, games, cumulative)
+        game_index はリーグ全体での通算半荘番号、games は系列ごとの対局数
+    """
+    race = df.groupby([entity_col] + RACE_ORDER, as_index=False)[value_col].sum()
+    race["game_index"] = race.groupby(RACE_ORDER).ngroup() + 1
+    if entity_ids is not None:
+        race = race[race[entity_col].isin(entity_ids)]
+
+    race = race.sort_values([entity_col, "game_index"], ignore_index=True)
+    by_entity = race.groupby(entity_col)
+    race["games"] = by_entity.cumcount() + 1
+    race["cumulative"] = by_entity[value_col].cumsum()
+    return race
+
+
+def downsample_race(race, entity_col, max_points=RACE_MAX_POINTS):
+    """
+    系列ごとに max_points 程度まで間引く（区間ごとの最小・最大と系列の始点・終点を残す）
+    山と谷を残すため、単純な間引きと違って推移の形が崩れない。
+    """
+    sizes = race.groupby(entity_col)[entity_col].transform("size")
+    position = race["games"] - 1
+    bucket = position * (max_points // 2) // sizes
+
+    by_bucket = race.groupby([race[entity_col], bucket])["cumulative"]
+    keep = (
+        (sizes <= max_points)
+        | (position == 0)
+        | (position == sizes - 1)
+        | race.index.isin(by_bucket.idxmin())
+        | race.index.isin(by_bucket.idxmax())
+    )
+    return race[keep]
+
+
+@st.cache_data(show_spinner=False)
+def cumulative_race_chart(df, entity_col, name_col, title, colors=None,
+                          entity_ids=None, max_points=RACE_MAX_POINTS, height=500):
+    """
+    半荘ごとの累積ポイント推移グラフ（Scattergl、系列ごとに1トレース）
+    Args:
+        name_col: 凡例に表示する名前の列（系列内で変わる場合は最新の名前）
+        colors: {系列ID: 色}（None で Plotly の既定色）
+    Returns:
+        (fig, 描画点数, 元の点数)
+    """
+    import plotly.graph_objects as go
+
+    race = cumulative_race(df, entity_col, entity_ids=entity_ids)
+    names = df.drop_duplicates(entity_col, keep="last").set_index(entity_col)[name_col]
+    plotted = downsample_race(race, entity_col, max_points)
+
+    # 最終的な累積ポイントの高い順に凡例を並べる
+    order = race.groupby(entity_col)["cumulative"].last().sort_values(ascending=False).index
+
+    fig = go.Figure()
+    series_by_entity = dict(tuple(plotted.groupby(entity_col)))
+    for entity_id in order:
+        series = series_by_entity[entity_id]
+        line = dict(width=2)
+        if colors and entity_id in colors:
+            line["color"] = colors[entity_id]
+        fig.add_trace(go.Scattergl(
+            x=series["game_index"],
+            y=series["cumulative"],
+            mode="lines",
+            name=names.get(entity_id, str(entity_id)),
+            line=line,
+            customdata=series[["game_date", "games"]].to_numpy(),
+            hovertemplate=(
+                "<b>%{fullData.name}</b><br>"
+                "%{customdata[0]}（%{customdata[1]}戦目）<br>"
+                "累積pt: %{y:+.1f}<extra></extra>"
+            )
+        ))
+
+    fig.update_layout(
+        title=title,
+        xaxis_title="通算半荘数",
+        yaxis_title="累積ポイント",
+        height=height,
+        hovermode="closest",
+        yaxis=dict(zeroline=True, zerolinecolor="gray", zerolinewidth=2)
+    )
+    return fig, len(plotted), len(race)
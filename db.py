@@ -5,8 +5,6 @@ def update_ratings_for_game(player_ids, ranks, season, game_date, game_number, c
     Elo式で全員分のΔR・新レートを一括計算・保存する共通関数。
     conn: 既存コネクションを使う場合は指定（なければ内部で開閉）
     """
-    import numpy as np
-    from collections import defaultdict
     close_conn = False
     if conn is None:
         conn = get_connection()
@@ -27,9 +25,9 @@ def update_ratings_for_game(player_ids, ranks, season, game_date, game_number, c
     win_probs = []
     for i in range(4):
         others = [ratings[j] for j in range(4) if j != i]
-        prob = np.mean([win_expect(ratings[i], r) for r in others])
+        prob = sum(win_expect(ratings[i], r) for r in others) / len(others)
         win_probs.append(prob)
-    expected_scores = [sum([p * s for p, s in zip(win_probs, np.roll(rank_scores, -i))]) for i in range(4)]
+    expected_scores = [sum([p * s for p, s in zip(win_probs, rank_scores[i:] + rank_scores[:i])]) for i in range(4)]
     mean_score = sum(expected_scores) / 4
     corrected_scores = [s - mean_score for s in expected_scores]
     # 実順位スコア（同順位平均対応）
@@ -73,50 +71,15 @@ def update_ratings_for_game(player_ids, ranks, season, game_date, game_number, c
     if close_conn:
         conn.commit()
         conn.close()
+import os
 import sqlite3
+from collections import defaultdict, namedtuple
+from functools import lru_cache
 import pandas as pd
-import streamlit as st
-
-DB_PATH = "data/mleague.db"
-
-
-def hide_default_sidebar_navigation():
-    """Streamlitのデフォルトサイドバーナビゲーションを非表示にする"""
-    st.markdown("""
-    <style>
-        [data-testid="stSidebarNav"] {
-            display: none;
-        }
-    </style>
-    """, unsafe_allow_html=True)
-
-def show_sidebar_navigation():
-    """共通のサイドバーナビゲーションを表示"""
-    # デフォルトのサイドバーナビゲーションを非表示
-    hide_default_sidebar_navigation()
-
-    st.sidebar.title("🀄 メニュー")
-    st.sidebar.page_link("app.py", label="🏠 トップページ")
-    st.sidebar.markdown("### 📊 チーム成績")
-    st.sidebar.page_link("pages/1_season_ranking.py", label="📊 年度別ランキング")
-    st.sidebar.page_link("pages/2_cumulative_ranking.py", label="🏆 累積ランキング")
-    st.sidebar.page_link("pages/10_team_game_analysis.py", label="📈 半荘別分析")
-    st.sidebar.markdown("### 👤 選手成績")
-    st.sidebar.page_link("pages/7_player_season_ranking.py", label="📊 年度別ランキング")
-    st.sidebar.page_link("pages/8_player_cumulative_ranking.py", label="🏆 累積ランキング")
-    st.sidebar.page_link("pages/13_player_game_analysis.py", label="📈 半荘別分析")
-    st.sidebar.markdown("---")
-    st.sidebar.page_link("pages/14_statistical_analysis.py", label="📈 統計分析")
-    st.sidebar.page_link("pages/16_streak_records.py", label="🔥 連続記録")
-    st.sidebar.page_link("pages/15_game_records.py", label="📜 対局記録")
-    st.sidebar.page_link("pages/17_player_rating.py", label="📊 レーティング")
-    st.sidebar.markdown("---")
-    st.sidebar.page_link("pages/3_admin.py", label="⚙️ データ管理")
-    st.sidebar.page_link("pages/4_player_admin.py", label="👤 選手管理")
-    st.sidebar.page_link("pages/9_team_master_admin.py", label="🏢 チーム管理")
-    st.sidebar.page_link("pages/5_season_update.py", label="🔄 シーズン更新")
-    st.sidebar.page_link("pages/6_player_stats_input.py", label="📊 選手成績入力")
-    st.sidebar.page_link("pages/11_game_results_input.py", label="🎮 半荘記録入力")
+
+# 環境変数 MLEAGUE_DB_PATH で別のデータベース（generate_league.py で生成した検証用など）を使える
+DB_PATH = os.environ.get("MLEAGUE_DB_PATH", "data/mleague.db")
+
 
 def get_connection():
     return sqlite3.connect(DB_PATH)
@@ -411,6 +374,83 @@ def get_players_by_team(team_id, season):
     conn.close()
     return df
 
+
+# ========== シーズン更新 ==========
+
+def rollover_season(from_season, to_season, team_name_changes=None, player_moves=None, conn=None):
+    """
+    前シーズンのチーム名・選手所属を新シーズンへ引き継ぎ、変更分だけを反映する
+    引き継ぎは INSERT ... SELECT で一括コピーし、変更分は executemany でまとめて適用する
+    （選手数に関わらず文の実行回数は一定、全体で1トランザクション）
+    Args:
+        team_name_changes: {team_id: 新シーズンのチーム名}（変更のあるチームのみでよい）
+        player_moves: {player_id: 移籍先 team_id、退団は None}（残留の選手は不要）
+        conn: 既存コネクションを使う場合は指定（なければ内部で開閉・コミット）
+    Returns:
+        dict(teams, players, transferred, retired): 新シーズンのチーム数・所属選手数と変更件数
+    """
+    team_name_changes = team_name_changes or {}
+    player_moves = player_moves or {}
+    transfers = [(team_id, player_id, to_season)
+                 for player_id, team_id in player_moves.items() if team_id is not None]
+    retirements = [(player_id, to_season)
+                   for player_id, team_id in player_moves.items() if team_id is None]
+
+    close_conn = False
+    if conn is None:
+        conn = get_connection()
+        close_conn = True
+    cursor = conn.cursor()
+
+    try:
+        # 1. チーム名を引き継ぎ、変更分を上書き
+        cursor.execute("""
+            INSERT INTO team_names (team_id, season, team_name)
+            SELECT team_id, ?, team_name FROM team_names WHERE season = ?
+            ON CONFLICT (team_id, season) DO UPDATE SET team_name = excluded.team_name
+        """, (to_season, from_season))
+        cursor.executemany("""
+            INSERT INTO team_names (team_id, season, team_name) VALUES (?, ?, ?)
+            ON CONFLICT (team_id, season) DO UPDATE SET team_name = excluded.team_name
+        """, [(team_id, to_season, name) for team_id, name in team_name_changes.items()])
+
+        # 2. 選手所属を引き継ぎ（新シーズンに登録済みの新加入選手はそのまま）
+        cursor.execute("""
+            INSERT INTO player_teams (player_id, team_id, season)
+            SELECT player_id, team_id, ? FROM player_teams WHERE season = ?
+            ON CONFLICT (player_id, season) DO UPDATE SET team_id = excluded.team_id
+        """, (to_season, from_season))
+
+        # 3. 移籍・退団を反映
+        cursor.executemany("""
+            UPDATE player_teams SET team_id = ? WHERE player_id = ? AND season = ?
+        """, transfers)
+        cursor.executemany("""
+            DELETE FROM player_teams WHERE player_id = ? AND season = ?
+        """, retirements)
+
+        cursor.execute("SELECT COUNT(*) FROM team_names WHERE season = ?", (to_season,))
+        team_count = cursor.fetchone()[0]
+        cursor.execute("SELECT COUNT(*) FROM player_teams WHERE season = ?", (to_season,))
+        player_count = cursor.fetchone()[0]
+
+        if close_conn:
+            conn.commit()
+    except Exception:
+        if close_conn:
+            conn.rollback()
+        raise
+    finally:
+        if close_conn:
+            conn.close()
+
+    return {
+        "teams": team_count,
+        "players": player_count,
+        "transferred": len(transfers),
+        "retired": len(retirements),
+    }
+
 # ========== 選手成績関連（新規追加） ==========
 
 
@@ -547,17 +587,16 @@ def calculate_expected_rank_score(player_rating, opponent_ratings):
     Returns:
         期待順位スコア（-3.5 〜 +4.5）
     """
-    import numpy as np
     all_ratings = [player_rating] + opponent_ratings
     def win_expect(r1, r2):
         return 1 / (1 + 10 ** ((r2 - r1) / 400))
     win_probs = []
     for i in range(4):
         others = [all_ratings[j] for j in range(4) if j != i]
-        prob = np.mean([win_expect(all_ratings[i], r) for r in others])
+        prob = sum(win_expect(all_ratings[i], r) for r in others) / len(others)
         win_probs.append(prob)
     rank_scores = [4.5, 0.5, -1.5, -3.5]
-    expected_scores = [sum([p * s for p, s in zip(win_probs, np.roll(rank_scores, -i))]) for i in range(4)]
+    expected_scores = [sum([p * s for p, s in zip(win_probs, rank_scores[i:] + rank_scores[:i])]) for i in range(4)]
     mean_score = sum(expected_scores) / 4
     corrected_scores = [s - mean_score for s in expected_scores]
     idx = 0
@@ -639,11 +678,15 @@ def update_player_rating(player_id, opponent_ratings, actual_rank, game_date):
     return new_rating, delta
 
 
-def initialize_ratings_from_games():
+def initialize_ratings_from_games(conn=None):
     """
     既存のgame_resultsから時系列でレートを遡及計算
+    conn: 既存コネクションを使う場合は指定（なければ内部で開閉）
     """
-    conn = get_connection()
+    close_conn = False
+    if conn is None:
+        conn = get_connection()
+        close_conn = True
     cursor = conn.cursor()
     
     # 全選手のレートを1500にリセット
@@ -677,8 +720,65 @@ def initialize_ratings_from_games():
 
     # rating_calculated フラグをすべて 1 に更新
     cursor.execute("UPDATE game_results SET rating_calculated = 1")
-    conn.commit()
-    conn.close()
+    if close_conn:
+        conn.commit()
+        conn.close()
+
+
+def apply_pending_ratings(conn=None):
+    """
+    rating_calculated = 0 の対局をまとめて時系列順にレーティング計算
+    計算済みの対局より前の対局が含まれる場合は、時系列を保つため全件を遡及計算する
+    conn: 既存コネクションを使う場合は指定（なければ内部で開閉）
+    Returns:
+        計算対象になった対局数
+    """
+    close_conn = False
+    if conn is None:
+        conn = get_connection()
+        close_conn = True
+    cursor = conn.cursor()
+
+    cursor.execute("""
+        SELECT season, game_date, COALESCE(game_number, 0) as game_number
+        FROM game_results
+        WHERE rating_calculated = 0
+        GROUP BY season, game_date, COALESCE(game_number, 0)
+        ORDER BY game_date, game_number
+    """)
+    pending = cursor.fetchall()
+
+    cursor.execute("""
+        SELECT game_date, COALESCE(game_number, 0) as game_number
+        FROM game_results
+        WHERE rating_calculated = 1
+        ORDER BY game_date DESC, game_number DESC
+        LIMIT 1
+    """)
+    latest = cursor.fetchone()
+
+    if pending and latest is not None and tuple(pending[0][1:]) < tuple(latest):
+        initialize_ratings_from_games(conn)
+    else:
+        for season, game_date, game_number in pending:
+            cursor.execute("""
+                SELECT player_id, rank
+                FROM game_results
+                WHERE season = ? AND game_date = ? AND COALESCE(game_number, 0) = ?
+                ORDER BY player_id
+            """, (season, game_date, game_number))
+            players = cursor.fetchall()
+            if len(players) != 4:
+                continue  # 4人未満はスキップ
+            update_ratings_for_game(
+                [pid for pid, _ in players], [rk for _, rk in players],
+                season, game_date, game_number, conn=conn)
+        cursor.execute("UPDATE game_results SET rating_calculated = 1 WHERE rating_calculated = 0")
+
+    if close_conn:
+        conn.commit()
+        conn.close()
+    return len(pending)
 
 
 def get_player_ratings():
@@ -716,3 +816,1493 @@ def get_player_rating_history(player_id, limit=50):
     """, conn, params=(player_id, limit))
     conn.close()
     return df
+
+
+# ========== 直対集計（pair_stats） ==========
+
+PAIR_ENTITY_TYPES = ("player", "team")
+
+
+def _fetch_game_entries(cursor, entity_type, season, game_date, table_type, game_number):
+    """1対局分の (entity_id, points, rank) を取得（チームは所属選手のポイントを合算）"""
+    if entity_type == "player":
+        cursor.execute("""
+            SELECT player_id, points, rank
+            FROM game_results
+            WHERE season = ? AND game_date = ? AND table_type IS ? AND game_number IS ?
+        """, (season, game_date, table_type, game_number))
+    else:
+        cursor.execute("""
+            SELECT pt.team_id, SUM(gr.points), MIN(gr.rank)
+            FROM game_results gr
+            JOIN player_teams pt ON gr.player_id = pt.player_id AND gr.season = pt.season
+            WHERE gr.season = ? AND gr.game_date = ? AND gr.table_type IS ? AND gr.game_number IS ?
+            GROUP BY pt.team_id
+        """, (season, game_date, table_type, game_number))
+    return cursor.fetchall()
+
+
+def update_pair_stats_for_game(cursor, season, game_date, table_type, game_number, sign=1):
+    """
+    1対局分の直対集計を pair_stats に加算（sign=1）または減算（sign=-1）する。
+    追加時は INSERT 後に sign=1、削除時は DELETE 前に sign=-1、
+    編集時は UPDATE 前に sign=-1・UPDATE 後に sign=1 で呼び出す。
+    コミットは呼び出し側で行う。
+    """
+    rows = []
+    for entity_type in PAIR_ENTITY_TYPES:
+        entries = _fetch_game_entries(cursor, entity_type, season, game_date, table_type, game_number)
+        for a_id, a_points, a_rank in entries:
+            for b_id, b_points, b_rank in entries:
+                if a_id == b_id:
+                    continue
+                rows.append((
+                    entity_type, a_id, b_id, season, table_type or "",
+                    sign, sign * (a_points - b_points),
+                    sign * int(a_rank < b_rank), sign * int(a_rank > b_rank)
+                ))
+    if not rows:
+        return
+
+    cursor.executemany("""
+        INSERT INTO pair_stats (entity_type, a_id, b_id, season, table_type, games, point_diff, a_ahead, b_ahead)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (entity_type, a_id, b_id, season, table_type) DO UPDATE SET
+            games = games + excluded.games,
+            point_diff = point_diff + excluded.point_diff,
+            a_ahead = a_ahead + excluded.a_ahead,
+            b_ahead = b_ahead + excluded.b_ahead
+    """, rows)
+    if sign < 0:
+        cursor.executemany("""
+            DELETE FROM pair_stats
+            WHERE entity_type = ? AND a_id = ? AND b_id = ? AND season = ? AND table_type = ? AND games <= 0
+        """, [row[:5] for row in rows])
+
+
+def rebuild_pair_stats(conn=None, season=None):
+    """game_results から pair_stats を再構築（season 指定時はそのシーズンのみ）"""
+    close_conn = False
+    if conn is None:
+        conn = get_connection()
+        close_conn = True
+    cursor = conn.cursor()
+    season_filter = "" if season is None else "WHERE season = ?"
+    team_season_filter = "" if season is None else "WHERE gr.season = ?"
+    params = () if season is None else (season, season)
+    cursor.execute(f"DELETE FROM pair_stats {season_filter}", params[:1])
+    cursor.execute(f"""
+        WITH entries AS (
+            SELECT 'player' AS entity_type, player_id AS entity_id,
+                   season, game_date, table_type, game_number, points, rank
+            FROM game_results
+            {season_filter}
+            UNION ALL
+            SELECT 'team', pt.team_id,
+                   gr.season, gr.game_date, gr.table_type, gr.game_number, SUM(gr.points), MIN(gr.rank)
+            FROM game_results gr
+            JOIN player_teams pt ON gr.player_id = pt.player_id AND gr.season = pt.season
+            {team_season_filter}
+            GROUP BY pt.team_id, gr.season, gr.game_date, gr.table_type, gr.game_number
+        )
+        INSERT INTO pair_stats (entity_type, a_id, b_id, season, table_type, games, point_diff, a_ahead, b_ahead)
+        SELECT
+            a.entity_type, a.entity_id, b.entity_id, a.season, COALESCE(a.table_type, ''),
+            COUNT(*),
+            SUM(a.points - b.points),
+            SUM(CASE WHEN a.rank < b.rank THEN 1 ELSE 0 END),
+            SUM(CASE WHEN a.rank > b.rank THEN 1 ELSE 0 END)
+        FROM entries a
+        JOIN entries b
+            ON a.entity_type = b.entity_type
+            AND a.season = b.season
+            AND a.game_date = b.game_date
+            AND a.table_type IS b.table_type
+            AND a.game_number IS b.game_number
+            AND a.entity_id <> b.entity_id
+        GROUP BY a.entity_type, a.entity_id, b.entity_id, a.season, COALESCE(a.table_type, '')
+    """, params)
+    if close_conn:
+        conn.commit()
+        conn.close()
+
+
+def _pair_entity_names(entity_type, season=None):
+    """直対表示用の {entity_id: 名前}（チームは指定シーズン名、全期間は最新名）"""
+    if entity_type == "player":
+        players_df = get_players()
+        return dict(zip(players_df["player_id"], players_df["player_name"]))
+    names_df = get_all_team_names()
+    if season is not None:
+        season_names = names_df[names_df["season"] == season]
+        latest_names = names_df.groupby("team_id").last()["team_name"].to_dict()
+        return {**latest_names, **dict(zip(season_names["team_id"], season_names["team_name"]))}
+    return names_df.groupby("team_id").last()["team_name"].to_dict()
+
+
+def get_pair_entities(entity_type, season=None):
+    """直対集計に登場する選手/チームの一覧を取得（season=None で全期間）"""
+    conn = get_connection()
+    query = "SELECT DISTINCT a_id AS entity_id FROM pair_stats WHERE entity_type = ?"
+    params = [entity_type]
+    if season is not None:
+        query += " AND season = ?"
+        params.append(season)
+    df = pd.read_sql_query(query, conn, params=params)
+    conn.close()
+
+    names = _pair_entity_names(entity_type, season)
+    df["entity_name"] = df["entity_id"].map(names)
+    return df
+
+
+def get_pair_stats(entity_type, season=None, entity_ids=None, opponent_ids=None):
+    """
+    pair_stats から直対成績を取得（season=None で全シーズン・全卓区分を合算）
+    Returns:
+        entity_id, entity_name, opponent_id, opponent_name,
+        games, total_diff, avg_diff, ahead（先着数）, behind（後着数）
+    """
+    conditions = ["entity_type = ?"]
+    params = [entity_type]
+    if season is not None:
+        conditions.append("season = ?")
+        params.append(season)
+    if entity_ids is not None:
+        conditions.append(f"a_id IN ({','.join('?' * len(entity_ids))})")
+        params.extend(int(i) for i in entity_ids)
+    if opponent_ids is not None:
+        conditions.append(f"b_id IN ({','.join('?' * len(opponent_ids))})")
+        params.extend(int(i) for i in opponent_ids)
+
+    conn = get_connection()
+    df = pd.read_sql_query(f"""
+        SELECT
+            a_id AS entity_id,
+            b_id AS opponent_id,
+            SUM(games) AS games,
+            SUM(point_diff) AS total_diff,
+            SUM(a_ahead) AS ahead,
+            SUM(b_ahead) AS behind
+        FROM pair_stats
+        WHERE {' AND '.join(conditions)}
+        GROUP BY a_id, b_id
+    """, conn, params=params)
+    conn.close()
+
+    names = _pair_entity_names(entity_type, season)
+    df["entity_name"] = df["entity_id"].map(names)
+    df["opponent_name"] = df["opponent_id"].map(names)
+    df["avg_diff"] = df["total_diff"] / df["games"]
+    return df[["entity_id", "entity_name", "opponent_id", "opponent_name",
+               "games", "total_diff", "avg_diff", "ahead", "behind"]]
+
+
+# ========== 直対疎行列（CSR） ==========
+
+PairMatrix = namedtuple("PairMatrix", ["ids", "indptr", "indices", "data"])
+PairMatrix.__doc__ = """
+直対成績の疎行列（CSR形式）
+    ids: 行・列に対応する entity_id（昇順）
+    indptr: 行 i の非ゼロ要素は indices/data の [indptr[i], indptr[i+1]) に格納
+    indices: 列位置（行内で昇順）
+    data: 値
+"""
+
+
+def build_pair_matrix(a_ids, b_ids, values):
+    """COO形式（行id, 列id, 値）から PairMatrix を作成（メモリは対戦ペア数に比例）"""
+    import numpy as np
+    a_ids = np.asarray(a_ids, dtype=np.int64)
+    b_ids = np.asarray(b_ids, dtype=np.int64)
+    values = np.asarray(values, dtype=np.float64)
+
+    ids = np.union1d(a_ids, b_ids)
+    rows = np.searchsorted(ids, a_ids)
+    cols = np.searchsorted(ids, b_ids)
+
+    # 行→列の順に並べ替えて CSR を組み立てる
+    order = np.lexsort((cols, rows))
+    indptr = np.zeros(len(ids) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=len(ids)), out=indptr[1:])
+    return PairMatrix(ids, indptr, cols[order], values[order])
+
+
+def get_pair_matrix(entity_type, season=None, value="total_diff"):
+    """
+    pair_stats から直対成績の疎行列を取得（season=None で全期間）
+    value: total_diff（累積pt差）/ games / ahead / behind
+    """
+    columns = {
+        "total_diff": "SUM(point_diff)",
+        "games": "SUM(games)",
+        "ahead": "SUM(a_ahead)",
+        "behind": "SUM(b_ahead)",
+    }
+    query = f"""
+        SELECT a_id, b_id, {columns[value]}
+        FROM pair_stats
+        WHERE entity_type = ?
+    """
+    params = [entity_type]
+    if season is not None:
+        query += " AND season = ?"
+        params.append(season)
+    query += " GROUP BY a_id, b_id"
+
+    conn = get_connection()
+    rows = conn.execute(query, params).fetchall()
+    conn.close()
+
+    a_ids, b_ids, values = zip(*rows) if rows else ((), (), ())
+    return build_pair_matrix(a_ids, b_ids, values)
+
+
+def _pair_matrix_positions(matrix, entity_ids):
+    """entity_id の行位置を返す（存在しない id は -1）"""
+    import numpy as np
+    entity_ids = np.asarray(entity_ids, dtype=np.int64)
+    if len(matrix.ids) == 0:
+        return np.full(len(entity_ids), -1, dtype=np.int64)
+    pos = np.minimum(np.searchsorted(matrix.ids, entity_ids), len(matrix.ids) - 1)
+    return np.where(matrix.ids[pos] == entity_ids, pos, -1)
+
+
+def pair_matrix_row(matrix, entity_id):
+    """1選手/チーム分の行を取得（index=相手のentity_id の Series、対戦のない相手は含まない）"""
+    row = _pair_matrix_positions(matrix, [entity_id])[0]
+    if row < 0:
+        return pd.Series(dtype=float)
+    start, end = matrix.indptr[row], matrix.indptr[row + 1]
+    return pd.Series(matrix.data[start:end], index=matrix.ids[matrix.indices[start:end]])
+
+
+def pair_matrix_submatrix(matrix, entity_ids):
+    """
+    指定した entity_id 同士の部分行列を密な DataFrame で取得（TOP N 表示用）
+    対戦のない組み合わせは NaN。行・列は entity_ids の順に並ぶ。
+    """
+    import numpy as np
+    entity_ids = list(entity_ids)
+    positions = _pair_matrix_positions(matrix, entity_ids)
+
+    # 全体の列位置 → 部分行列の列位置（対象外は -1）
+    col_map = np.full(len(matrix.ids), -1, dtype=np.int64)
+    col_map[positions[positions >= 0]] = np.flatnonzero(positions >= 0)
+
+    dense = np.full((len(entity_ids), len(entity_ids)), np.nan)
+    for i, row in enumerate(positions):
+        if row < 0:
+            continue
+        start, end = matrix.indptr[row], matrix.indptr[row + 1]
+        cols = col_map[matrix.indices[start:end]]
+        mask = cols >= 0
+        dense[i, cols[mask]] = matrix.data[start:end][mask]
+    return pd.DataFrame(dense, index=entity_ids, columns=entity_ids)
+
+
+# ========== シーズン別部分集計 ==========
+# シーズンごとの部分集計（合計・件数・二乗和・順位分布）を保持し、
+# 全期間は各シーズンの部分集計を合算して求める。
+# 各シーズンの部分集計は変更ジャーナルのバージョンをキーにキャッシュし、
+# 半荘記録に変更のあったシーズンだけを再集計する。
+# 部分集計自体は game_cube をシーズン単位でロールアップしたもの。
+
+PARTIAL_KEYS = ["season", "player_id", "seat_name", "game_number", "table_type"]
+PARTIAL_SUMS = ["games", "points_sum", "points_sqsum", "rank_sum",
+                "rank_1st", "rank_2nd", "rank_3rd", "rank_4th"]
+
+
+def _compute_season_partials(season):
+    """1シーズン分の部分集計を game_cube から計算"""
+    return get_cube_rollup(PARTIAL_KEYS, season=season)[PARTIAL_KEYS + PARTIAL_SUMS]
+
+
+@lru_cache(maxsize=256)
+def _versioned_season_partials(season, version):
+    """シーズンの部分集計（キャッシュ。version は変更ジャーナルの seq で、変わると再集計される）"""
+    return _compute_season_partials(season)
+
+
+def clear_season_partials():
+    """部分集計キャッシュをすべて破棄（通常は変更ジャーナルにより自動で更新される）"""
+    _versioned_season_partials.cache_clear()
+
+
+def get_season_partials(season=None):
+    """
+    シーズン別の部分集計を取得（season=None で全シーズン分を連結）
+    半荘記録に変更のないシーズンはキャッシュを使用する。
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT DISTINCT season FROM game_results ORDER BY season")
+    all_seasons = [row[0] for row in cursor.fetchall()]
+    versions = get_table_versions("game_results", conn)
+    conn.close()
+
+    if not all_seasons:
+        return pd.DataFrame(columns=PARTIAL_KEYS + PARTIAL_SUMS)
+
+    target_seasons = all_seasons if season is None else [season]
+    partials = [_versioned_season_partials(s, versions.get(s, 0)) for s in target_seasons]
+    return pd.concat(partials, ignore_index=True)
+
+
+def merge_partials(partials, by):
+    """部分集計を指定キーで合算し、平均・標準偏差・順位率を付加"""
+    df = partials.groupby(by, as_index=False)[PARTIAL_SUMS].sum()
+    return add_rate_columns(df)
+
+
+# ========== 集計キューブ（game_cube） ==========
+# season × month × seat × game_number × table_type × player × team ごとに
+# 対局数・ポイント合計・二乗和・順位合計・順位分布を保持する。
+# 各画面の席順別・試合番号別・月別集計はこのテーブルのロールアップで求める。
+
+CUBE_DIMENSIONS = ("season", "month", "seat_name", "game_number", "table_type", "player_id", "team_id")
+CUBE_MEASURES = ("games", "points_sum", "points_sqsum", "rank_sum",
+                 "rank_1st", "rank_2nd", "rank_3rd", "rank_4th")
+
+# game_results 1行をキューブの1セルに対応させる SELECT
+# （主キーに NULL を含めないよう、席・試合番号・卓区分は空値、所属なしの team_id は 0 に寄せる）
+_CUBE_SOURCE_SQL = """
+    SELECT
+        gr.season,
+        strftime('%Y-%m', gr.game_date) AS month,
+        COALESCE(gr.seat_name, '') AS seat_name,
+        COALESCE(gr.game_number, 0) AS game_number,
+        COALESCE(gr.table_type, '') AS table_type,
+        gr.player_id,
+        COALESCE(pt.team_id, 0) AS team_id,
+        COUNT(*),
+        SUM(gr.points),
+        SUM(gr.points * gr.points),
+        SUM(gr.rank),
+        SUM(CASE WHEN gr.rank = 1 THEN 1 ELSE 0 END),
+        SUM(CASE WHEN gr.rank = 2 THEN 1 ELSE 0 END),
+        SUM(CASE WHEN gr.rank = 3 THEN 1 ELSE 0 END),
+        SUM(CASE WHEN gr.rank = 4 THEN 1 ELSE 0 END)
+    FROM game_results gr
+    LEFT JOIN player_teams pt ON gr.player_id = pt.player_id AND gr.season = pt.season
+"""
+_CUBE_GROUP_SQL = """
+    GROUP BY gr.season, month, COALESCE(gr.seat_name, ''), COALESCE(gr.game_number, 0),
+             COALESCE(gr.table_type, ''), gr.player_id, COALESCE(pt.team_id, 0)
+"""
+
+
+def update_game_cube_for_game(cursor, season, game_date, table_type, game_number, sign=1):
+    """
+    1対局分を game_cube に加算（sign=1）または減算（sign=-1）する。
+    呼び出しのタイミングとコミットは update_pair_stats_for_game と同じ。
+    """
+    cursor.execute(_CUBE_SOURCE_SQL + """
+        WHERE gr.season = ? AND gr.game_date = ? AND gr.table_type IS ? AND gr.game_number IS ?
+    """ + _CUBE_GROUP_SQL, (season, game_date, table_type, game_number))
+    rows = [
+        key + tuple(sign * value for value in measures)
+        for key, measures in ((row[:7], row[7:]) for row in cursor.fetchall())
+    ]
+    if not rows:
+        return
+
+    dims = ", ".join(CUBE_DIMENSIONS)
+    cursor.executemany(f"""
+        INSERT INTO game_cube ({dims}, {", ".join(CUBE_MEASURES)})
+        VALUES ({", ".join("?" * (len(CUBE_DIMENSIONS) + len(CUBE_MEASURES)))})
+        ON CONFLICT ({dims}) DO UPDATE SET
+            {", ".join(f"{m} = {m} + excluded.{m}" for m in CUBE_MEASURES)}
+    """, rows)
+    if sign < 0:
+        cursor.executemany(f"""
+            DELETE FROM game_cube
+            WHERE {" AND ".join(f"{d} = ?" for d in CUBE_DIMENSIONS)} AND games <= 0
+        """, [row[:7] for row in rows])
+
+
+def rebuild_game_cube(conn=None, season=None):
+    """game_results から game_cube を再構築（season 指定時はそのシーズンのみ）"""
+    close_conn = False
+    if conn is None:
+        conn = get_connection()
+        close_conn = True
+    cursor = conn.cursor()
+    params = () if season is None else (season,)
+    cursor.execute("DELETE FROM game_cube" + ("" if season is None else " WHERE season = ?"), params)
+    cursor.execute(f"""
+        INSERT INTO game_cube ({", ".join(CUBE_DIMENSIONS)}, {", ".join(CUBE_MEASURES)})
+    """ + _CUBE_SOURCE_SQL + ("" if season is None else " WHERE gr.season = ?")
+        + _CUBE_GROUP_SQL, params)
+    if close_conn:
+        conn.commit()
+        conn.close()
+
+
+def add_rate_columns(df):
+    """合算済みの集計に平均pt・平均順位・標準偏差・順位率（%）を付加"""
+    import numpy as np
+    df["avg_points"] = df["points_sum"] / df["games"]
+    df["avg_rank"] = df["rank_sum"] / df["games"]
+    variance = (df["points_sqsum"] - df["games"] * df["avg_points"] ** 2) / (df["games"] - 1)
+    df["std_points"] = np.sqrt(variance.clip(lower=0))
+    for col in ["rank_1st", "rank_2nd", "rank_3rd", "rank_4th"]:
+        df[col.replace("rank_", "rate_")] = df[col] / df["games"] * 100
+    return df
+
+
+def get_cube_rollup(by, season=None, conn=None, **filters):
+    """
+    game_cube を指定した次元でロールアップ
+    Args:
+        by: 集計する次元のリスト（CUBE_DIMENSIONS の部分集合）
+        season: シーズン（None で全期間）
+        filters: 次元名=値 の絞り込み（例: seat_name='東', team_id=3）
+    Returns:
+        by の各列 + CUBE_MEASURES + add_rate_columns の派生列
+    """
+    by = list(by)
+    for dim in by + list(filters):
+        if dim not in CUBE_DIMENSIONS:
+            raise ValueError(f"不明な次元です: {dim}")
+
+    conditions = []
+    params = []
+    if season is not None:
+        conditions.append("season = ?")
+        params.append(season)
+    for dim, value in filters.items():
+        conditions.append(f"{dim} = ?")
+        params.append(value)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    group = f"GROUP BY {', '.join(by)} HAVING SUM(games) > 0" if by else ""
+
+    close_conn = False
+    if conn is None:
+        conn = get_connection()
+        close_conn = True
+    df = pd.read_sql_query(f"""
+        SELECT {''.join(f'{d}, ' for d in by)}{', '.join(f'SUM({m}) AS {m}' for m in CUBE_MEASURES)}
+        FROM game_cube
+        {where}
+        {group}
+    """, conn, params=params)
+    if close_conn:
+        conn.close()
+    return add_rate_columns(df)
+
+
+# ========== 選手シーズン成績（player_season_stats） ==========
+# レギュラーシーズンの半荘記録から選手×シーズンの試合数・ポイント・順位回数を集計して保持する。
+# points はペナルティ適用後の最終ポイント（半荘記録のポイント合計 + penalty）。
+# manual_override = 1 のシーズンは半荘記録のない（または不完全な）シーズンの手入力値で、
+# 自動集計では変更しない。
+
+# シーズン成績・チームポイントの集計対象とする卓区分
+REGULAR_TABLE_TYPE = "レギュラー"
+
+_PLAYER_SEASON_SOURCE_SQL = """
+    SELECT
+        player_id,
+        season,
+        COUNT(*),
+        SUM(points),
+        SUM(CASE WHEN rank = 1 THEN 1 ELSE 0 END),
+        SUM(CASE WHEN rank = 2 THEN 1 ELSE 0 END),
+        SUM(CASE WHEN rank = 3 THEN 1 ELSE 0 END),
+        SUM(CASE WHEN rank = 4 THEN 1 ELSE 0 END)
+    FROM game_results
+    WHERE table_type = ?
+"""
+
+
+def is_manual_player_season(cursor, season):
+    """シーズンの選手成績が手入力管理（manual_override = 1）かどうか"""
+    cursor.execute("""
+        SELECT 1 FROM player_season_stats WHERE season = ? AND manual_override = 1 LIMIT 1
+    """, (season,))
+    return cursor.fetchone() is not None
+
+
+def update_player_season_stats_for_game(cursor, season, game_date, table_type, game_number, sign=1):
+    """
+    1対局分を player_season_stats に加算（sign=1）または減算（sign=-1）する。
+    呼び出しのタイミングとコミットは update_pair_stats_for_game と同じ。
+    レギュラーシーズン以外の対局と手入力管理のシーズンは対象外。
+    """
+    if table_type != REGULAR_TABLE_TYPE or is_manual_player_season(cursor, season):
+        return
+    cursor.execute(_PLAYER_SEASON_SOURCE_SQL + """
+        AND season = ? AND game_date = ? AND game_number IS ?
+        GROUP BY player_id, season
+    """, (table_type, season, game_date, game_number))
+    rows = [
+        (player_id, row_season) + tuple(sign * value for value in measures)
+        for player_id, row_season, *measures in cursor.fetchall()
+    ]
+    cursor.executemany("""
+        INSERT INTO player_season_stats
+            (player_id, season, games, points, rank_1st, rank_2nd, rank_3rd, rank_4th)
+        VALUES (?, ?, ?, ROUND(?, 1), ?, ?, ?, ?)
+        ON CONFLICT (player_id, season) DO UPDATE SET
+            games = games + excluded.games,
+            points = ROUND(points + excluded.points, 1),
+            rank_1st = rank_1st + excluded.rank_1st,
+            rank_2nd = rank_2nd + excluded.rank_2nd,
+            rank_3rd = rank_3rd + excluded.rank_3rd,
+            rank_4th = rank_4th + excluded.rank_4th
+        WHERE manual_override = 0
+    """, rows)
+
+
+def rebuild_player_season_stats(conn=None, season=None):
+    """
+    手入力管理でないシーズンの player_season_stats を game_results から再構築
+    （season=None で全シーズン。penalty は保持し、最終ポイントに反映する）
+    """
+    close_conn = False
+    if conn is None:
+        conn = get_connection()
+        close_conn = True
+    cursor = conn.cursor()
+
+    season_filter = "" if season is None else " AND season = ?"
+    params = () if season is None else (season,)
+    manual_filter = """
+        AND season NOT IN (SELECT season FROM player_season_stats WHERE manual_override = 1)
+    """
+
+    cursor.execute(f"""
+        UPDATE player_season_stats
+        SET games = 0, points = COALESCE(penalty, 0),
+            rank_1st = 0, rank_2nd = 0, rank_3rd = 0, rank_4th = 0
+        WHERE manual_override = 0 {manual_filter} {season_filter}
+    """, params)
+    cursor.execute(f"""
+        INSERT INTO player_season_stats
+            (player_id, season, games, points, rank_1st, rank_2nd, rank_3rd, rank_4th)
+        {_PLAYER_SEASON_SOURCE_SQL} {manual_filter} {season_filter}
+        GROUP BY player_id, season
+        ON CONFLICT (player_id, season) DO UPDATE SET
+            games = excluded.games,
+            points = ROUND(excluded.points + COALESCE(penalty, 0), 1),
+            rank_1st = excluded.rank_1st,
+            rank_2nd = excluded.rank_2nd,
+            rank_3rd = excluded.rank_3rd,
+            rank_4th = excluded.rank_4th
+    """, (REGULAR_TABLE_TYPE,) + params)
+    cursor.execute(f"""
+        UPDATE player_season_stats SET points = ROUND(points, 1)
+        WHERE manual_override = 0 {season_filter}
+    """, params)
+    # 対局もペナルティもない自動集計行は残さない
+    cursor.execute(f"""
+        DELETE FROM player_season_stats
+        WHERE manual_override = 0 AND games = 0 AND COALESCE(penalty, 0) = 0 {season_filter}
+    """, params)
+
+    if close_conn:
+        conn.commit()
+        conn.close()
+
+
+# ========== チームシーズンポイント（team_season_points） ==========
+# レギュラーシーズンの半荘記録を player_teams で所属チームに寄せてチームポイントを集計し、
+# シーズン内の順位とあわせて保持する（各画面の順位表はこのテーブルをそのまま読む）。
+# points はペナルティ適用後の最終ポイント（半荘記録のポイント合計 + penalty）。
+# manual_override = 1 のシーズンは手入力値で、自動集計では変更しない。
+
+_TEAM_SEASON_SOURCE_SQL = """
+    SELECT pt.team_id, gr.season, SUM(gr.points) AS points
+    FROM game_results gr
+    JOIN player_teams pt ON gr.player_id = pt.player_id AND gr.season = pt.season
+    WHERE gr.table_type = ?
+"""
+
+
+def is_manual_team_season(cursor, season):
+    """シーズンのチームポイントが手入力管理（manual_override = 1）かどうか"""
+    cursor.execute("""
+        SELECT 1 FROM team_season_points WHERE season = ? AND manual_override = 1 LIMIT 1
+    """, (season,))
+    return cursor.fetchone() is not None
+
+
+def _rank_team_season_points(cursor, season=None):
+    """自動集計のシーズンの順位を最終ポイントの高い順に付け直す（同点は同順位）"""
+    season_filter = "" if season is None else " AND season = ?"
+    cursor.execute(f"""
+        UPDATE team_season_points
+        SET rank = (
+            SELECT COUNT(*) + 1 FROM team_season_points other
+            WHERE other.season = team_season_points.season
+              AND other.points > team_season_points.points
+        )
+        WHERE manual_override = 0 {season_filter}
+    """, () if season is None else (season,))
+
+
+def update_team_season_points_for_game(cursor, season, game_date, table_type, game_number, sign=1):
+    """
+    1対局分を team_season_points に加算（sign=1）または減算（sign=-1）し、順位を付け直す。
+    呼び出しのタイミングとコミットは update_pair_stats_for_game と同じ。
+    レギュラーシーズン以外の対局と手入力管理のシーズンは対象外。
+    """
+    if table_type != REGULAR_TABLE_TYPE or is_manual_team_season(cursor, season):
+        return
+    cursor.execute(_TEAM_SEASON_SOURCE_SQL + """
+        AND gr.season = ? AND gr.game_date = ? AND gr.game_number IS ?
+        GROUP BY pt.team_id, gr.season
+    """, (table_type, season, game_date, game_number))
+    rows = [(row_season, team_id, sign * points) for team_id, row_season, points in cursor.fetchall()]
+    if not rows:
+        return
+    cursor.executemany("""
+        INSERT INTO team_season_points (season, team_id, points, rank)
+        VALUES (?, ?, ROUND(?, 1), 0)
+        ON CONFLICT (season, team_id) DO UPDATE SET
+            points = ROUND(points + excluded.points, 1)
+        WHERE manual_override = 0
+    """, rows)
+    _rank_team_season_points(cursor, season)
+
+
+def rebuild_team_season_points(conn=None, season=None):
+    """
+    半荘記録のある手入力管理でないシーズンの team_season_points を再構築
+    （season=None で全シーズン。そのシーズンの全チームの行を作り、penalty を最終ポイントに反映する）
+    """
+    close_conn = False
+    if conn is None:
+        conn = get_connection()
+        close_conn = True
+    cursor = conn.cursor()
+
+    season_filter = "" if season is None else " AND season = ?"
+    params = () if season is None else (season,)
+    manual_seasons = "SELECT season FROM team_season_points WHERE manual_override = 1"
+
+    cursor.execute(f"""
+        UPDATE team_season_points SET points = COALESCE(penalty, 0)
+        WHERE manual_override = 0 AND season NOT IN ({manual_seasons}) {season_filter}
+    """, params)
+    cursor.execute(f"""
+        INSERT INTO team_season_points (season, team_id, points, rank)
+        SELECT tn.season, tn.team_id, ROUND(COALESCE(g.points, 0), 1), 0
+        FROM team_names tn
+        LEFT JOIN (
+            {_TEAM_SEASON_SOURCE_SQL}
+            GROUP BY pt.team_id, gr.season
+        ) g ON tn.team_id = g.team_id AND tn.season = g.season
+        WHERE tn.season IN (SELECT season FROM game_results WHERE table_type = ?)
+          AND tn.season NOT IN ({manual_seasons})
+          {season_filter.replace("season", "tn.season")}
+        ON CONFLICT (season, team_id) DO UPDATE SET
+            points = ROUND(excluded.points + COALESCE(penalty, 0), 1)
+    """, (REGULAR_TABLE_TYPE, REGULAR_TABLE_TYPE) + params)
+    # そのシーズンに参加していないチームの自動集計行は残さない
+    cursor.execute(f"""
+        DELETE FROM team_season_points
+        WHERE manual_override = 0 {season_filter}
+          AND NOT EXISTS (
+              SELECT 1 FROM team_names tn
+              WHERE tn.team_id = team_season_points.team_id AND tn.season = team_season_points.season
+          )
+    """, params)
+    _rank_team_season_points(cursor, season)
+
+    if close_conn:
+        conn.commit()
+        conn.close()
+
+
+def update_aggregates_for_game(cursor, season, game_date, table_type, game_number, sign=1):
+    """1対局分を集計テーブル（pair_stats・game_cube・player_season_stats・team_season_points）に反映"""
+    update_pair_stats_for_game(cursor, season, game_date, table_type, game_number, sign)
+    update_game_cube_for_game(cursor, season, game_date, table_type, game_number, sign)
+    update_player_season_stats_for_game(cursor, season, game_date, table_type, game_number, sign)
+    update_team_season_points_for_game(cursor, season, game_date, table_type, game_number, sign)
+
+
+def rebuild_aggregates(conn=None):
+    """集計テーブル（pair_stats・game_cube・player_season_stats・team_season_points）を全件再構築"""
+    close_conn = False
+    if conn is None:
+        conn = get_connection()
+        close_conn = True
+    rebuild_pair_stats(conn)
+    rebuild_game_cube(conn)
+    rebuild_player_season_stats(conn)
+    rebuild_team_season_points(conn)
+    if close_conn:
+        conn.commit()
+        conn.close()
+
+
+# ========== 変更ジャーナル（change_journal） ==========
+# 元データのテーブルへの書き込みはトリガー（init_db.py）で change_journal に追記される。
+# seq は単調増加するため、キャッシュは「対象の最新 seq」をキーに、
+# 集計テーブルは「前回処理した seq 以降の記録」だけを見て差分更新できる。
+
+JOURNAL_KEYS = ("season", "player_id", "team_id", "game_date", "table_type", "game_number")
+
+
+def get_journal_seq(conn=None):
+    """変更ジャーナルの最新 seq（記録がなければ 0）"""
+    close_conn = False
+    if conn is None:
+        conn = get_connection()
+        close_conn = True
+    cursor = conn.cursor()
+    cursor.execute("SELECT COALESCE(MAX(seq), 0) FROM change_journal")
+    seq = cursor.fetchone()[0]
+    if close_conn:
+        conn.close()
+    return seq
+
+
+def get_table_versions(table_name, conn=None):
+    """
+    テーブルのシーズン別バージョン（そのシーズンに影響した最新の seq）
+    キャッシュ関数の引数に渡すと、変更のあったシーズンのキャッシュだけが作り直される。
+    Returns:
+        {season: seq}（シーズンを持たない変更は None キー）
+    """
+    close_conn = False
+    if conn is None:
+        conn = get_connection()
+        close_conn = True
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT season, MAX(seq) FROM change_journal
+        WHERE table_name = ?
+        GROUP BY season
+    """, (table_name,))
+    versions = dict(cursor.fetchall())
+    if close_conn:
+        conn.close()
+    return versions
+
+
+def read_journal(since_seq=0, tables=None, until_seq=None, conn=None):
+    """
+    since_seq より後（until_seq 以前）の変更ジャーナルを seq 順に取得
+    Args:
+        tables: 対象テーブル名のリスト（None で全テーブル）
+    """
+    close_conn = False
+    if conn is None:
+        conn = get_connection()
+        close_conn = True
+    query = f"""
+        SELECT seq, table_name, operation, {", ".join(JOURNAL_KEYS)}, changed_at
+        FROM change_journal
+        WHERE seq > ?
+    """
+    params = [since_seq]
+    if until_seq is not None:
+        query += " AND seq <= ?"
+        params.append(until_seq)
+    if tables:
+        query += f" AND table_name IN ({', '.join('?' * len(tables))})"
+        params.extend(tables)
+    df = pd.read_sql_query(query + " ORDER BY seq", conn, params=params)
+    if close_conn:
+        conn.close()
+    return df
+
+
+def get_subscriber_seq(subscriber, conn=None):
+    """購読者が処理済みの seq（未登録なら 0）"""
+    close_conn = False
+    if conn is None:
+        conn = get_connection()
+        close_conn = True
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT last_seq FROM journal_subscribers WHERE subscriber = ?", (subscriber,))
+    row = cursor.fetchone()
+    if close_conn:
+        conn.close()
+    return row[0] if row else 0
+
+
+def consume_journal(subscriber, handler, tables=None, conn=None):
+    """
+    購読者が未処理の変更ジャーナルを handler(entries, conn) に渡し、処理済みの seq を進める
+    handler の処理と seq の更新は同じトランザクションで行うため、途中で失敗しても取りこぼさない
+    Args:
+        subscriber: 購読者名（キャッシュ・集計テーブルごとに一意）
+        handler: 未処理の記録（read_journal と同じ DataFrame）を受け取る関数
+        tables: 対象テーブル名のリスト（None で全テーブル）
+        conn: 既存コネクションを使う場合は指定（なければ内部で開閉・コミット）
+    Returns:
+        処理した記録の件数
+    """
+    close_conn = False
+    if conn is None:
+        conn = get_connection()
+        close_conn = True
+    cursor = conn.cursor()
+
+    try:
+        # 読み始めた時点の最新 seq までを処理済みとする（対象外テーブルの記録も読み飛ばす）
+        last_seq = get_subscriber_seq(subscriber, conn)
+        latest_seq = max(last_seq, get_journal_seq(conn))
+        entries = read_journal(last_seq, tables, latest_seq, conn)
+        if not entries.empty:
+            handler(entries, conn)
+        cursor.execute("""
+            INSERT INTO journal_subscribers (subscriber, last_seq, updated_at)
+            VALUES (?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT (subscriber) DO UPDATE SET
+                last_seq = excluded.last_seq,
+                updated_at = excluded.updated_at
+        """, (subscriber, latest_seq))
+        if close_conn:
+            conn.commit()
+    except Exception:
+        if close_conn:
+            conn.rollback()
+        raise
+    finally:
+        if close_conn:
+            conn.close()
+    return len(entries)
+
+
+def compact_journal(conn=None):
+    """
+    すべての購読者が処理済みの変更ジャーナルを削除
+    テーブル・シーズンごとの最新の記録は残すため、get_table_versions の値は変わらない。
+    購読者が未登録の場合は何も削除しない。
+    Returns:
+        削除した記録の件数
+    """
+    close_conn = False
+    if conn is None:
+        conn = get_connection()
+        close_conn = True
+    cursor = conn.cursor()
+    cursor.execute("SELECT MIN(last_seq) FROM journal_subscribers")
+    min_seq = cursor.fetchone()[0]
+    deleted = 0
+    if min_seq is not None:
+        cursor.execute("""
+            DELETE FROM change_journal
+            WHERE seq <= ?
+                AND seq NOT IN (
+                    SELECT MAX(seq) FROM change_journal GROUP BY table_name, season
+                )
+        """, (min_seq,))
+        deleted = cursor.rowcount
+    if close_conn:
+        conn.commit()
+        conn.close()
+    return deleted
+
+
+def _refresh_roster_aggregates(entries, conn):
+    """所属チーム・チーム名が変わったシーズンのチーム別集計を再構築"""
+    for season in sorted(set(entries["season"].dropna().astype(int).tolist())):
+        rebuild_pair_stats(conn, season)
+        rebuild_game_cube(conn, season)
+        rebuild_team_season_points(conn, season)
+
+
+def sync_derived_tables(conn=None):
+    """
+    選手の所属チーム・チーム名の変更を集計テーブル（pair_stats・game_cube・team_season_points）に反映
+    半荘記録の変更は保存時に差分反映済みのため、ここでは変更のあったシーズンだけを再構築する
+    処理後、すべての購読者が処理済みの変更ジャーナルを削除する（compact_journal）。
+    半荘記録の保存・修正・削除・一括インポートでも呼び、変更ジャーナルが際限なく増えないようにする
+    Returns:
+        処理した変更ジャーナルの件数
+    """
+    processed = consume_journal(
+        "derived_tables", _refresh_roster_aggregates,
+        tables=["player_teams", "team_names"], conn=conn)
+    compact_journal(conn)
+    return processed
+
+
+# ========== グループ別ランキング集計 ==========
+
+def compute_group_breakdown(df, group_col, entity_cols):
+    """
+    group_col（試合番号など）× 選手/チームごとの成績を1回の groupby で集計し、
+    group_col の値ごとに切り出した DataFrame の dict を返す
+    Args:
+        df: points, rank と group_col, entity_cols を含む半荘記録
+        group_col: 分割するキー（例: 'game_number'）
+        entity_cols: 集計単位（例: ['player_id', 'player_name']）
+    Returns:
+        {group_col の値: entity_cols, cumulative_points, avg_points, games, avg_rank,
+                         1位, 2位, 3位, 4位, 1位率 の DataFrame}
+    """
+    work = df[[group_col] + entity_cols + ['points', 'rank']].copy()
+    for i in range(1, 5):
+        work[f'{i}位'] = (work['rank'] == i).astype(int)
+
+    stats = work.groupby([group_col] + entity_cols).agg(
+        cumulative_points=('points', 'sum'),
+        avg_points=('points', 'mean'),
+        games=('points', 'count'),
+        avg_rank=('rank', 'mean'),
+        **{f'{i}位': (f'{i}位', 'sum') for i in range(1, 5)}
+    ).reset_index()
+    stats['1位率'] = (stats['1位'] / stats['games'] * 100).round(1)
+
+    return {
+        key: group.drop(columns=group_col).reset_index(drop=True)
+        for key, group in stats.groupby(group_col)
+    }
+
+
+# ========== 連続記録 ==========
+
+def get_game_records(season=None, conn=None):
+    """
+    選手ごとの半荘記録を時系列順に取得（連続記録・グループ別集計用。season=None で全期間）
+    Returns:
+        player_id, player_name, season, game_date, game_number, seat_name, rank, points,
+        team_id, team_name（その対局シーズンの所属チーム）
+    """
+    close_conn = False
+    if conn is None:
+        conn = get_connection()
+        close_conn = True
+
+    query = """
+        SELECT
+            gr.player_id,
+            p.player_name,
+            gr.season,
+            gr.game_date,
+            gr.game_number,
+            gr.seat_name,
+            gr.rank,
+            gr.points,
+            pt.team_id,
+            tn.team_name
+        FROM game_results gr
+        JOIN players p ON gr.player_id = p.player_id
+        JOIN player_teams pt ON gr.player_id = pt.player_id AND gr.season = pt.season
+        JOIN team_names tn ON pt.team_id = tn.team_id AND pt.season = tn.season
+    """
+    params = ()
+    if season is not None:
+        query += " WHERE gr.season = ?"
+        params = (season,)
+    query += " ORDER BY gr.season, gr.game_date, gr.game_number, gr.player_id"
+
+    df = pd.read_sql_query(query, conn, params=params)
+    if close_conn:
+        conn.close()
+    return df
+
+
+def compute_streaks(df, entity_cols, condition):
+    """
+    選手/チームごとに condition を満たす対局が連続した記録を集計
+    Args:
+        df: entity_cols と season, game_date, game_number, rank を含む半荘記録
+        entity_cols: [ID列, 名前列]（例: ['player_id', 'player_name']）
+        condition: 順位を受け取り、連続記録に数える対局なら True を返す関数
+    Returns:
+        (現在進行中の記録, 歴代の記録) の DataFrame。いずれも
+        entity_cols, streak, start_date, end_date, season_start, season_end,
+        is_active, current_streak, rank（記録の順位）を持つ
+    """
+    id_col, name_col = entity_cols
+    ordered = df.sort_values([id_col, 'season', 'game_date', 'game_number'], kind='stable')
+
+    all_streaks = []
+
+    def close_streak(is_active):
+        all_streaks.append({
+            id_col: entity_id,
+            name_col: entity_name,
+            'streak': streak,
+            'start_date': start_date,
+            'end_date': last_date,
+            'season_start': start_season,
+            'season_end': last_season,
+            'is_active': is_active,
+            'current_streak': streak if is_active else 0
+        })
+
+    # 1行ずつ（エンティティごと・時系列順）たどり、条件を満たす対局の連続を数える
+    entity_id = None
+    streak = 0
+    rows = zip(ordered[id_col], ordered[name_col], ordered['season'],
+               ordered['game_date'], ordered['rank'])
+    for row_id, row_name, season, game_date, rank in rows:
+        if row_id != entity_id:
+            if streak > 0:
+                close_streak(is_active=True)
+            entity_id, entity_name = row_id, row_name
+            streak = 0
+
+        if condition(rank):
+            if streak == 0:
+                start_date, start_season = game_date, season
+            streak += 1
+        elif streak > 0:
+            close_streak(is_active=False)
+            streak = 0
+        last_date, last_season = game_date, season
+
+    if streak > 0:
+        close_streak(is_active=True)
+
+    streaks_df = pd.DataFrame(all_streaks)
+
+    if streaks_df.empty:
+        return pd.DataFrame(), pd.DataFrame()
+
+    current_streaks = streaks_df[streaks_df['is_active']].copy()
+
+    if not current_streaks.empty:
+        current_streaks = current_streaks.sort_values(
+            ['current_streak', 'start_date'],
+            ascending=[False, False]
+        ).reset_index(drop=True)
+        current_streaks['rank'] = range(1, len(current_streaks) + 1)
+
+    all_time_streaks = streaks_df.sort_values(
+        ['streak', 'start_date'],
+        ascending=[False, False]
+    ).reset_index(drop=True)
+    all_time_streaks['rank'] = range(1, len(all_time_streaks) + 1)
+
+    return current_streaks, all_time_streaks
+
+
+# ========== 対局時間 ==========
+
+def parse_time_minutes(times):
+    """HH:MM形式の時刻の列を 0時からの経過分に一括変換（解析できない値は NaN）"""
+    parts = pd.Series(times, dtype=object).astype(str).str.extract(r"^\s*(\d+):(\d+)\s*$")
+    hours = pd.to_numeric(parts[0], errors="coerce")
+    minutes = pd.to_numeric(parts[1], errors="coerce")
+    return (hours * 60 + minutes).to_numpy(dtype=float)
+
+
+def calc_durations(start_times, end_times):
+    """開始・終了時刻の列から対局時間（分）を一括計算（日をまたぐ場合に対応、計算できなければ NaN）"""
+    import numpy as np
+    duration = parse_time_minutes(end_times) - parse_time_minutes(start_times)
+    # 日をまたぐ場合（負の値になる場合）は24時間を加算
+    return np.where(duration < 0, duration + 24 * 60, duration)
+
+
+def calc_duration_minutes(start_time, end_time):
+    """HH:MM形式の時刻から対局時間（分）を計算（1対局分。計算できなければ None）"""
+    duration = calc_durations([start_time], [end_time])[0]
+    return None if pd.isna(duration) else int(duration)
+
+
+def format_duration(minutes):
+    """分を H:MM 形式に変換"""
+    if minutes is None or pd.isna(minutes):
+        return "-"
+    hours = int(minutes // 60)
+    mins = int(minutes % 60)
+    return f"{hours}:{mins:02d}"
+
+
+def backfill_durations(conn=None):
+    """game_results.duration_minutes を start_time / end_time から再計算"""
+    close_conn = False
+    if conn is None:
+        conn = get_connection()
+        close_conn = True
+    df = pd.read_sql_query("SELECT id, start_time, end_time FROM game_results", conn)
+    durations = calc_durations(df["start_time"], df["end_time"])
+    conn.executemany(
+        "UPDATE game_results SET duration_minutes = ? WHERE id = ?",
+        [(None if pd.isna(d) else int(d), int(row_id)) for d, row_id in zip(durations, df["id"])]
+    )
+    if close_conn:
+        conn.commit()
+        conn.close()
+
+
+def get_game_durations(season=None):
+    """
+    対局ごとの対局時間を取得（season=None で全期間）
+    Returns:
+        season, game_date, table_type, game_number, start_time, end_time,
+        duration_minutes, start_hour（開始時刻の時）, lineup（対局者を名前順に連結）
+    """
+    query = """
+        SELECT
+            gr.season,
+            gr.game_date,
+            gr.table_type,
+            gr.game_number,
+            MIN(gr.start_time) AS start_time,
+            MIN(gr.end_time) AS end_time,
+            MIN(gr.duration_minutes) AS duration_minutes,
+            GROUP_CONCAT(p.player_name, '|') AS players
+        FROM game_results gr
+        JOIN players p ON gr.player_id = p.player_id
+        WHERE gr.duration_minutes IS NOT NULL
+    """
+    params = ()
+    if season is not None:
+        query += " AND gr.season = ?"
+        params = (season,)
+    query += " GROUP BY gr.season, gr.game_date, gr.table_type, gr.game_number"
+
+    conn = get_connection()
+    df = pd.read_sql_query(query, conn, params=params)
+    conn.close()
+
+    df["start_hour"] = parse_time_minutes(df["start_time"]) // 60
+    df["lineup"] = df["players"].str.split("|").apply(lambda names: ", ".join(sorted(names)))
+    return df.drop(columns="players")
+
+
+# ========== 半荘記録の保存 ==========
+
+# game_results の一意キー（1対局 × 1席 = 1行）。init_db.py の一意インデックスと対応
+GAME_RESULT_KEY = ("season", "game_date", "table_type", "game_number", "seat_name")
+
+# 登録済みの行は内容が変わった場合だけ書き換える（変わらない行で変更ジャーナルを進めない）
+UPSERT_GAME_RESULT_SQL = f"""
+    INSERT INTO game_results (
+        season, game_date, table_type, game_number,
+        seat_name, player_id, points, rank,
+        start_time, end_time, rating_calculated, duration_minutes
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT ({", ".join(GAME_RESULT_KEY)}) DO UPDATE SET
+        player_id = excluded.player_id,
+        points = excluded.points,
+        rank = excluded.rank,
+        start_time = excluded.start_time,
+        end_time = excluded.end_time,
+        rating_calculated = excluded.rating_calculated,
+        duration_minutes = excluded.duration_minutes
+    WHERE player_id IS NOT excluded.player_id
+        OR points IS NOT excluded.points
+        OR rank IS NOT excluded.rank
+        OR start_time IS NOT excluded.start_time
+        OR end_time IS NOT excluded.end_time
+"""
+
+
+def get_next_game_number(season, game_date, table_type, conn=None):
+    """対局日・卓区分で未使用の次の対局番号（登録済みの最大の番号 + 1）"""
+    close_conn = False
+    if conn is None:
+        conn = get_connection()
+        close_conn = True
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT COALESCE(MAX(game_number), 0) + 1
+        FROM game_results
+        WHERE season = ? AND game_date = ? AND table_type = ?
+    """, (season, game_date, table_type))
+    next_number = cursor.fetchone()[0]
+    if close_conn:
+        conn.close()
+    return next_number
+
+
+def record_game(season, game_date, table_type, game_number, entries,
+                start_time=None, end_time=None, overwrite=False, conn=None):
+    """
+    1対局（4人分）の結果を保存し、集計テーブル・レーティング・履歴・計算済みフラグまで
+    1つのトランザクションで反映する（保存後の再読み込みなし）
+    同じ内容（結果・開始／終了時刻）で再実行しても何も書き込まない（二重送信は 'unchanged' になり、
+    変更ジャーナルも進めない）。
+    同じ対局キーに異なる内容が登録済みの場合は、overwrite=True のときだけ上書きする。
+    Args:
+        entries: seat, player_id, points, rank をキーに持つ dict のリスト（4人分）
+        start_time, end_time: HH:MM形式の開始・終了時刻（任意）
+        overwrite: 登録済みの異なる内容を上書きする
+        conn: 既存コネクションを使う場合は指定（なければ内部で開閉・コミット）
+    Returns:
+        'inserted': 新規登録（レーティング計算済み）
+        'unchanged': 登録済みと同じ内容（何も書き込まない）
+        'updated': 登録済みの内容を上書き（結果が変わった場合はレーティング再計算が必要。
+                   時刻だけの変更ではレーティングは据え置き）
+        'conflict': 登録済みの異なる内容があるため保存しなかった（overwrite=False の場合）
+    Raises:
+        ValueError: 卓種別・試合番号が未指定（NULL のキーは一意インデックスで重複を防げない）
+    """
+    if table_type is None or game_number is None:
+        raise ValueError("卓種別と試合番号は必須です")
+
+    close_conn = False
+    if conn is None:
+        conn = get_connection()
+        close_conn = True
+    cursor = conn.cursor()
+    duration = calc_duration_minutes(start_time, end_time)
+
+    try:
+        cursor.execute("""
+            SELECT seat_name, player_id, points, rank, start_time, end_time, rating_calculated
+            FROM game_results
+            WHERE season = ? AND game_date = ? AND table_type IS ? AND game_number IS ?
+        """, (season, game_date, table_type, game_number))
+        existing = {row[0]: row[1:] for row in cursor.fetchall()}
+        results = {e['seat']: (e['player_id'], e['points'], e['rank']) for e in entries}
+        same_results = {seat: row[:3] for seat, row in existing.items()} == results
+        same_times = all(row[3:5] == (start_time, end_time) for row in existing.values())
+
+        if not existing:
+            status, rating_flag = 'inserted', 1
+        elif same_results and same_times:
+            # 二重送信：書き込まない（集計・変更ジャーナル・キャッシュのバージョンを動かさない）
+            return 'unchanged'
+        elif not overwrite:
+            return 'conflict'
+        elif same_results:
+            # 時刻だけの変更：レーティングは有効なまま
+            status, rating_flag = 'updated', min(row[5] for row in existing.values())
+        else:
+            status, rating_flag = 'updated', 0
+
+        # 同一対局キーの既存記録があれば集計テーブルから一旦差し引く
+        update_aggregates_for_game(cursor, season, game_date, table_type, game_number, sign=-1)
+
+        cursor.executemany(UPSERT_GAME_RESULT_SQL, [
+            (season, game_date, table_type, game_number,
+             e['seat'], e['player_id'], e['points'], e['rank'],
+             start_time, end_time, rating_flag, duration)
+            for e in entries
+        ])
+
+        update_aggregates_for_game(cursor, season, game_date, table_type, game_number)
+
+        if status == 'inserted':
+            # レーティングは席名順（従来の ORDER BY seat_name と同じ並び）で計算
+            ordered = sorted(entries, key=lambda e: e['seat'])
+            update_ratings_for_game(
+                [e['player_id'] for e in ordered], [e['rank'] for e in ordered],
+                season, game_date, game_number, conn=conn)
+
+        # 購読者を最新まで進め、処理済みの変更ジャーナルを削除
+        sync_derived_tables(conn)
+
+        if close_conn:
+            conn.commit()
+    except Exception:
+        if close_conn:
+            conn.rollback()
+        raise
+    finally:
+        if close_conn:
+            conn.close()
+    return status
+
+
+# ========== 対局の検索（編集画面） ==========
+# シーズン内の全対局を読み込まず、索引 idx_game_results_browse
+# （season, game_date, game_number, table_type）の順に新しい対局から1ページ分だけ読む。
+# 次のページは前のページの最後の対局キーより古い対局から続けて読む（キーセット方式）。
+
+# 対局一覧の1ページあたりの件数
+GAME_PAGE_SIZE = 20
+
+# 席の並び順
+SEAT_ORDER_SQL = """
+    CASE seat_name
+        WHEN '東' THEN 1
+        WHEN '南' THEN 2
+        WHEN '西' THEN 3
+        WHEN '北' THEN 4
+    END
+"""
+
+
+def _read_games_with_players(conn, games_sql, params):
+    """
+    games_sql で選んだ対局の記録だけを結合し、1対局1行にまとめる
+    Args:
+        games_sql: season, game_date, table_type, game_number を
+                   1対局1行で返すクエリ（新しい順・件数を絞ったもの）
+    Returns:
+        DataFrame(season, game_date, table_type, game_number, start_time, end_time,
+                  player_count, players, results)（games_sql の並び順）
+        players は席順の選手名、results は順位順の「選手名(獲得pt)」（いずれも ", " 区切り）
+    """
+    df = pd.read_sql_query(f"""
+        WITH games AS ({games_sql})
+        SELECT games.*, gr.start_time, gr.end_time, gr.points, gr.rank, p.player_name
+        FROM games
+        JOIN game_results gr
+            ON gr.season = games.season AND gr.game_date = games.game_date
+            AND gr.table_type IS games.table_type AND gr.game_number IS games.game_number
+        JOIN players p ON gr.player_id = p.player_id
+        ORDER BY games.game_date DESC, games.game_number DESC, games.table_type DESC, {SEAT_ORDER_SQL}
+    """, conn, params=params)
+
+    key = ["season", "game_date", "table_type", "game_number"]
+    df["game"] = df.groupby(key, sort=False, dropna=False).ngroup()
+    df["result"] = df["player_name"] + "(" + df["points"].map("{:+.1f}".format) + ")"
+    by_game = df.groupby("game")
+
+    games = df.drop_duplicates("game").set_index("game")[key]
+    games["start_time"] = by_game["start_time"].min()
+    games["end_time"] = by_game["end_time"].min()
+    games["player_count"] = by_game.size()
+    games["players"] = by_game["player_name"].agg(", ".join)
+    games["results"] = df.sort_values(["game", "rank"]).groupby("game")["result"].agg(", ".join)
+    return games.reset_index(drop=True)
+
+
+def search_games(season, after=None, player_id=None, team_id=None,
+                 date_from=None, date_to=None, page_size=GAME_PAGE_SIZE, conn=None):
+    """
+    シーズンの対局を新しい順に1ページ分取得
+    Args:
+        after: 前のページの最後の対局の (game_date, game_number, table_type)。None で先頭ページ
+        player_id: この選手が参加した対局に絞る
+        team_id: このチーム（シーズン時点の所属）の選手が参加した対局に絞る
+        date_from, date_to: 対局日の範囲（YYYY-MM-DD、両端を含む）
+    Returns:
+        (対局の DataFrame（_read_games_with_players の列）, 次ページの有無)
+    """
+    close_conn = False
+    if conn is None:
+        conn = get_connection()
+        close_conn = True
+
+    conditions = ["g.season = ?"]
+    params = [season]
+    if after is not None:
+        conditions.append("(g.game_date, g.game_number, g.table_type) < (?, ?, ?)")
+        params.extend(after)
+    if date_from is not None:
+        conditions.append("g.game_date >= ?")
+        params.append(str(date_from))
+    if date_to is not None:
+        conditions.append("g.game_date <= ?")
+        params.append(str(date_to))
+    if player_id is not None or team_id is not None:
+        member_conditions = [
+            "m.season = g.season", "m.game_date = g.game_date",
+            "m.table_type IS g.table_type", "m.game_number IS g.game_number"
+        ]
+        if player_id is not None:
+            member_conditions.append("m.player_id = ?")
+            params.append(int(player_id))
+        if team_id is not None:
+            member_conditions.append(
+                "m.player_id IN (SELECT player_id FROM player_teams WHERE season = g.season AND team_id = ?)")
+            params.append(int(team_id))
+        conditions.append(
+            f"EXISTS (SELECT 1 FROM game_results m WHERE {' AND '.join(member_conditions)})")
+
+    # 1件多く読んで次ページの有無を判定し、選手名は絞り込んだ対局の分だけ結合する
+    # GROUP BY・ORDER BY を索引の列順に揃え、索引を逆順にたどって LIMIT 件で打ち切る
+    games = _read_games_with_players(conn, f"""
+        SELECT g.season, g.game_date, g.table_type, g.game_number
+        FROM game_results g
+        WHERE {' AND '.join(conditions)}
+        GROUP BY g.season, g.game_date, g.game_number, g.table_type
+        ORDER BY g.season DESC, g.game_date DESC, g.game_number DESC, g.table_type DESC
+        LIMIT ?
+    """, params + [page_size + 1])
+
+    if close_conn:
+        conn.close()
+
+    return games.head(page_size), len(games) > page_size
+
+
+def get_game_detail(season, game_date, table_type, game_number, conn=None):
+    """
+    1対局の4人分の記録と、その対局のレーティング（対局前・対局後）を1回のクエリで取得
+    レーティング履歴がない選手は現在のレート（未登録なら1500）を前後とも返す
+    Returns:
+        DataFrame(id, seat_name, player_name, player_id, points, rank,
+                  start_time, end_time, rating_before, rating_after)（席順）
+    """
+    close_conn = False
+    if conn is None:
+        conn = get_connection()
+        close_conn = True
+
+    df = pd.read_sql_query(f"""
+        SELECT
+            gr.id,
+            gr.seat_name,
+            p.player_name,
+            gr.player_id,
+            gr.points,
+            gr.rank,
+            gr.start_time,
+            gr.end_time,
+            COALESCE(rh.old_rating, pr.rating, 1500.0) as rating_before,
+            COALESCE(rh.new_rating, pr.rating, 1500.0) as rating_after
+        FROM game_results gr
+        JOIN players p ON gr.player_id = p.player_id
+        LEFT JOIN rating_history rh ON rh.id = (
+            SELECT MIN(h.id) FROM rating_history h
+            WHERE h.player_id = gr.player_id
+                AND h.game_date = gr.game_date
+                AND h.game_number = gr.game_number
+        )
+        LEFT JOIN player_ratings pr ON gr.player_id = pr.player_id
+        WHERE gr.season = ?
+            AND gr.game_date = ?
+            AND gr.table_type IS ?
+            AND gr.game_number IS ?
+        ORDER BY {SEAT_ORDER_SQL}
+    """, conn, params=(season, game_date, table_type, game_number))
+
+    if close_conn:
+        conn.close()
+    return df
+
+
+# ========== 最近の対局 ==========
+# 索引の新しい順に最新N対局のキーだけを先に読み、選手名はその対局の分だけ結合する。
+# 対局数が増えても読む行数は表示する対局数に比例する。
+# シーズン指定時は idx_game_results_browse、全シーズンでは idx_game_results_recent を使う。
+
+# 最近の対局の既定の件数
+RECENT_GAMES_LIMIT = 10
+
+
+def get_recent_games(limit=RECENT_GAMES_LIMIT, season=None, conn=None):
+    """
+    最近の対局を新しい順に取得
+    Args:
+        limit: 取得する対局数
+        season: 指定シーズンに絞る（None で全シーズン）
+    Returns:
+        DataFrame（_read_games_with_players の列）
+    """
+    close_conn = False
+    if conn is None:
+        conn = get_connection()
+        close_conn = True
+
+    # GROUP BY・ORDER BY を索引の列順に揃え、索引を逆順にたどって limit 件で打ち切る
+    if season is not None:
+        where, params = "WHERE season = ?", [int(season)]
+        columns = "season, game_date, game_number, table_type"
+    else:
+        where, params = "", []
+        columns = "game_date, game_number, table_type, season"
+    order = ", ".join(f"{column} DESC" for column in columns.split(", "))
+
+    games = _read_games_with_players(conn, f"""
+        SELECT {columns}
+        FROM game_results
+        {where}
+        GROUP BY {columns}
+        ORDER BY {order}
+        LIMIT ?
+    """, params + [int(limit)])
+
+    if close_conn:
+        conn.close()
+    return games
@@ -0,0 +1,420 @@
+#!/usr/bin/env python3
+"""
+合成リーグデータ生成スクリプト
+規模を変えた検証用データベース（選手・所属・半荘記録・集計テーブル）を生成します
+
+使い方:
+    python generate_league.py                                  # data/synthetic.db に既定の規模で生成
+    python generate_league.py --db data/large.db --seasons 13 --teams 160 --tables-per-day 40 --days 240
+    python generate_league.py --seed 7 --force                 # 乱数シードを指定し、既存ファイルを上書き
+    MLEAGUE_DB_PATH=data/synthetic.db streamlit run app.py     # 生成したデータでアプリを起動
+
+生成内容:
+- チーム（11チーム目以降は架空のチーム）と各シーズンのチーム名
+- 選手と各シーズンの所属（シーズンごとに移籍・引退と新人の加入）
+- レギュラー（1日に卓ごとの連戦）、セミファイナル、ファイナルの半荘記録
+  素点（合計10万点）から順位（同点は上家優先）とポイント（オカ・ウマ込み）を求めるため、
+  順位とポイントは常に整合する
+- 開始・終了時刻と対局時間、チーム・選手のペナルティ
+- 集計テーブル（直対・集計キューブ・選手成績・チームポイント）とレーティング
+
+1シーズンの半荘記録の行数 = (days × tables-per-day × games-per-day
+                            + セミファイナル・ファイナルの対局数) × 4
+"""
+
+import argparse
+import colorsys
+import contextlib
+import io
+import os
+import random
+import sqlite3
+import sys
+import time
+from datetime import date, timedelta
+
+import init_db
+from db import (
+    initialize_ratings_from_games, rebuild_aggregates, REGULAR_TABLE_TYPE
+)
+
+SEATS = ["東", "南", "西", "北"]
+
+# Mリーグのルール（25,000点持ち30,000点返し、ウマ 10-30。オカ20はトップに加算）
+START_SCORE = 25000
+RETURN_SCORE = 30000
+UMA = [50, 10, -10, -30]
+
+# 管理画面で選択できるシーズンの範囲（選手管理・シーズン更新ページの入力範囲）
+SEASON_MIN = 2018
+SEASON_MAX = 2030
+
+SEMIFINAL_TABLE_TYPE = "セミファイナル"
+FINAL_TABLE_TYPE = "ファイナル"
+
+# 一度に登録する半荘記録の行数
+INSERT_CHUNK_ROWS = 50000
+
+SURNAMES = [
+    "佐藤", "鈴木", "高橋", "田中", "伊藤", "渡辺", "山本", "中村", "小林", "加藤",
+    "吉田", "山田", "佐々木", "山口", "松本", "井上", "木村", "林", "清水", "山崎",
+    "森", "池田", "橋本", "阿部", "石川", "前田", "藤田", "小川", "岡田", "村上",
+]
+GIVEN_NAMES = [
+    "翔", "健", "誠", "亮", "大輔", "拓也", "直樹", "隆", "剛", "賢",
+    "美咲", "愛", "真由", "彩", "沙織", "理恵", "千尋", "遥", "葵", "結衣",
+]
+PRO_ORGS = ["日本プロ麻雀連盟", "日本プロ麻雀協会", "最高位戦日本プロ麻雀協会", "麻将連合", "RMU"]
+
+
+def parse_args(argv=None):
+    """コマンドライン引数を解析（argv=None で sys.argv。他のスクリプトからは引数のリストを渡す）"""
+    parser = argparse.ArgumentParser(description="合成リーグデータを生成")
+    parser.add_argument("--db", default="data/synthetic.db", help="出力するデータベースファイル")
+    parser.add_argument("--force", action="store_true", help="既存のファイルを削除して作り直す")
+    parser.add_argument("--seed", type=int, default=42, help="乱数シード（同じ値なら同じデータ）")
+    parser.add_argument("--start-season", type=int, default=2018, help="最初のシーズン")
+    parser.add_argument("--seasons", type=int, default=7, help="シーズン数")
+    parser.add_argument("--teams", type=int, default=8, help="チーム数（4の倍数 × tables-per-day 以上）")
+    parser.add_argument("--roster", type=int, default=4, help="1チームの選手数")
+    parser.add_argument("--days", type=int, default=60, help="1シーズンのレギュラー対局日数")
+    parser.add_argument("--tables-per-day", type=int, default=1, help="1日に同時に行う卓数")
+    parser.add_argument("--games-per-day", type=int, default=2, choices=[1, 2, 3],
+                        help="1卓あたりの1日の半荘数（2 = 連戦）")
+    parser.add_argument("--semifinal-days", type=int, default=10, help="セミファイナルの対局日数（0で省略）")
+    parser.add_argument("--final-days", type=int, default=6, help="ファイナルの対局日数（0で省略）")
+    parser.add_argument("--transfer-rate", type=float, default=0.1, help="シーズンごとの移籍率")
+    parser.add_argument("--retire-rate", type=float, default=0.05, help="シーズンごとの引退率（新人が加入）")
+    parser.add_argument("--penalty-rate", type=float, default=0.1, help="チーム・シーズンごとのペナルティ発生率")
+    parser.add_argument("--skip-ratings", action="store_true",
+                        help="レーティング計算を省略（後でデータ管理ページ等から計算）")
+    args = parser.parse_args(argv)
+
+    if args.teams < 4 * args.tables_per_day:
+        parser.error("--teams は 4 × --tables-per-day 以上にしてください")
+    if args.roster < 1 or args.seasons < 1:
+        parser.error("--roster と --seasons は 1 以上にしてください")
+    if args.start_season < SEASON_MIN or args.start_season + args.seasons - 1 > SEASON_MAX:
+        parser.error(f"シーズンは {SEASON_MIN}〜{SEASON_MAX} の範囲にしてください（管理画面で選択できる範囲）")
+    if args.days + args.semifinal_days + args.final_days > 360:
+        parser.error("1シーズンの対局日数の合計は 360 日以下にしてください")
+    return args
+
+
+# ========== チーム・選手 ==========
+
+def team_color(team_id):
+    """架空チームの色（色相をずらして生成）"""
+    r, g, b = colorsys.hsv_to_rgb((team_id * 0.137) % 1.0, 0.65, 0.8)
+    return f"#{int(r * 255):02x}{int(g * 255):02x}{int(b * 255):02x}"
+
+
+def setup_teams(cursor, args):
+    """
+    チームマスターを必要数まで追加し、全シーズンのチーム名を登録
+    Returns:
+        チームIDのリスト
+    """
+    cursor.execute("SELECT team_id, short_name FROM teams ORDER BY team_id")
+    teams = dict(cursor.fetchall())
+    cursor.execute("SELECT team_id, team_name FROM team_names ORDER BY season")
+    full_names = dict(cursor.fetchall())
+
+    extra_teams = [
+        (team_id, f"チーム{team_id}", team_color(team_id), args.start_season)
+        for team_id in range(len(teams) + 1, args.teams + 1)
+    ]
+    cursor.executemany("""
+        INSERT INTO teams (team_id, short_name, color, established)
+        VALUES (?, ?, ?, ?)
+    """, extra_teams)
+    teams.update({team_id: short_name for team_id, short_name, _, _ in extra_teams})
+
+    team_ids = sorted(teams)[:args.teams]
+    seasons = range(args.start_season, args.start_season + args.seasons)
+    cursor.execute("DELETE FROM team_names")
+    cursor.executemany("""
+        INSERT INTO team_names (team_id, season, team_name)
+        VALUES (?, ?, ?)
+    """, [
+        (team_id, season, full_names.get(team_id, teams[team_id]))
+        for season in seasons for team_id in team_ids
+    ])
+    return team_ids
+
+
+class PlayerFactory:
+    """重複しない選手名と、選手ごとの実力（ポイントの期待値に影響）を生成"""
+
+    def __init__(self, rng):
+        self.rng = rng
+        self.next_id = 1
+        self.used_names = set()
+        self.rows = []
+        self.skill = {}
+
+    def create(self, season):
+        player_id = self.next_id
+        self.next_id += 1
+        name = f"{self.rng.choice(SURNAMES)}{self.rng.choice(GIVEN_NAMES)}"
+        if name in self.used_names:
+            name = f"{name}{player_id}"
+        self.used_names.add(name)
+        birth = date(season - self.rng.randint(22, 55), self.rng.randint(1, 12), self.rng.randint(1, 28))
+        self.rows.append((player_id, name, birth.isoformat(), self.rng.choice(PRO_ORGS)))
+        self.skill[player_id] = self.rng.gauss(0, 1)
+        return player_id
+
+
+def next_rosters(rosters, factory, season, args):
+    """
+    前シーズンの所属から移籍（別チームの選手と入れ替え）と引退（新人と交代）を反映
+    チームの人数は変わらない
+    """
+    rng = factory.rng
+    rosters = {team_id: list(players) for team_id, players in rosters.items()}
+    team_ids = list(rosters)
+
+    for team_id in team_ids:
+        for i in range(len(rosters[team_id])):
+            if rng.random() < args.retire_rate:
+                rosters[team_id][i] = factory.create(season)
+            elif rng.random() < args.transfer_rate:
+                other = rng.choice([t for t in team_ids if t != team_id])
+                j = rng.randrange(len(rosters[other]))
+                rosters[team_id][i], rosters[other][j] = rosters[other][j], rosters[team_id][i]
+    return rosters
+
+
+# ========== 対局 ==========
+
+def game_dates(season, count):
+    """
+    シーズンの対局日（10月1日から）。日数が少なければ月・火・木・金のみ、多ければ毎日
+    """
+    weekdays = {0, 1, 3, 4} if count <= 180 else set(range(7))
+    current = date(season, 10, 1)
+    dates = []
+    while len(dates) < count:
+        if current.weekday() in weekdays:
+            dates.append(current.isoformat())
+        current += timedelta(days=1)
+    return dates
+
+
+def play_game(rng, skill, player_ids):
+    """
+    1半荘の素点・順位・ポイントを生成（席順は player_ids の順）
+    Returns:
+        [(points, rank), ...]（席順）
+    """
+    raw = [rng.gauss(0, 11000) + 1500 * skill[pid] for pid in player_ids]
+    mean = sum(raw) / 4
+    scores = [int(round((START_SCORE + r - mean) / 100)) * 100 for r in raw[:3]]
+    scores.append(4 * START_SCORE - sum(scores))
+
+    # 同点は上家（席順が先）を上位とする
+    order = sorted(range(4), key=lambda i: (-scores[i], i))
+    results = [None] * 4
+    for rank, i in enumerate(order, start=1):
+        points = round((scores[i] - RETURN_SCORE) / 1000 + UMA[rank - 1], 1)
+        results[i] = (points, rank)
+    return results
+
+
+def format_time(minutes):
+    """0時からの経過分を HH:MM に変換（日をまたぐ場合は翌日の時刻）"""
+    minutes %= 24 * 60
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def season_games(rng, season, rosters, skill, standings, args):
+    """
+    1シーズン分の半荘記録を生成
+    Args:
+        standings: {team_id: レギュラーのポイント合計}（プレーオフの進出チームの判定用。更新される）
+    Yields:
+        game_results の1行（1人分）
+    """
+    schedule = [(REGULAR_TABLE_TYPE, args.days)]
+    if args.semifinal_days:
+        schedule.append((SEMIFINAL_TABLE_TYPE, args.semifinal_days))
+    if args.final_days:
+        schedule.append((FINAL_TABLE_TYPE, args.final_days))
+    dates = iter(game_dates(season, sum(days for _, days in schedule)))
+
+    team_ids = list(rosters)
+    for table_type, days in schedule:
+        if table_type == REGULAR_TABLE_TYPE:
+            teams = team_ids
+        else:
+            # 上位チームが進出（セミファイナルは6割、ファイナルは4チーム）
+            ranked = sorted(team_ids, key=lambda t: -standings[t])
+            size = max(4, len(team_ids) * 6 // 10) if table_type == SEMIFINAL_TABLE_TYPE else 4
+            teams = ranked[:size]
+        tables = min(args.tables_per_day, len(teams) // 4)
+
+        for _ in range(days):
+            game_date = next(dates)
+            day_teams = rng.sample(teams, 4 * tables)
+            for table in range(tables):
+                table_teams = day_teams[4 * table:4 * table + 4]
+                start = 19 * 60 + rng.randint(-5, 10)
+                played = {team_id: set() for team_id in table_teams}
+                for game in range(args.games_per_day):
+                    # 同じ日の連戦は、なるべく別の選手が出場する
+                    player_ids = []
+                    for team_id in table_teams:
+                        candidates = [p for p in rosters[team_id] if p not in played[team_id]]
+                        player_id = rng.choice(candidates or rosters[team_id])
+                        played[team_id].add(player_id)
+                        player_ids.append(player_id)
+                    rng.shuffle(player_ids)
+
+                    duration = min(max(int(rng.gauss(75, 15)), 40), 130)
+                    start_time, end_time = format_time(start), format_time(start + duration)
+                    game_number = table * args.games_per_day + game + 1
+                    results = play_game(rng, skill, player_ids)
+                    for seat, player_id, (points, rank) in zip(SEATS, player_ids, results):
+                        if table_type == REGULAR_TABLE_TYPE:
+                            team_id = next(t for t in table_teams if player_id in rosters[t])
+                            standings[team_id] += points
+                        yield (season, game_date, table_type, game_number, seat, player_id,
+                               points, rank, start_time, end_time, duration)
+                    start += duration + rng.randint(15, 25)
+
+
+def insert_game_results(cursor, rows):
+    """半荘記録をまとめて登録（レーティングは後で一括計算するため未計算として登録）"""
+    cursor.executemany("""
+        INSERT INTO game_results (
+            season, game_date, table_type, game_number, seat_name, player_id,
+            points, rank, start_time, end_time, duration_minutes, rating_calculated
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 0)
+    """, rows)
+
+
+# ========== 生成 ==========
+
+def generate(args):
+    rng = random.Random(args.seed)
+    seasons = list(range(args.start_season, args.start_season + args.seasons))
+
+    # スキーマとチームマスターは init_db と同じものを使う
+    init_db.DB_PATH = args.db
+    with contextlib.redirect_stdout(io.StringIO()):
+        init_db.init_database(with_sample=False)
+
+    conn = sqlite3.connect(args.db)
+    conn.execute("PRAGMA synchronous = OFF")
+    cursor = conn.cursor()
+    started = time.perf_counter()
+
+    # 一括登録の間は変更ジャーナルに記録しない（結果の行数の数倍の記録で DB が膨らむため）。
+    # 生成したデータは新しいデータベースの初期状態として扱い、最後にトリガーを作り直す
+    init_db.drop_journal_triggers(cursor)
+
+    team_ids = setup_teams(cursor, args)
+    factory = PlayerFactory(rng)
+    rosters = {team_id: [factory.create(seasons[0]) for _ in range(args.roster)] for team_id in team_ids}
+
+    total_rows = 0
+    team_penalties = []
+    player_penalties = []
+    player_team_count = 0
+    registered_players = 0
+    for i, season in enumerate(seasons):
+        if i > 0:
+            rosters = next_rosters(rosters, factory, season, args)
+
+        # 新しく加入した選手とシーズンの所属を登録
+        cursor.executemany("""
+            INSERT INTO players (player_id, player_name, birth_date, pro_org)
+            VALUES (?, ?, ?, ?)
+        """, factory.rows[registered_players:])
+        registered_players = len(factory.rows)
+        player_team_rows = [
+            (player_id, team_id, season) for team_id, players in rosters.items() for player_id in players
+        ]
+        cursor.executemany("""
+            INSERT INTO player_teams (player_id, team_id, season)
+            VALUES (?, ?, ?)
+        """, player_team_rows)
+        player_team_count += len(player_team_rows)
+
+        standings = dict.fromkeys(team_ids, 0.0)
+        chunk = []
+        for row in season_games(rng, season, rosters, factory.skill, standings, args):
+            chunk.append(row)
+            if len(chunk) >= INSERT_CHUNK_ROWS:
+                insert_game_results(cursor, chunk)
+                total_rows += len(chunk)
+                chunk = []
+        insert_game_results(cursor, chunk)
+        total_rows += len(chunk)
+
+        # ペナルティはチームと、その原因になった選手の両方に記録する
+        for team_id in team_ids:
+            if rng.random() < args.penalty_rate:
+                penalty = -rng.choice([10.0, 20.0, 30.0])
+                team_penalties.append((season, team_id, penalty))
+                player_penalties.append((rng.choice(rosters[team_id]), season, penalty))
+
+        print(f"  {season}シーズン: {len(team_ids)}チーム / 累計 {total_rows:,}行")
+
+    cursor.executemany("""
+        INSERT INTO team_season_points (season, team_id, points, rank, penalty)
+        VALUES (?, ?, 0, 0, ?)
+    """, team_penalties)
+    cursor.executemany("""
+        INSERT INTO player_season_stats (player_id, season, penalty)
+        VALUES (?, ?, ?)
+    """, player_penalties)
+    conn.commit()
+    print(f"✓ 選手 {len(factory.rows):,}名 / 所属 {player_team_count:,}件 / "
+          f"ペナルティ {len(team_penalties)}件を登録しました（{time.perf_counter() - started:.1f}秒）")
+
+    step = time.perf_counter()
+    rebuild_aggregates(conn)
+    conn.commit()
+    print(f"✓ 集計テーブルを再構築しました（{time.perf_counter() - step:.1f}秒）")
+
+    if not args.skip_ratings:
+        step = time.perf_counter()
+        initialize_ratings_from_games(conn)
+        conn.commit()
+        print(f"✓ レーティングを計算しました（{time.perf_counter() - step:.1f}秒）")
+
+    init_db.create_journal_triggers(cursor)
+    conn.commit()
+    conn.close()
+    return total_rows, len(factory.rows), time.perf_counter() - started
+
+
+def main():
+    args = parse_args()
+
+    if os.path.exists(args.db):
+        if not args.force:
+            print(f"❌ {args.db} は既に存在します（上書きする場合は --force を指定）")
+            sys.exit(1)
+        os.remove(args.db)
+    os.makedirs(os.path.dirname(args.db) or ".", exist_ok=True)
+
+    print("=" * 60)
+    print(f"🎲 合成リーグデータを生成します（seed={args.seed}）")
+    print("=" * 60)
+    print(f"  出力: {args.db}")
+    print(f"  {args.seasons}シーズン × {args.teams}チーム × {args.roster}名、"
+          f"レギュラー{args.days}日 × {args.tables_per_day}卓 × {args.games_per_day}半荘")
+
+    total_rows, total_players, elapsed = generate(args)
+
+    print("\n" + "=" * 60)
+    print(f"✅ 生成が完了しました: 半荘記録 {total_rows:,}行 / 選手 {total_players:,}名（{elapsed:.1f}秒）")
+    print("=" * 60)
+    print(f"\nアプリで確認: MLEAGUE_DB_PATH={args.db} streamlit run app.py")
+
+
+if __name__ == "__main__":
+    main()
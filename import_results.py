@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+"""
+半荘記録の一括インポートスクリプト
+CSV / JSON 形式の対局結果をまとめて game_results に取り込みます
+
+使い方:
+    python import_results.py results_2019.csv results_2020.jsonl
+    python import_results.py --dry-run results_2019.csv   # 検証のみ（登録しない）
+    python import_results.py --restart results_2019.csv   # 進捗を破棄して最初から取り込む
+
+ファイルの列（1行 = 1人分の半荘結果、同じ対局の4行は連続して並べる）:
+    season, game_date, table_type, game_number, seat_name,
+    player_name（または player_id）, points, rank, start_time, end_time（任意）
+
+ファイルはチャンク単位で逐次読み込み、チャンクごとに登録と進捗（import_checkpoints）の
+記録を1トランザクションでコミットします。中断した場合は同じファイルを再実行すると
+続きから取り込みます。
+"""
+
+import argparse
+import io
+import json
+import os
+import time
+import pandas as pd
+from db import (
+    get_connection, get_players, calc_durations,
+    rebuild_aggregates, apply_pending_ratings, sync_derived_tables, GAME_RESULT_KEY
+)
+
+# 一度に読み込み・登録する行数（1チャンク = 1トランザクション）
+CHUNK_ROWS = 2000
+
+GAME_KEY = ["season", "game_date", "table_type", "game_number"]
+REQUIRED_COLUMNS = GAME_KEY + ["seat_name", "points", "rank"]
+SEAT_NAMES = ["東", "南", "西", "北"]
+
+# 登録済みの対局は上書きしない（再実行しても重複・変更が起きない）
+INSERT_SQL = f"""
+    INSERT INTO game_results (
+        season, game_date, table_type, game_number,
+        seat_name, player_id, points, rank,
+        start_time, end_time, rating_calculated, duration_minutes
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 0, ?)
+    ON CONFLICT ({", ".join(GAME_RESULT_KEY)}) DO NOTHING
+"""
+
+
+# ========== 読み込み ==========
+
+def _detect_format(source):
+    """ファイル名の拡張子から形式を判定（csv / json / jsonl）"""
+    name = source if isinstance(source, str) else getattr(source, "name", "")
+    ext = os.path.splitext(name)[1].lower()
+    if ext in (".jsonl", ".ndjson"):
+        return "jsonl"
+    if ext == ".json":
+        return "json"
+    return "csv"
+
+
+def source_id(source):
+    """進捗記録用のファイル識別子（ファイル名とサイズ）"""
+    if isinstance(source, str):
+        return f"{os.path.abspath(source)}:{os.path.getsize(source)}"
+    size = getattr(source, "size", None)
+    if size is None:
+        size = len(source.getvalue())
+    return f"{getattr(source, 'name', 'upload')}:{size}"
+
+
+def _iter_json_lines(source, chunk_rows, skip_rows):
+    """JSON Lines を1行ずつ読み、chunk_rows 行ごとに DataFrame にまとめる"""
+    if isinstance(source, str):
+        f = open(source, encoding="utf-8")
+    else:
+        f = io.TextIOWrapper(source, encoding="utf-8")
+    with f:
+        records = []
+        row = 0
+        for line in f:
+            if not line.strip():
+                continue
+            if row >= skip_rows:
+                records.append(json.loads(line))
+            row += 1
+            if len(records) == chunk_rows:
+                yield pd.DataFrame(records, index=range(row - len(records), row))
+                records = []
+        if records:
+            yield pd.DataFrame(records, index=range(row - len(records), row))
+
+
+def iter_chunks(source, chunk_rows=CHUNK_ROWS, skip_rows=0):
+    """
+    ファイル（パスまたはファイルオブジェクト）を chunk_rows 行ずつ DataFrame で返すジェネレータ
+    index はファイル先頭からの行番号（0始まり）で、先頭 skip_rows 行は読み飛ばす
+    CSV と JSON Lines は逐次読み込み、JSON配列はまとめて読み込んでから分割する
+    """
+    fmt = _detect_format(source)
+    if fmt == "csv":
+        reader = pd.read_csv(
+            source, chunksize=chunk_rows, dtype=str, keep_default_na=False,
+            skiprows=range(1, skip_rows + 1))
+        for chunk in reader:
+            chunk.index = chunk.index + skip_rows
+            yield chunk
+    elif fmt == "jsonl":
+        yield from _iter_json_lines(source, chunk_rows, skip_rows)
+    else:
+        if isinstance(source, str):
+            with open(source, encoding="utf-8") as f:
+                records = json.load(f)
+        else:
+            records = json.load(source)
+        for start in range(skip_rows, len(records), chunk_rows):
+            batch = records[start:start + chunk_rows]
+            yield pd.DataFrame(batch, index=range(start, start + len(batch)))
+
+
+def iter_game_chunks(chunks):
+    """
+    チャンク境界で対局が分断されないよう、末尾の対局を次のチャンクへ持ち越す
+    """
+    carry = None
+    for chunk in chunks:
+        if carry is not None:
+            chunk = pd.concat([carry, chunk])
+        if chunk.empty:
+            continue
+        last_key = chunk[GAME_KEY].astype(str).agg("|".join, axis=1)
+        is_last = (last_key == last_key.iloc[-1]).to_numpy()
+        carry = chunk[is_last]
+        if (~is_last).any():
+            yield chunk[~is_last]
+    if carry is not None and not carry.empty:
+        yield carry
+
+
+# ========== 正規化・検証 ==========
+
+def normalize_chunk(df, name_to_id):
+    """列の型をそろえ、選手名を player_id に変換し、対局時間を計算する"""
+    missing = [c for c in REQUIRED_COLUMNS if c not in df.columns]
+    if "player_name" not in df.columns and "player_id" not in df.columns:
+        missing.append("player_name")
+    if missing:
+        raise ValueError(f"必須列がありません: {', '.join(missing)}")
+
+    out = pd.DataFrame({
+        "season": pd.to_numeric(df["season"], errors="coerce").astype("Int64"),
+        "game_date": pd.to_datetime(df["game_date"], errors="coerce").dt.strftime("%Y-%m-%d"),
+        "table_type": df["table_type"].astype(str).str.strip(),
+        "game_number": pd.to_numeric(df["game_number"], errors="coerce").astype("Int64"),
+        "seat_name": df["seat_name"].astype(str).str.strip(),
+        "points": pd.to_numeric(df["points"], errors="coerce"),
+        "rank": pd.to_numeric(df["rank"], errors="coerce").astype("Int64"),
+    })
+
+    # 卓種別の欠損・空文字は NULL として検証で弾く
+    out["table_type"] = out["table_type"].where(df["table_type"].notna() & (out["table_type"] != ""), None)
+
+    # 選手名 → player_id（名前がなければ player_id 列をそのまま使う）
+    if "player_name" in df.columns:
+        out["player_name"] = df["player_name"].astype(str).str.strip()
+        out["player_id"] = out["player_name"].map(name_to_id).astype("Int64")
+    else:
+        out["player_name"] = df["player_id"].astype(str)
+        out["player_id"] = pd.to_numeric(df["player_id"], errors="coerce").astype("Int64")
+
+    for col in ("start_time", "end_time"):
+        if col in df.columns:
+            values = df[col].astype(str).str.strip()
+            out[col] = values.where(values.str.match(r"^\d+:\d+$"), None)
+        else:
+            out[col] = None
+    out["duration_minutes"] = calc_durations(out["start_time"], out["end_time"])
+    return out
+
+
+def validate_games(df):
+    """
+    対局単位の整合性を一括検証
+    - 4人分の行がそろっている（席・選手の重複なし）
+    - 日付・シーズン・卓種別・試合番号・素点・着順・選手名が解決できている
+      （キーが NULL だと一意インデックスで重複を検出できないため空は不正扱い）
+    - 素点の合計がほぼ0
+    - 着順が1〜4で、素点の大小と矛盾しない（同点は席順で決まるため範囲で判定）
+    Returns:
+        各行の不正理由（正常な行は空文字）の Series
+    """
+    import numpy as np
+    key = df[GAME_KEY].astype(str).fillna("").agg("|".join, axis=1)
+    g = df.groupby(key, sort=False)
+
+    reasons = pd.DataFrame(index=df.index)
+    reasons["人数"] = g["seat_name"].transform("size") != 4
+    reasons["席重複"] = (g["seat_name"].transform("nunique") != 4) | ~df["seat_name"].isin(SEAT_NAMES)
+    reasons["選手重複"] = (df["player_id"].notna() & (key + "|" + df["player_id"].astype(str))
+                       .duplicated(keep=False)).groupby(key).transform("any")
+    reasons["未登録選手"] = df["player_id"].isna().groupby(key).transform("any")
+    reasons["値不正"] = df[["season", "game_date", "table_type", "game_number", "points", "rank"]].isna() \
+        .groupby(key).transform("any").any(axis=1)
+
+    points_sum = g["points"].transform("sum")
+    reasons["素点合計"] = ~np.isclose(points_sum.fillna(np.inf), 0, atol=0.05)
+
+    rank = df["rank"].astype(float)
+    best = g["points"].rank(method="min", ascending=False)
+    worst = g["points"].rank(method="max", ascending=False)
+    rank_ok = rank.between(1, 4) & (rank >= best) & (rank <= worst)
+    reasons["着順"] = ~rank_ok.groupby(key).transform("all")
+
+    labels = np.array(reasons.columns)
+    flags = reasons.fillna(True).to_numpy(dtype=bool)
+    return pd.Series([",".join(labels[row]) for row in flags], index=df.index)
+
+
+# ========== 登録 ==========
+
+def _existing_game_keys(conn, df):
+    """チャンクの日付範囲にある登録済みの対局キー（season, game_date, table_type, game_number）の集合"""
+    dates = df["game_date"].dropna()
+    if dates.empty:
+        return set()
+    rows = conn.execute("""
+        SELECT DISTINCT season, game_date, table_type, game_number FROM game_results
+        WHERE game_date BETWEEN ? AND ?
+    """, (dates.min(), dates.max())).fetchall()
+    return {"|".join(str(v) for v in row) for row in rows}
+
+
+def get_checkpoint(conn, source):
+    """取り込み進捗（rows_done, games, status）を取得（未記録なら None）"""
+    return conn.execute("""
+        SELECT rows_done, games, status FROM import_checkpoints WHERE source = ?
+    """, (source,)).fetchone()
+
+
+def _save_checkpoint(conn, source, rows_done, games, status="running"):
+    conn.execute("""
+        INSERT INTO import_checkpoints (source, rows_done, games, status, updated_at)
+        VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+        ON CONFLICT (source) DO UPDATE SET
+            rows_done = excluded.rows_done,
+            games = import_checkpoints.games + excluded.games,
+            status = excluded.status,
+            updated_at = excluded.updated_at
+    """, (source, rows_done, games, status))
+
+
+def import_results(sources, dry_run=False, chunk_rows=CHUNK_ROWS, restart=False,
+                   progress=None, conn=None):
+    """
+    CSV / JSON の半荘記録をまとめて取り込む
+    チャンクごとに executemany で登録し、進捗（読み終えた行数）と一緒にコミットする。
+    中断後に同じファイルで再実行すると、記録された行数の続きから取り込む。
+    最後に集計テーブルの再構築と未計算対局のレーティング計算を一括で行う
+    Args:
+        sources: ファイルパスまたはファイルオブジェクトのリスト
+        dry_run: True なら検証のみ行い登録しない（進捗も記録しない）
+        restart: True なら記録済みの進捗を破棄して先頭から取り込む
+        progress: チャンクごとに dict(source, rows, games, rows_per_sec) で呼ばれる関数
+    Returns:
+        dict(games, rows, rating_games, skipped_sources, errors)
+        skipped_sources は取り込み済みのため読み飛ばしたファイル
+        errors は取り込まなかった対局（GAME_KEY, reason）の DataFrame
+    """
+    close_conn = False
+    if conn is None:
+        conn = get_connection()
+        close_conn = True
+
+    players = get_players()
+    name_to_id = dict(zip(players["player_name"], players["player_id"]))
+
+    imported_games = 0
+    imported_rows = 0
+    processed_rows = 0
+    resumed = False
+    skipped_sources = []
+    errors = []
+    started = time.perf_counter()
+
+    for source in sources:
+        sid = source_id(source)
+        skip_rows = 0
+        if not dry_run:
+            if restart:
+                conn.execute("DELETE FROM import_checkpoints WHERE source = ?", (sid,))
+                conn.commit()
+            checkpoint = get_checkpoint(conn, sid)
+            if checkpoint is not None:
+                if checkpoint[2] == "done":
+                    skipped_sources.append(sid)
+                    continue
+                skip_rows = checkpoint[0]
+                resumed = True
+
+        rows_done = skip_rows
+        for raw in iter_game_chunks(iter_chunks(source, chunk_rows, skip_rows)):
+            df = normalize_chunk(raw, name_to_id)
+            reasons = validate_games(df)
+
+            key = df[GAME_KEY].astype(str).fillna("").agg("|".join, axis=1)
+            existing = _existing_game_keys(conn, df)
+            reasons = reasons.where(~key.isin(existing) | (reasons != ""), "登録済み")
+
+            invalid = reasons != ""
+            if invalid.any():
+                bad = df.loc[invalid, GAME_KEY].assign(reason=reasons[invalid])
+                errors.append(bad.drop_duplicates(GAME_KEY))
+
+            valid = df[~invalid]
+            chunk_games = valid[GAME_KEY].drop_duplicates().shape[0]
+            imported_games += chunk_games
+            imported_rows += len(valid)
+            processed_rows += len(df)
+            rows_done = int(df.index.max()) + 1
+
+            if not dry_run:
+                conn.executemany(INSERT_SQL, [
+                    (
+                        int(r.season), r.game_date, r.table_type, int(r.game_number),
+                        r.seat_name, int(r.player_id), float(r.points), int(r.rank),
+                        r.start_time, r.end_time,
+                        None if pd.isna(r.duration_minutes) else int(r.duration_minutes)
+                    )
+                    for r in valid.itertuples(index=False)
+                ])
+                _save_checkpoint(conn, sid, rows_done, chunk_games)
+                # 処理済みの変更ジャーナルをチャンクごとに削除（大量の取り込みでも増え続けない）
+                sync_derived_tables(conn)
+                conn.commit()
+
+            if progress is not None:
+                elapsed = time.perf_counter() - started
+                progress({
+                    "source": sid,
+                    "rows": processed_rows,
+                    "games": imported_games,
+                    "rows_per_sec": processed_rows / elapsed if elapsed > 0 else 0.0,
+                })
+
+        if not dry_run:
+            _save_checkpoint(conn, sid, rows_done, 0, status="done")
+            conn.commit()
+
+    # 集計テーブルとレーティングは最後にまとめて反映（中断後の再開時も必ず実行する）
+    rating_games = 0
+    if (imported_rows or resumed) and not dry_run:
+        rebuild_aggregates(conn)
+        rating_games = apply_pending_ratings(conn)
+        conn.commit()
+
+    if close_conn:
+        conn.close()
+
+    errors_df = pd.concat(errors, ignore_index=True) if errors else \
+        pd.DataFrame(columns=GAME_KEY + ["reason"])
+    return {
+        "games": imported_games,
+        "rows": imported_rows,
+        "rating_games": rating_games,
+        "skipped_sources": skipped_sources,
+        "errors": errors_df,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="半荘記録を CSV / JSON から一括インポート")
+    parser.add_argument("files", nargs="+", help="取り込むファイル（.csv / .json / .jsonl）")
+    parser.add_argument("--dry-run", action="store_true", help="検証のみ行い登録しない")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS, help="1トランザクションあたりの行数")
+    parser.add_argument("--restart", action="store_true", help="記録済みの進捗を破棄して最初から取り込む")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("📥 半荘記録の一括インポートを開始します" + ("（検証のみ）" if args.dry_run else ""))
+    print("=" * 60)
+
+    def report(stats):
+        print(f"\r⏳ {stats['rows']:,}行 / {stats['games']:,}対局 ({stats['rows_per_sec']:,.0f}行/秒)",
+              end="", flush=True)
+
+    result = import_results(
+        args.files, dry_run=args.dry_run, chunk_rows=args.chunk_rows,
+        restart=args.restart, progress=report)
+    print()
+
+    print(f"\n✅ インポート{'検証' if args.dry_run else ''}完了!")
+    print("\n📊 結果:")
+    print(f"  ├─ 取り込み対局数: {result['games']}対局")
+    print(f"  ├─ 取り込み行数: {result['rows']}行")
+    print(f"  ├─ レーティング計算対局数: {result['rating_games']}対局")
+    print(f"  ├─ スキップした対局数: {len(result['errors'])}対局")
+    print(f"  └─ 取り込み済みのファイル: {len(result['skipped_sources'])}件")
+
+    if not result["errors"].empty:
+        print("\n⚠️  スキップした対局:")
+        for row in result["errors"].itertuples(index=False):
+            print(f"   {row.season} {row.game_date} {row.table_type} 第{row.game_number}試合: {row.reason}")
+
+
+if __name__ == "__main__":
+    main()
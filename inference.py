@@ -0,0 +1,333 @@
+"""
+統計的検定モジュール
+
+席順別分析などで使用する検定をNumPyでベクトル化して実装する。
+- カイ二乗検定（分割表の独立性検定。p値は漸近分布または並べ替えで求める）
+- ブートストラップ信頼区間（グループ別平均）
+- 並べ替え検定（グループ間の平均差）
+
+半荘記録は1対局で各席・各順位が1回ずつ現れ、素点の合計が0になるため、行（1人分の結果）は
+独立ではない。blocks に対局を指定すると、並べ替えは対局内だけで行い、ブートストラップは
+対局単位で復元抽出する（行を独立とみなすと p値が小さく、信頼区間が狭く出すぎる）。
+
+scipy に依存しないよう、カイ二乗分布の上側確率は不完全ガンマ関数から計算する。
+"""
+
+import math
+import numpy as np
+
+# リサンプリングを一度に行う要素数の上限（1回あたり データ件数 × 行数 の行列を作るため、
+# 行数はデータ件数に応じて減らし、メモリ使用量をデータ件数によらず一定に保つ）
+BATCH_ELEMENTS = 10_000_000
+
+# リサンプリング全体の要素数の上限（データ件数 × 回数）と、件数が多い場合の最低回数
+# 件数が多いと指定した回数を減らして計算時間を抑える（件数が多いほど推定は安定する）
+RESAMPLE_ELEMENTS = 100_000_000
+MIN_RESAMPLES = 100
+
+
+def _batch_size(n):
+    """データ件数 n のリサンプリングを一度に行う行数"""
+    return max(1, BATCH_ELEMENTS // n)
+
+
+def resample_count(requested, n):
+    """データ件数 n のときのリサンプリング回数（requested を上限に、全体の要素数で抑える）"""
+    return min(requested, max(MIN_RESAMPLES, RESAMPLE_ELEMENTS // max(n, 1)))
+
+
+# ========== 対局内の並べ替え ==========
+
+def _block_codes(blocks, n):
+    """
+    ブロック（対局）の連番と、ブロック順に行を並べる添字
+    blocks が None の場合は全体を1ブロックとする（全行を入れ替える）
+    """
+    if blocks is None:
+        return np.zeros(n, dtype=int), np.arange(n)
+    _, codes = np.unique(np.asarray(blocks), return_inverse=True)
+    order = np.argsort(codes, kind="stable")
+    return codes[order], order
+
+
+def _shuffle_within_blocks(values, codes, size, rng):
+    """
+    ブロック内だけで値を入れ替えた (size, n) の標本
+    values・codes はブロック順に並べておく。全ブロックの件数がそろっていれば（1対局4人）
+    (ブロック数, 件数) に変形して行内で並べ替え、そろっていなければ乱数キーの整列で行う
+    """
+    n = len(values)
+    sizes = np.bincount(codes)
+    if sizes.min() == sizes.max():
+        blocked = np.broadcast_to(values.reshape(-1, sizes[0]), (size, len(sizes), sizes[0]))
+        return rng.permuted(blocked, axis=2).reshape(size, n)
+    keys = codes + rng.random((size, n))
+    return values[np.argsort(keys, axis=1)]
+
+
+# ========== カイ二乗検定 ==========
+
+def _gammaincc(a, x):
+    """正則化上側不完全ガンマ関数 Q(a, x)"""
+    if x <= 0:
+        return 1.0
+    log_prefactor = -x + a * math.log(x) - math.lgamma(a)
+
+    if x < a + 1:
+        # 級数展開で P(a, x) を求めて 1 から引く
+        term = 1.0 / a
+        total = term
+        n = a
+        for _ in range(1000):
+            n += 1
+            term *= x / n
+            total += term
+            if abs(term) < abs(total) * 1e-15:
+                break
+        return max(0.0, 1.0 - total * math.exp(log_prefactor))
+
+    # 連分数展開（修正Lentz法）
+    tiny = 1e-300
+    b = x + 1 - a
+    c = 1 / tiny
+    d = 1 / b
+    h = d
+    for i in range(1, 1000):
+        an = -i * (i - a)
+        b += 2
+        d = an * d + b
+        d = tiny if abs(d) < tiny else d
+        c = b + an / c
+        c = tiny if abs(c) < tiny else c
+        d = 1 / d
+        delta = d * c
+        h *= delta
+        if abs(delta - 1) < 1e-15:
+            break
+    return math.exp(log_prefactor) * h
+
+
+def chi2_sf(statistic, dof):
+    """自由度 dof のカイ二乗分布の上側確率（p値）"""
+    return _gammaincc(dof / 2, statistic / 2)
+
+
+def chi_square_test(table):
+    """
+    分割表の独立性のカイ二乗検定
+    Args:
+        table: 観測度数（行: 席、列: 順位 など）
+    Returns:
+        dict(statistic, dof, p_value, expected, residuals)
+        residuals は標準化残差 (観測 - 期待) / sqrt(期待)
+    """
+    observed = np.asarray(table, dtype=float)
+    total = observed.sum()
+    expected = observed.sum(axis=1, keepdims=True) * observed.sum(axis=0, keepdims=True) / total
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        residuals = np.where(expected > 0, (observed - expected) / np.sqrt(expected), 0.0)
+    statistic = float((residuals ** 2).sum())
+    dof = (observed.shape[0] - 1) * (observed.shape[1] - 1)
+
+    return {
+        "statistic": statistic,
+        "dof": dof,
+        "p_value": chi2_sf(statistic, dof),
+        "expected": expected,
+        "residuals": residuals,
+    }
+
+
+def permutation_chi_square_test(groups, categories, blocks=None, group_labels=None,
+                                category_labels=None, n_perm=5000, seed=0):
+    """
+    分割表の独立性のカイ二乗検定（p値は並べ替えで求める）
+    カテゴリ（順位）をブロック（対局）内だけで入れ替えて統計量の帰無分布を作る。
+    1対局で各席・各順位が1回ずつ現れるため、漸近分布の p値は小さく出すぎる。
+    データ件数が多い場合、n_perm は resample_count で減らす
+    Args:
+        groups, categories: 各行のグループ（席）とカテゴリ（順位）
+        blocks: 各行のブロック（対局）。None なら全行を入れ替える
+        group_labels, category_labels: 分割表の行・列の順序（None なら出現順）
+    Returns:
+        chi_square_test の結果に n_perm（並べ替えの回数）と
+        asymptotic_p_value（漸近分布の p値。参考値）を加えた dict
+        p_value は並べ替えによる p値
+    """
+    groups = np.asarray(groups)
+    categories = np.asarray(categories)
+    group_labels = list(dict.fromkeys(groups)) if group_labels is None else list(group_labels)
+    category_labels = list(dict.fromkeys(categories)) if category_labels is None else list(category_labels)
+    group_codes = (groups[:, None] == np.array(group_labels)[None, :]).argmax(axis=1)
+    category_codes = (categories[:, None] == np.array(category_labels)[None, :]).argmax(axis=1)
+
+    n = len(groups)
+    n_categories = len(category_labels)
+    cells = len(group_labels) * n_categories
+    table = np.bincount(group_codes * n_categories + category_codes, minlength=cells)
+    result = chi_square_test(table.reshape(len(group_labels), n_categories))
+
+    # 並べ替えても両方の周辺度数は変わらないため、期待度数は観測時のものを使う
+    expected = result["expected"].ravel()
+    valid = expected > 0
+
+    codes, order = _block_codes(blocks, n)
+    group_codes = group_codes[order]
+    category_codes = category_codes[order]
+    n_perm = resample_count(n_perm, n)
+    batch_size = _batch_size(n)
+    rng = np.random.default_rng(seed)
+    exceed = 0
+    for start in range(0, n_perm, batch_size):
+        size = min(batch_size, n_perm - start)
+        shuffled = _shuffle_within_blocks(category_codes, codes, size, rng)
+        flat = group_codes * n_categories + shuffled + np.arange(size)[:, None] * cells
+        tables = np.bincount(flat.ravel(), minlength=size * cells).reshape(size, cells)
+        statistics = ((tables[:, valid] - expected[valid]) ** 2 / expected[valid]).sum(axis=1)
+        exceed += int((statistics >= result["statistic"] - 1e-9).sum())
+
+    result["asymptotic_p_value"] = result["p_value"]
+    result["p_value"] = (exceed + 1) / (n_perm + 1)
+    result["n_perm"] = n_perm
+    return result
+
+
+# ========== ブートストラップ ==========
+
+def bootstrap_mean_ci(values, n_boot=2000, confidence=0.95, seed=0):
+    """
+    平均値のブートストラップ信頼区間（パーセンタイル法）
+    データ件数が多い場合、n_boot は resample_count で減らす
+    Returns:
+        (平均, 下限, 上限)
+    """
+    values = np.asarray(values, dtype=float)
+    if len(values) == 0:
+        return np.nan, np.nan, np.nan
+
+    n_boot = resample_count(n_boot, len(values))
+    batch_size = _batch_size(len(values))
+    rng = np.random.default_rng(seed)
+    boot_means = np.empty(n_boot)
+    for start in range(0, n_boot, batch_size):
+        size = min(batch_size, n_boot - start)
+        idx = rng.integers(0, len(values), size=(size, len(values)))
+        boot_means[start:start + size] = values[idx].mean(axis=1)
+
+    alpha = (1 - confidence) / 2
+    lower, upper = np.quantile(boot_means, [alpha, 1 - alpha])
+    return values.mean(), lower, upper
+
+
+def bootstrap_group_means(values, groups, n_boot=2000, confidence=0.95, seed=0, blocks=None):
+    """
+    グループ別平均のブートストラップ信頼区間
+    blocks（対局）を指定すると対局単位で復元抽出し、同じ対局の行をまとめて扱う。
+    指定しない場合はグループごとに行を復元抽出する。
+    回数は抽出単位（対局または行）の合計数で resample_count により決める（全体の計算量を抑えるため）
+    Returns:
+        {グループ: (平均, 下限, 上限)}
+    """
+    values = np.asarray(values, dtype=float)
+    groups = np.asarray(groups)
+    labels = list(dict.fromkeys(groups))
+    if blocks is None:
+        n_boot = resample_count(n_boot, len(values))
+        return {
+            group: bootstrap_mean_ci(values[groups == group], n_boot, confidence, seed)
+            for group in labels
+        }
+
+    # 対局 × グループの合計と件数
+    _, codes = np.unique(np.asarray(blocks), return_inverse=True)
+    n_blocks = codes.max() + 1
+    onehot = (groups[:, None] == np.array(labels)[None, :]).astype(float)
+    sums = np.column_stack([
+        np.bincount(codes, weights=values * onehot[:, j], minlength=n_blocks) for j in range(len(labels))])
+    counts = np.column_stack([
+        np.bincount(codes, weights=onehot[:, j], minlength=n_blocks) for j in range(len(labels))])
+
+    # 対局ごとの抽出回数（重み）から、抽出した対局の合計 / 件数でグループ平均を求める
+    n_boot = resample_count(n_boot, n_blocks)
+    batch_size = _batch_size(n_blocks)
+    rng = np.random.default_rng(seed)
+    boot_means = np.empty((n_boot, len(labels)))
+    for start in range(0, n_boot, batch_size):
+        size = min(batch_size, n_boot - start)
+        idx = rng.integers(0, n_blocks, size=(size, n_blocks)) + np.arange(size)[:, None] * n_blocks
+        weights = np.bincount(idx.ravel(), minlength=size * n_blocks).reshape(size, n_blocks)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            boot_means[start:start + size] = (weights @ sums) / (weights @ counts)
+
+    alpha = (1 - confidence) / 2
+    lower, upper = np.nanquantile(boot_means, [alpha, 1 - alpha], axis=0)
+    means = sums.sum(axis=0) / counts.sum(axis=0)
+    return {label: (means[j], lower[j], upper[j]) for j, label in enumerate(labels)}
+
+
+# ========== 並べ替え検定 ==========
+
+def permutation_test_groups(values, groups, n_perm=5000, seed=0, blocks=None):
+    """
+    グループ間の平均差の並べ替え検定
+    グループのラベルをランダムに入れ替えて、観測された差が偶然で生じる確率を求める。
+    blocks（対局）を指定すると、ラベルは対局内だけで入れ替える（1対局の席は1人ずつのため）。
+    データ件数が多い場合、n_perm は resample_count で減らす
+    Returns:
+        dict(
+            labels: グループ一覧,
+            n_perm: 実際に行った並べ替えの回数,
+            statistic: 群間平方和（全グループの平均のばらつき）,
+            p_value: 全体の p値,
+            diffs: 各グループの平均 - それ以外の平均,
+            group_p_values: 各グループの p値（両側）
+        )
+    """
+    values = np.asarray(values, dtype=float)
+    groups = np.asarray(groups)
+    labels = list(dict.fromkeys(groups))
+
+    # 対局内で入れ替えるため、行を対局順に並べる（統計量は行の順序によらない）
+    codes, order = _block_codes(blocks, len(values))
+    values = values[order]
+    groups = groups[order]
+
+    # one-hot（データ件数 × グループ数）で行列積によりグループ合計を一括計算
+    onehot = (groups[:, None] == np.array(labels)[None, :]).astype(float)
+    counts = onehot.sum(axis=0)
+    n = len(values)
+    total = values.sum()
+    grand_mean = total / n
+
+    def statistics(samples):
+        sums = samples @ onehot
+        means = sums / counts
+        rest_means = (total - sums) / (n - counts)
+        between = ((means - grand_mean) ** 2 * counts).sum(axis=-1)
+        return between, means - rest_means
+
+    observed_between, observed_diffs = statistics(values[None, :])
+    observed_between = observed_between[0]
+    observed_diffs = observed_diffs[0]
+
+    n_perm = resample_count(n_perm, n)
+    batch_size = _batch_size(n)
+    rng = np.random.default_rng(seed)
+    exceed_between = 0
+    exceed_diffs = np.zeros(len(labels))
+    for start in range(0, n_perm, batch_size):
+        size = min(batch_size, n_perm - start)
+        samples = _shuffle_within_blocks(values, codes, size, rng)
+        between, diffs = statistics(samples)
+        exceed_between += int((between >= observed_between - 1e-12).sum())
+        exceed_diffs += (np.abs(diffs) >= np.abs(observed_diffs) - 1e-12).sum(axis=0)
+
+    return {
+        "labels": labels,
+        "n_perm": n_perm,
+        "statistic": float(observed_between),
+        "p_value": (exceed_between + 1) / (n_perm + 1),
+        "diffs": observed_diffs,
+        "group_p_values": (exceed_diffs + 1) / (n_perm + 1),
+    }
@@ -17,7 +17,193 @@ import sqlite3
 import os
 import sys
 
-DB_PATH = "data/mleague.db"
+# 環境変数 MLEAGUE_DB_PATH で別のデータベース（generate_league.py で生成した検証用など）を使える
+DB_PATH = os.environ.get("MLEAGUE_DB_PATH", "data/mleague.db")
+
+# 直対集計テーブル（選手・チームのペアごとの累積pt差・対局数・先着数）
+PAIR_STATS_SCHEMA = """
+    CREATE TABLE pair_stats (
+        entity_type TEXT NOT NULL,
+        a_id INTEGER NOT NULL,
+        b_id INTEGER NOT NULL,
+        season INTEGER NOT NULL,
+        table_type TEXT NOT NULL DEFAULT '',
+        games INTEGER NOT NULL DEFAULT 0,
+        point_diff REAL NOT NULL DEFAULT 0,
+        a_ahead INTEGER NOT NULL DEFAULT 0,
+        b_ahead INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (entity_type, a_id, b_id, season, table_type)
+    )
+"""
+
+# 対局時間のインデックス（最短・最長対局の上位N件を索引順に取得する）
+DURATION_INDEX_SCHEMA = """
+    CREATE INDEX IF NOT EXISTS idx_game_results_duration
+    ON game_results (duration_minutes, season, game_date, table_type, game_number)
+"""
+
+# 半荘記録の一意キー（1対局 × 1席 = 1行。db.GAME_RESULT_KEY と対応）
+GAME_RESULTS_UNIQUE_SCHEMA = """
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_game_results_game_seat
+    ON game_results (season, game_date, table_type, game_number, seat_name)
+"""
+
+# 対局一覧の索引（編集画面で新しい順に1ページずつ読む。db.search_games のキーセットと対応）
+GAME_BROWSE_INDEX_SCHEMA = """
+    CREATE INDEX IF NOT EXISTS idx_game_results_browse
+    ON game_results (season, game_date, game_number, table_type)
+"""
+
+# 全シーズンの最近の対局の索引（トップページの最新結果。db.get_recent_games と対応）
+RECENT_GAMES_INDEX_SCHEMA = """
+    CREATE INDEX IF NOT EXISTS idx_game_results_recent
+    ON game_results (game_date, game_number, table_type, season)
+"""
+
+# 対局ごとのレーティング履歴の索引（db.get_game_detail で4人分をまとめて引く）
+RATING_HISTORY_GAME_INDEX_SCHEMA = """
+    CREATE INDEX IF NOT EXISTS idx_rating_history_game
+    ON rating_history (player_id, game_date, game_number)
+"""
+
+# 集計キューブ（シーズン×月×席×試合番号×卓区分×選手×チームごとの対局数・pt・順位分布）
+GAME_CUBE_SCHEMA = """
+    CREATE TABLE game_cube (
+        season INTEGER NOT NULL,
+        month TEXT NOT NULL,
+        seat_name TEXT NOT NULL DEFAULT '',
+        game_number INTEGER NOT NULL DEFAULT 0,
+        table_type TEXT NOT NULL DEFAULT '',
+        player_id INTEGER NOT NULL,
+        team_id INTEGER NOT NULL DEFAULT 0,
+        games INTEGER NOT NULL DEFAULT 0,
+        points_sum REAL NOT NULL DEFAULT 0,
+        points_sqsum REAL NOT NULL DEFAULT 0,
+        rank_sum INTEGER NOT NULL DEFAULT 0,
+        rank_1st INTEGER NOT NULL DEFAULT 0,
+        rank_2nd INTEGER NOT NULL DEFAULT 0,
+        rank_3rd INTEGER NOT NULL DEFAULT 0,
+        rank_4th INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (season, month, seat_name, game_number, table_type, player_id, team_id)
+    )
+"""
+
+# 一括インポートの進捗（ファイルごとの読み終えた行数。中断後の再開に使う）
+IMPORT_CHECKPOINTS_SCHEMA = """
+    CREATE TABLE import_checkpoints (
+        source TEXT PRIMARY KEY,
+        rows_done INTEGER NOT NULL DEFAULT 0,
+        games INTEGER NOT NULL DEFAULT 0,
+        status TEXT NOT NULL DEFAULT 'running',
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+# 変更ジャーナル（元データへの書き込みをトリガーで追記する。seq は単調増加）
+CHANGE_JOURNAL_SCHEMA = """
+    CREATE TABLE change_journal (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        table_name TEXT NOT NULL,
+        operation TEXT NOT NULL,
+        season INTEGER,
+        player_id INTEGER,
+        team_id INTEGER,
+        game_date TEXT,
+        table_type TEXT,
+        game_number INTEGER,
+        changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+# テーブル・シーズン別の最新 seq を索引から取得する（db.get_table_versions）
+CHANGE_JOURNAL_INDEX_SCHEMA = """
+    CREATE INDEX IF NOT EXISTS idx_change_journal_table_season
+    ON change_journal (table_name, season, seq)
+"""
+
+# 変更ジャーナルの購読者（キャッシュ・集計テーブルごとの処理済み seq）
+JOURNAL_SUBSCRIBERS_SCHEMA = """
+    CREATE TABLE journal_subscribers (
+        subscriber TEXT PRIMARY KEY,
+        last_seq INTEGER NOT NULL DEFAULT 0,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+# 変更ジャーナルに記録するテーブルとキー列（列名は change_journal と共通）
+JOURNAL_TABLES = {
+    "teams": ("team_id",),
+    "team_names": ("season", "team_id"),
+    "team_season_points": ("season", "team_id"),
+    "players": ("player_id",),
+    "player_teams": ("season", "player_id", "team_id"),
+    "player_season_stats": ("season", "player_id"),
+    "game_results": ("season", "player_id", "game_date", "table_type", "game_number"),
+}
+
+# 更新を記録する列（記録のない表は全列）。レーティング計算済みフラグ・対局時間の補完など
+# 結果の変わらない書き込みでバージョンが進み、キャッシュが無効化されないようにする
+JOURNAL_UPDATE_COLUMNS = {
+    "game_results": ("season", "game_date", "table_type", "game_number", "seat_name",
+                     "player_id", "points", "rank", "start_time", "end_time"),
+}
+
+def _journal_trigger_schemas():
+    """JOURNAL_TABLES の各テーブルに変更ジャーナルへ追記するトリガーを定義"""
+    schemas = []
+    for table, keys in JOURNAL_TABLES.items():
+        columns = ", ".join(keys)
+        
+        def values(row):
+            return ", ".join(f"{row}.{key}" for key in keys)
+        
+        for operation, row in (("INSERT", "NEW"), ("DELETE", "OLD")):
+            schemas.append(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_journal_{table}_{operation.lower()}
+                AFTER {operation} ON {table}
+                BEGIN
+                    INSERT INTO change_journal (table_name, operation, {columns})
+                    VALUES ('{table}', '{operation}', {values(row)});
+                END
+            """)
+        # 更新は変更後のキーを記録し、キー自体が変わった場合は変更前のキーも記録する
+        key_unchanged = " AND ".join(f"OLD.{key} IS NEW.{key}" for key in keys)
+        update_columns = JOURNAL_UPDATE_COLUMNS.get(table)
+        update_of = f"UPDATE OF {', '.join(update_columns)}" if update_columns else "UPDATE"
+        schemas.append(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_journal_{table}_update
+            AFTER {update_of} ON {table}
+            BEGIN
+                INSERT INTO change_journal (table_name, operation, {columns})
+                VALUES ('{table}', 'UPDATE', {values("NEW")});
+                INSERT INTO change_journal (table_name, operation, {columns})
+                SELECT '{table}', 'UPDATE', {values("OLD")}
+                WHERE NOT ({key_unchanged});
+            END
+        """)
+    return schemas
+
+def create_journal_triggers(cursor):
+    """変更ジャーナルへ追記するトリガーを作成（作成済みのものはそのまま）"""
+    for schema in _journal_trigger_schemas():
+        cursor.execute(schema)
+
+def drop_journal_triggers(cursor):
+    """
+    変更ジャーナルへ追記するトリガーを削除
+    大量の一括登録（generate_league.py）で変更ジャーナルを膨らませないために使い、
+    登録後に create_journal_triggers で作り直す
+    """
+    for table in JOURNAL_TABLES:
+        for operation in ("insert", "delete", "update"):
+            cursor.execute(f"DROP TRIGGER IF EXISTS trg_journal_{table}_{operation}")
+
+def _create_change_journal(cursor):
+    """変更ジャーナル・購読者テーブルとトリガーを作成"""
+    cursor.execute(CHANGE_JOURNAL_SCHEMA)
+    cursor.execute(CHANGE_JOURNAL_INDEX_SCHEMA)
+    cursor.execute(JOURNAL_SUBSCRIBERS_SCHEMA)
+    create_journal_triggers(cursor)
 
 def init_database(with_sample=False):
     """データベースを初期化"""
@@ -38,6 +224,36 @@ def init_database(with_sample=False):
         _add_rating_schema(conn, cursor)
         conn.commit()
         print("✓ レーティング関連スキーマを追加しました")
+        _add_duration_schema(conn, cursor)
+        conn.commit()
+        print("✓ 対局時間スキーマを追加しました")
+        _add_game_results_unique_key(conn, cursor)
+        conn.commit()
+        print("✓ 半荘記録の一意キーを追加しました")
+        _add_pair_stats_schema(conn, cursor)
+        conn.commit()
+        print("✓ 直対集計スキーマを追加しました")
+        _add_game_cube_schema(conn, cursor)
+        conn.commit()
+        print("✓ 集計キューブスキーマを追加しました")
+        _add_player_season_stats_schema(conn, cursor)
+        conn.commit()
+        print("✓ 選手シーズン成績の自動集計スキーマを追加しました")
+        _add_team_season_points_schema(conn, cursor)
+        conn.commit()
+        print("✓ チームシーズンポイントの自動集計スキーマを追加しました")
+        _add_import_checkpoints_schema(conn, cursor)
+        conn.commit()
+        print("✓ インポート進捗スキーマを追加しました")
+        _add_change_journal_schema(conn, cursor)
+        conn.commit()
+        print("✓ 変更ジャーナルスキーマを追加しました")
+        _add_game_browse_schema(conn, cursor)
+        conn.commit()
+        print("✓ 対局一覧の索引を追加しました")
+        _add_recent_games_index(conn, cursor)
+        conn.commit()
+        print("✓ 最近の対局の索引を追加しました")
         conn.close()
         return
     else:
@@ -79,6 +295,8 @@ def init_database(with_sample=False):
             team_id INTEGER NOT NULL,
             points REAL NOT NULL,
             rank INTEGER NOT NULL,
+            penalty REAL DEFAULT 0,
+            manual_override INTEGER NOT NULL DEFAULT 0,
             FOREIGN KEY (team_id) REFERENCES teams (team_id) ON DELETE CASCADE,
             UNIQUE (season, team_id)
         )
@@ -124,6 +342,8 @@ def init_database(with_sample=False):
             rank_2nd INTEGER DEFAULT 0,
             rank_3rd INTEGER DEFAULT 0,
             rank_4th INTEGER DEFAULT 0,
+            penalty REAL DEFAULT 0,
+            manual_override INTEGER NOT NULL DEFAULT 0,
             FOREIGN KEY (player_id) REFERENCES players (player_id) ON DELETE CASCADE,
             UNIQUE (player_id, season)
         )
@@ -147,9 +367,14 @@ def init_database(with_sample=False):
             start_time TEXT,
             end_time TEXT,
             rating_calculated INTEGER DEFAULT 0,
+            duration_minutes INTEGER,
             FOREIGN KEY (player_id) REFERENCES players (player_id) ON DELETE CASCADE
         )
     """)
+    cursor.execute(DURATION_INDEX_SCHEMA)
+    cursor.execute(GAME_RESULTS_UNIQUE_SCHEMA)
+    cursor.execute(GAME_BROWSE_INDEX_SCHEMA)
+    cursor.execute(RECENT_GAMES_INDEX_SCHEMA)
     print("✓ game_results テーブルを作成しました")
     
     # ========== レーティング関連テーブル ==========
@@ -176,11 +401,34 @@ def init_database(with_sample=False):
             new_rating REAL NOT NULL,
             delta REAL NOT NULL,
             opponent_ids TEXT,
+            season INTEGER,
+            game_number INTEGER,
             FOREIGN KEY (player_id) REFERENCES players (player_id) ON DELETE CASCADE
         )
     """)
+    cursor.execute(RATING_HISTORY_GAME_INDEX_SCHEMA)
     print("✓ rating_history テーブルを作成しました")
     
+    # ========== 集計テーブル ==========
+    
+    # 直対集計テーブル
+    cursor.execute(PAIR_STATS_SCHEMA)
+    print("✓ pair_stats テーブルを作成しました")
+    
+    # 集計キューブ
+    cursor.execute(GAME_CUBE_SCHEMA)
+    print("✓ game_cube テーブルを作成しました")
+    
+    # ========== 管理テーブル ==========
+    
+    # 一括インポートの進捗
+    cursor.execute(IMPORT_CHECKPOINTS_SCHEMA)
+    print("✓ import_checkpoints テーブルを作成しました")
+    
+    # 変更ジャーナル（初期データの投入から記録する）
+    _create_change_journal(cursor)
+    print("✓ change_journal テーブルとトリガーを作成しました")
+    
     print("\nチームマスターデータを投入中...")
     
     # ========== チームデータ投入 ==========
@@ -249,8 +497,8 @@ def init_database(with_sample=False):
         ]
         
         cursor.executemany("""
-            INSERT INTO team_season_points (season, team_id, points, rank)
-            VALUES (?, ?, ?, ?)
+            INSERT INTO team_season_points (season, team_id, points, rank, manual_override)
+            VALUES (?, ?, ?, ?, 1)
         """, sample_team_points)
         
         print(f"✓ {len(sample_team_points)}件のチームポイントを投入しました")
@@ -306,8 +554,8 @@ def init_database(with_sample=False):
         ]
         
         cursor.executemany("""
-            INSERT INTO player_season_stats (player_id, season, games, points, rank_1st, rank_2nd, rank_3rd, rank_4th)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            INSERT INTO player_season_stats (player_id, season, games, points, rank_1st, rank_2nd, rank_3rd, rank_4th, manual_override)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, 1)
         """, sample_player_stats)
         
         print(f"✓ {len(sample_player_stats)}件の選手成績データを投入しました")
@@ -395,6 +643,176 @@ def _add_rating_schema(conn, cursor):
     else:
         print("✓ rating_history テーブルは既に存在します")
 
+def _add_duration_schema(conn, cursor):
+    """既存データベースの game_results に対局時間カラムとインデックスを追加"""
+    
+    cursor.execute("PRAGMA table_info(game_results)")
+    columns = {col[1] for col in cursor.fetchall()}
+    if 'duration_minutes' not in columns:
+        cursor.execute("""
+            ALTER TABLE game_results
+            ADD COLUMN duration_minutes INTEGER
+        """)
+        print("✓ game_results テーブルに duration_minutes カラムを追加しました")
+    else:
+        print("✓ game_results テーブルの duration_minutes カラムは既に存在します")
+    
+    from db import backfill_durations
+    backfill_durations(conn)
+    cursor.execute(DURATION_INDEX_SCHEMA)
+    cursor.execute("SELECT COUNT(*) FROM game_results WHERE duration_minutes IS NOT NULL")
+    print(f"✓ 対局時間を再計算しました（{cursor.fetchone()[0]}件）")
+
+def _add_game_results_unique_key(conn, cursor):
+    """既存データベースの game_results の重複行を削除し、一意キーを追加"""
+    
+    # 同じ対局キー・席の行は最後に登録されたもの（id最大）だけを残す
+    cursor.execute("""
+        DELETE FROM game_results
+        WHERE id NOT IN (
+            SELECT MAX(id) FROM game_results
+            GROUP BY season, game_date, table_type, game_number, seat_name
+        )
+    """)
+    removed = cursor.rowcount
+    if removed > 0:
+        print(f"✓ game_results の重複行を削除しました（{removed}件）")
+        # 重複分が反映されたレーティングを作り直す（集計テーブルは後続の処理で再構築）
+        from db import initialize_ratings_from_games
+        initialize_ratings_from_games(conn)
+        print("✓ レーティングを遡及計算しました")
+    else:
+        print("✓ game_results に重複行はありません")
+    
+    cursor.execute(GAME_RESULTS_UNIQUE_SCHEMA)
+
+def _add_pair_stats_schema(conn, cursor):
+    """既存データベースに直対集計テーブルを追加し、game_results から再構築"""
+    
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='pair_stats'")
+    if not cursor.fetchone():
+        cursor.execute(PAIR_STATS_SCHEMA)
+        print("✓ pair_stats テーブルを作成しました")
+    else:
+        print("✓ pair_stats テーブルは既に存在します")
+    
+    from db import rebuild_pair_stats
+    rebuild_pair_stats(conn)
+    cursor.execute("SELECT COUNT(*) FROM pair_stats")
+    print(f"✓ pair_stats を再構築しました（{cursor.fetchone()[0]}件）")
+
+def _add_game_cube_schema(conn, cursor):
+    """既存データベースに集計キューブを追加し、game_results から再構築"""
+    
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='game_cube'")
+    if not cursor.fetchone():
+        cursor.execute(GAME_CUBE_SCHEMA)
+        print("✓ game_cube テーブルを作成しました")
+    else:
+        print("✓ game_cube テーブルは既に存在します")
+    
+    from db import rebuild_game_cube
+    rebuild_game_cube(conn)
+    cursor.execute("SELECT COUNT(*) FROM game_cube")
+    print(f"✓ game_cube を再構築しました（{cursor.fetchone()[0]}件）")
+
+def _add_player_season_stats_schema(conn, cursor):
+    """既存データベースの player_season_stats にペナルティ・手入力フラグを追加し、自動集計分を再構築"""
+    
+    cursor.execute("PRAGMA table_info(player_season_stats)")
+    columns = {col[1] for col in cursor.fetchall()}
+    if 'penalty' not in columns:
+        cursor.execute("ALTER TABLE player_season_stats ADD COLUMN penalty REAL DEFAULT 0")
+        print("✓ player_season_stats テーブルに penalty カラムを追加しました")
+    if 'manual_override' not in columns:
+        cursor.execute("""
+            ALTER TABLE player_season_stats
+            ADD COLUMN manual_override INTEGER NOT NULL DEFAULT 0
+        """)
+        # これまで手入力されてきた成績は上書きしないよう手入力管理として保持する
+        cursor.execute("UPDATE player_season_stats SET manual_override = 1")
+        print(f"✓ player_season_stats テーブルに manual_override カラムを追加しました（既存{cursor.rowcount}件は手入力管理）")
+    else:
+        print("✓ player_season_stats テーブルの manual_override カラムは既に存在します")
+    
+    from db import rebuild_player_season_stats
+    rebuild_player_season_stats(conn)
+    cursor.execute("SELECT COUNT(*) FROM player_season_stats WHERE manual_override = 0")
+    print(f"✓ 半荘記録から選手シーズン成績を再構築しました（{cursor.fetchone()[0]}件）")
+
+def _add_team_season_points_schema(conn, cursor):
+    """既存データベースの team_season_points にペナルティ・手入力フラグを追加し、自動集計分を再構築"""
+    
+    cursor.execute("PRAGMA table_info(team_season_points)")
+    columns = {col[1] for col in cursor.fetchall()}
+    if 'penalty' not in columns:
+        cursor.execute("ALTER TABLE team_season_points ADD COLUMN penalty REAL DEFAULT 0")
+        print("✓ team_season_points テーブルに penalty カラムを追加しました")
+    if 'manual_override' not in columns:
+        cursor.execute("""
+            ALTER TABLE team_season_points
+            ADD COLUMN manual_override INTEGER NOT NULL DEFAULT 0
+        """)
+        # これまで手入力されてきたポイントは上書きしないよう手入力管理として保持する
+        cursor.execute("UPDATE team_season_points SET manual_override = 1")
+        print(f"✓ team_season_points テーブルに manual_override カラムを追加しました（既存{cursor.rowcount}件は手入力管理）")
+    else:
+        print("✓ team_season_points テーブルの manual_override カラムは既に存在します")
+    
+    from db import rebuild_team_season_points
+    rebuild_team_season_points(conn)
+    cursor.execute("SELECT COUNT(*) FROM team_season_points WHERE manual_override = 0")
+    print(f"✓ 半荘記録からチームシーズンポイントを再構築しました（{cursor.fetchone()[0]}件）")
+
+def _add_import_checkpoints_schema(conn, cursor):
+    """既存データベースに一括インポートの進捗テーブルを追加"""
+    
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='import_checkpoints'")
+    if not cursor.fetchone():
+        cursor.execute(IMPORT_CHECKPOINTS_SCHEMA)
+        print("✓ import_checkpoints テーブルを作成しました")
+    else:
+        print("✓ import_checkpoints テーブルは既に存在します")
+
+def _add_change_journal_schema(conn, cursor):
+    """既存データベースに変更ジャーナルと記録用トリガーを追加"""
+    
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='change_journal'")
+    if not cursor.fetchone():
+        cursor.execute(CHANGE_JOURNAL_SCHEMA)
+        cursor.execute(JOURNAL_SUBSCRIBERS_SCHEMA)
+        print("✓ change_journal テーブルを作成しました")
+    else:
+        print("✓ change_journal テーブルは既に存在します")
+    
+    cursor.execute(CHANGE_JOURNAL_INDEX_SCHEMA)
+    # 記録する列を限定した更新トリガーは作り直す（以前は全列の更新を記録していた）
+    for table in JOURNAL_UPDATE_COLUMNS:
+        cursor.execute(f"DROP TRIGGER IF EXISTS trg_journal_{table}_update")
+    create_journal_triggers(cursor)
+    print(f"✓ 変更ジャーナルのトリガーを作成しました（{len(JOURNAL_TABLES)}テーブル）")
+
+def _add_game_browse_schema(conn, cursor):
+    """既存データベースに対局一覧・レーティング履歴の索引を追加"""
+    
+    # 対局ごとの履歴を引くため、rating_history に season・game_number がなければ追加
+    cursor.execute("PRAGMA table_info(rating_history)")
+    columns = {col[1] for col in cursor.fetchall()}
+    for column in ("season", "game_number"):
+        if column not in columns:
+            cursor.execute(f"ALTER TABLE rating_history ADD COLUMN {column} INTEGER")
+            print(f"✓ rating_history テーブルに {column} カラムを追加しました")
+    
+    cursor.execute(GAME_BROWSE_INDEX_SCHEMA)
+    cursor.execute(RATING_HISTORY_GAME_INDEX_SCHEMA)
+    print("✓ idx_game_results_browse / idx_rating_history_game を作成しました")
+
+def _add_recent_games_index(conn, cursor):
+    """既存データベースに全シーズンの最近の対局の索引を追加"""
+    
+    cursor.execute(RECENT_GAMES_INDEX_SCHEMA)
+    print("✓ idx_game_results_recent を作成しました")
+
 if __name__ == "__main__":
     # コマンドライン引数をチェック
     with_sample = "--with-sample" in sys.argv or "-s" in sys.argv
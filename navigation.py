@@ -0,0 +1,48 @@
+"""
+サイドバーナビゲーション
+
+全ページ共通のサイドバーメニュー。Streamlit に依存する画面部品はこのモジュールに置き、
+db.py は Streamlit なしで読み込めるようにする（CLI スクリプトからも利用するため）。
+"""
+
+import streamlit as st
+
+
+def hide_default_sidebar_navigation():
+    """Streamlitのデフォルトサイドバーナビゲーションを非表示にする"""
+    st.markdown("""
+    <style>
+        [data-testid="stSidebarNav"] {
+            display: none;
+        }
+    </style>
+    """, unsafe_allow_html=True)
+
+
+def show_sidebar_navigation():
+    """共通のサイドバーナビゲーションを表示"""
+    # デフォルトのサイドバーナビゲーションを非表示
+    hide_default_sidebar_navigation()
+
+    st.sidebar.title("🀄 メニュー")
+    st.sidebar.page_link("app.py", label="🏠 トップページ")
+    st.sidebar.markdown("### 📊 チーム成績")
+    st.sidebar.page_link("pages/1_season_ranking.py", label="📊 年度別ランキング")
+    st.sidebar.page_link("pages/2_cumulative_ranking.py", label="🏆 累積ランキング")
+    st.sidebar.page_link("pages/10_team_game_analysis.py", label="📈 半荘別分析")
+    st.sidebar.markdown("### 👤 選手成績")
+    st.sidebar.page_link("pages/7_player_season_ranking.py", label="📊 年度別ランキング")
+    st.sidebar.page_link("pages/8_player_cumulative_ranking.py", label="🏆 累積ランキング")
+    st.sidebar.page_link("pages/13_player_game_analysis.py", label="📈 半荘別分析")
+    st.sidebar.markdown("---")
+    st.sidebar.page_link("pages/14_statistical_analysis.py", label="📈 統計分析")
+    st.sidebar.page_link("pages/16_streak_records.py", label="🔥 連続記録")
+    st.sidebar.page_link("pages/15_game_records.py", label="📜 対局記録")
+    st.sidebar.page_link("pages/17_player_rating.py", label="📊 レーティング")
+    st.sidebar.markdown("---")
+    st.sidebar.page_link("pages/3_admin.py", label="⚙️ データ管理")
+    st.sidebar.page_link("pages/4_player_admin.py", label="👤 選手管理")
+    st.sidebar.page_link("pages/9_team_master_admin.py", label="🏢 チーム管理")
+    st.sidebar.page_link("pages/5_season_update.py", label="🔄 シーズン更新")
+    st.sidebar.page_link("pages/6_player_stats_input.py", label="📊 選手成績入力")
+    st.sidebar.page_link("pages/11_game_results_input.py", label="🎮 半荘記録入力")
@@ -1,6 +1,12 @@
 import streamlit as st
 import pandas as pd
-from db import get_connection, show_sidebar_navigation
+from charts import cumulative_race_chart
+from db import (
+    compute_group_breakdown, get_all_team_names, get_connection, get_cube_rollup,
+    get_pair_stats, get_team_colors, merge_partials
+)
+from navigation import show_sidebar_navigation
+from tables import SIGNED_1, show_table
 
 st.set_page_config(
     page_title="チーム半荘別分析 | Mリーグダッシュボード",
@@ -18,6 +24,7 @@ st.markdown("""
 - 席順別ランキング（累積ポイント・平均順位）
 - 試合番号別ランキング（累積ポイント・平均順位）
 - 直対ランキング（対チーム別の成績）
+- 累積ポイント推移（半荘ごと）
 """)
 
 # ========== データ取得 ==========
@@ -56,6 +63,7 @@ if selected_period == "全期間":
         SELECT 
             gr.season,
             gr.game_date,
+            gr.table_type,
             gr.game_number,
             gr.seat_name,
             gr.points,
@@ -65,7 +73,7 @@ if selected_period == "全期間":
         FROM game_results gr
         JOIN player_teams pt ON gr.player_id = pt.player_id AND gr.season = pt.season
         JOIN team_names tn ON pt.team_id = tn.team_id AND pt.season = tn.season
-        ORDER BY gr.season, gr.game_date, gr.game_number
+        ORDER BY gr.season, gr.game_date, gr.table_type, gr.game_number
     """
     cursor.execute(query)
 else:
@@ -73,6 +81,7 @@ else:
         SELECT 
             gr.season,
             gr.game_date,
+            gr.table_type,
             gr.game_number,
             gr.seat_name,
             gr.points,
@@ -83,7 +92,7 @@ else:
         JOIN player_teams pt ON gr.player_id = pt.player_id AND gr.season = pt.season
         JOIN team_names tn ON pt.team_id = tn.team_id AND pt.season = tn.season
         WHERE gr.season = ?
-        ORDER BY gr.game_date, gr.game_number
+        ORDER BY gr.game_date, gr.table_type, gr.game_number
     """
     cursor.execute(query, (selected_period,))
 
@@ -96,7 +105,7 @@ if not results:
 
 # DataFrameに変換
 df = pd.DataFrame(results, columns=[
-    'season', 'game_date', 'game_number', 'seat_name',
+    'season', 'game_date', 'table_type', 'game_number', 'seat_name',
     'points', 'rank', 'team_id', 'team_name'
 ])
 
@@ -104,7 +113,7 @@ st.markdown("---")
 st.info(f"📊 データ件数: {len(df)}対局 / {df['team_name'].nunique()}チーム")
 
 # ========== タブ構成 ==========
-tab1, tab2, tab3 = st.tabs(["🧭 席順別", "🎮 試合番号別", "⚔️ 直対"])
+tab1, tab2, tab3, tab4 = st.tabs(["🧭 席順別", "🎮 試合番号別", "⚔️ 直対", "🏁 累積推移"])
 
 # ========== タブ1: 席順別ランキング ==========
 with tab1:
@@ -112,6 +121,19 @@ with tab1:
 
     seats = ['東', '南', '西', '北']
 
+    # 席順×チームの成績は集計キューブからロールアップ（チーム名はシーズンごとの名称で集計）
+    seat_season_stats = get_cube_rollup(
+        ['seat_name', 'team_id', 'season'],
+        season=None if selected_period == "全期間" else selected_period)
+    seat_season_stats = seat_season_stats.merge(
+        get_all_team_names()[['team_id', 'season', 'team_name']], on=['team_id', 'season'])
+    seat_team_stats = merge_partials(
+        seat_season_stats, ['seat_name', 'team_id', 'team_name'])
+    seat_team_stats = seat_team_stats.rename(columns={
+        'points_sum': 'cumulative_points',
+        'rank_1st': '1位', 'rank_2nd': '2位', 'rank_3rd': '3位', 'rank_4th': '4位'
+    })
+
     tab_seat_cumulative, tab_seat_avg_rank = st.tabs(
         ["累積ポイントランキング", "平均順位ランキング"])
 
@@ -122,43 +144,17 @@ with tab1:
 
         for seat_idx, seat in enumerate(seats):
             with seat_tabs[seat_idx]:
-                seat_df = df[df['seat_name'] == seat]
+                team_stats = seat_team_stats[seat_team_stats['seat_name'] == seat]
 
-                if len(seat_df) == 0:
+                if len(team_stats) == 0:
                     st.info(f"{seat}家のデータがありません")
                     continue
 
-                # チームごとの統計
-                team_stats = seat_df.groupby(['team_id', 'team_name']).agg({
-                    'points': ['sum', 'mean', 'count'],
-                    'rank': 'mean'
-                }).reset_index()
-
-                team_stats.columns = [
-                    'team_id', 'team_name', 'cumulative_points', 'avg_points', 'games', 'avg_rank']
-
                 # 順位計算
                 team_stats = team_stats.sort_values(
                     'cumulative_points', ascending=False)
                 team_stats.insert(0, '順位', range(1, len(team_stats) + 1))
 
-                # 1位〜4位の回数を計算
-                rank_counts = seat_df.groupby(
-                    'team_id')['rank'].value_counts().unstack(fill_value=0)
-                for i in range(1, 5):
-                    if i not in rank_counts.columns:
-                        rank_counts[i] = 0
-                rank_counts = rank_counts[[1, 2, 3, 4]]
-                rank_counts.columns = ['1位', '2位', '3位', '4位']
-
-                # マージ
-                team_stats = team_stats.merge(
-                    rank_counts,
-                    left_on='team_id',
-                    right_index=True,
-                    how='left'
-                ).fillna(0)
-
                 # 1位率を計算
                 team_stats['1位率'] = (team_stats['1位'] /
                                      team_stats['games'] * 100).round(1)
@@ -174,18 +170,8 @@ with tab1:
                     '対局数', '平均順位', '1位', '2位', '3位', '4位', '1位率(%)'
                 ]
 
-                # フォーマット
-                display_df['累積pt'] = display_df['累積pt'].apply(
-                    lambda x: f"{x:+.1f}")
-                display_df['平均pt'] = display_df['平均pt'].apply(
-                    lambda x: f"{x:+.1f}")
-                display_df['平均順位'] = display_df['平均順位'].apply(
-                    lambda x: f"{x:.2f}")
-                display_df['1位率(%)'] = display_df['1位率(%)'].apply(
-                    lambda x: f"{x:.1f}")
-
-                st.dataframe(display_df, width='stretch',
-                             hide_index=True, height=400)
+                show_table(display_df, width='stretch',
+                           hide_index=True, height=400)
 
     with tab_seat_avg_rank:
         st.markdown("### 席順別 平均順位ランキング")
@@ -194,42 +180,16 @@ with tab1:
 
         for seat_idx, seat in enumerate(seats):
             with seat_tabs[seat_idx]:
-                seat_df = df[df['seat_name'] == seat]
+                team_stats = seat_team_stats[seat_team_stats['seat_name'] == seat]
 
-                if len(seat_df) == 0:
+                if len(team_stats) == 0:
                     st.info(f"{seat}家のデータがありません")
                     continue
 
-                # チームごとの統計
-                team_stats = seat_df.groupby(['team_id', 'team_name']).agg({
-                    'points': ['sum', 'mean', 'count'],
-                    'rank': 'mean'
-                }).reset_index()
-
-                team_stats.columns = [
-                    'team_id', 'team_name', 'cumulative_points', 'avg_points', 'games', 'avg_rank']
-
                 # 順位計算（平均順位の低い順）
                 team_stats = team_stats.sort_values('avg_rank', ascending=True)
                 team_stats.insert(0, '順位', range(1, len(team_stats) + 1))
 
-                # 1位〜4位の回数を計算
-                rank_counts = seat_df.groupby(
-                    'team_id')['rank'].value_counts().unstack(fill_value=0)
-                for i in range(1, 5):
-                    if i not in rank_counts.columns:
-                        rank_counts[i] = 0
-                rank_counts = rank_counts[[1, 2, 3, 4]]
-                rank_counts.columns = ['1位', '2位', '3位', '4位']
-
-                # マージ
-                team_stats = team_stats.merge(
-                    rank_counts,
-                    left_on='team_id',
-                    right_index=True,
-                    how='left'
-                ).fillna(0)
-
                 # 1位率を計算
                 team_stats['1位率'] = (team_stats['1位'] /
                                      team_stats['games'] * 100).round(1)
@@ -245,22 +205,16 @@ with tab1:
                     '累積pt', '1位', '2位', '3位', '4位', '1位率(%)'
                 ]
 
-                # フォーマット
-                display_df['平均順位'] = display_df['平均順位'].apply(
-                    lambda x: f"{x:.2f}")
-                display_df['累積pt'] = display_df['累積pt'].apply(
-                    lambda x: f"{x:+.1f}")
-                display_df['1位率(%)'] = display_df['1位率(%)'].apply(
-                    lambda x: f"{x:.1f}")
-
-                st.dataframe(display_df, width='stretch',
-                             hide_index=True, height=400)
+                show_table(display_df, width='stretch',
+                           hide_index=True, height=400)
 
 # ========== タブ2: 試合番号別ランキング ==========
 with tab2:
     st.markdown("## 🎮 試合番号別ランキング")
 
-    game_numbers = sorted(df['game_number'].unique())
+    # 試合番号×チームの成績を一括集計し、各試合番号の表はその切り出しを並べ替えて表示
+    game_breakdown = compute_group_breakdown(df, 'game_number', ['team_id', 'team_name'])
+    game_numbers = sorted(game_breakdown)
 
     tab_game_cumulative, tab_game_avg_rank = st.tabs(
         ["累積ポイントランキング", "平均順位ランキング"])
@@ -270,43 +224,13 @@ with tab2:
 
         for game_number in game_numbers:
             with st.expander(f"🎮 第{game_number}試合", expanded=False):
-                game_df = df[df['game_number'] == game_number]
-
-                # チームごとの統計
-                team_stats = game_df.groupby(['team_id', 'team_name']).agg({
-                    'points': ['sum', 'mean', 'count'],
-                    'rank': 'mean'
-                }).reset_index()
-
-                team_stats.columns = [
-                    'team_id', 'team_name', 'cumulative_points', 'avg_points', 'games', 'avg_rank']
+                team_stats = game_breakdown[game_number]
 
                 # 順位計算
                 team_stats = team_stats.sort_values(
                     'cumulative_points', ascending=False)
                 team_stats.insert(0, '順位', range(1, len(team_stats) + 1))
 
-                # 1位〜4位の回数を計算
-                rank_counts = game_df.groupby(
-                    'team_id')['rank'].value_counts().unstack(fill_value=0)
-                for i in range(1, 5):
-                    if i not in rank_counts.columns:
-                        rank_counts[i] = 0
-                rank_counts = rank_counts[[1, 2, 3, 4]]
-                rank_counts.columns = ['1位', '2位', '3位', '4位']
-
-                # マージ
-                team_stats = team_stats.merge(
-                    rank_counts,
-                    left_on='team_id',
-                    right_index=True,
-                    how='left'
-                ).fillna(0)
-
-                # 1位率を計算
-                team_stats['1位率'] = (team_stats['1位'] /
-                                     team_stats['games'] * 100).round(1)
-
                 # 表示用に整形
                 display_df = team_stats[[
                     '順位', 'team_name', 'cumulative_points', 'avg_points',
@@ -318,60 +242,20 @@ with tab2:
                     '対局数', '平均順位', '1位', '2位', '3位', '4位', '1位率(%)'
                 ]
 
-                # フォーマット
-                display_df['累積pt'] = display_df['累積pt'].apply(
-                    lambda x: f"{x:+.1f}")
-                display_df['平均pt'] = display_df['平均pt'].apply(
-                    lambda x: f"{x:+.1f}")
-                display_df['平均順位'] = display_df['平均順位'].apply(
-                    lambda x: f"{x:.2f}")
-                display_df['1位率(%)'] = display_df['1位率(%)'].apply(
-                    lambda x: f"{x:.1f}")
-
-                st.dataframe(display_df, width='stretch',
-                             hide_index=True, height=400)
+                show_table(display_df, width='stretch',
+                           hide_index=True, height=400)
 
     with tab_game_avg_rank:
         st.markdown("### 試合番号別 平均順位ランキング")
 
         for game_number in game_numbers:
             with st.expander(f"🎮 第{game_number}試合", expanded=False):
-                game_df = df[df['game_number'] == game_number]
-
-                # チームごとの統計
-                team_stats = game_df.groupby(['team_id', 'team_name']).agg({
-                    'points': ['sum', 'mean', 'count'],
-                    'rank': 'mean'
-                }).reset_index()
-
-                team_stats.columns = [
-                    'team_id', 'team_name', 'cumulative_points', 'avg_points', 'games', 'avg_rank']
+                team_stats = game_breakdown[game_number]
 
                 # 順位計算（平均順位の低い順）
                 team_stats = team_stats.sort_values('avg_rank', ascending=True)
                 team_stats.insert(0, '順位', range(1, len(team_stats) + 1))
 
-                # 1位〜4位の回数を計算
-                rank_counts = game_df.groupby(
-                    'team_id')['rank'].value_counts().unstack(fill_value=0)
-                for i in range(1, 5):
-                    if i not in rank_counts.columns:
-                        rank_counts[i] = 0
-                rank_counts = rank_counts[[1, 2, 3, 4]]
-                rank_counts.columns = ['1位', '2位', '3位', '4位']
-
-                # マージ
-                team_stats = team_stats.merge(
-                    rank_counts,
-                    left_on='team_id',
-                    right_index=True,
-                    how='left'
-                ).fillna(0)
-
-                # 1位率を計算
-                team_stats['1位率'] = (team_stats['1位'] /
-                                     team_stats['games'] * 100).round(1)
-
                 # 表示用に整形
                 display_df = team_stats[[
                     '順位', 'team_name', 'avg_rank', 'games',
@@ -383,16 +267,8 @@ with tab2:
                     '累積pt', '1位', '2位', '3位', '4位', '1位率(%)'
                 ]
 
-                # フォーマット
-                display_df['平均順位'] = display_df['平均順位'].apply(
-                    lambda x: f"{x:.2f}")
-                display_df['累積pt'] = display_df['累積pt'].apply(
-                    lambda x: f"{x:+.1f}")
-                display_df['1位率(%)'] = display_df['1位率(%)'].apply(
-                    lambda x: f"{x:.1f}")
-
-                st.dataframe(display_df, width='stretch',
-                             hide_index=True, height=400)
+                show_table(display_df, width='stretch',
+                           hide_index=True, height=400)
 
 # ========== タブ3: 直対ランキング ==========
 with tab3:
@@ -408,107 +284,33 @@ with tab3:
     - マイナスが大きいほど、その相手に弱い
     """)
 
-    # 直対成績を計算
-    conn = get_connection()
-    cursor = conn.cursor()
-
-    if selected_period == "全期間":
-        query = """
-            SELECT 
-                gr.season,
-                gr.game_date,
-                gr.game_number,
-                gr.player_id,
-                gr.points,
-                pt.team_id,
-                tn.team_name
-            FROM game_results gr
-            JOIN player_teams pt ON gr.player_id = pt.player_id AND gr.season = pt.season
-            JOIN team_names tn ON pt.team_id = tn.team_id AND pt.season = tn.season
-            ORDER BY gr.season, gr.game_date, gr.game_number
-        """
-        cursor.execute(query)
-    else:
-        query = """
-            SELECT 
-                gr.season,
-                gr.game_date,
-                gr.game_number,
-                gr.player_id,
-                gr.points,
-                pt.team_id,
-                tn.team_name
-            FROM game_results gr
-            JOIN player_teams pt ON gr.player_id = pt.player_id AND gr.season = pt.season
-            JOIN team_names tn ON pt.team_id = tn.team_id AND pt.season = tn.season
-            WHERE gr.season = ?
-            ORDER BY gr.game_date, gr.game_number
-        """
-        cursor.execute(query, (selected_period,))
-
-    game_data = cursor.fetchall()
-    conn.close()
-
-    game_df = pd.DataFrame(game_data, columns=[
-        'season', 'game_date', 'game_number', 'player_id', 'points', 'team_id', 'team_name'
-    ])
-
-    # 直対成績を計算
-    head_to_head = []
-
-    for (season, date, number), group in game_df.groupby(['season', 'game_date', 'game_number']):
-        teams_in_game = group[['team_id', 'team_name', 'points']].groupby(
-            ['team_id', 'team_name']).sum().reset_index()
-
-        for i, team1 in teams_in_game.iterrows():
-            for j, team2 in teams_in_game.iterrows():
-                if team1['team_id'] != team2['team_id']:
-                    head_to_head.append({
-                        'team_id': team1['team_id'],
-                        'team_name': team1['team_name'],
-                        'opponent_id': team2['team_id'],
-                        'opponent_name': team2['team_name'],
-                        'point_diff': team1['points'] - team2['points']
-                    })
-
-    h2h_df = pd.DataFrame(head_to_head)
-
-    if not h2h_df.empty:
-        # チーム別の直対成績を集計
-        h2h_summary = h2h_df.groupby(['team_id', 'team_name', 'opponent_id', 'opponent_name']).agg({
-            'point_diff': ['sum', 'mean', 'count']
-        }).reset_index()
-
-        h2h_summary.columns = ['team_id', 'team_name', 'opponent_id', 'opponent_name',
-                               'total_diff', 'avg_diff', 'games']
+    # 直対成績は pair_stats（半荘記録入力時に更新）から取得
+    h2h_season = None if selected_period == "全期間" else selected_period
+    h2h_summary = get_pair_stats("team", h2h_season)
 
+    if not h2h_summary.empty:
         # チーム選択
-        teams_list = sorted(h2h_summary['team_name'].unique())
+        teams_list = sorted(h2h_summary['entity_name'].unique())
 
         selected_team = st.selectbox("チームを選択", teams_list)
 
         if selected_team:
             st.markdown(f"### {selected_team} の直対成績")
 
-            team_h2h = h2h_summary[h2h_summary['team_name']
+            team_h2h = h2h_summary[h2h_summary['entity_name']
                                    == selected_team].copy()
             team_h2h = team_h2h.sort_values('total_diff', ascending=False)
             team_h2h.insert(0, '順位', range(1, len(team_h2h) + 1))
 
             # 表示用に整形
             display_df = team_h2h[[
-                '順位', 'opponent_name', 'games', 'total_diff', 'avg_diff'
+                '順位', 'opponent_name', 'games', 'total_diff', 'avg_diff', 'ahead', 'behind'
             ]].copy()
 
-            display_df.columns = ['順位', '対戦相手', '対局数', '累積pt差', '平均pt差']
+            display_df.columns = ['順位', '対戦相手', '対局数', '累積pt差', '平均pt差', '先着', '後着']
 
-            display_df['累積pt差'] = display_df['累積pt差'].apply(
-                lambda x: f"{x:+.1f}")
-            display_df['平均pt差'] = display_df['平均pt差'].apply(
-                lambda x: f"{x:+.1f}")
-
-            st.dataframe(display_df, width='stretch',
-                         hide_index=True, height=400)
+            show_table(display_df, width='stretch',
+                       hide_index=True, height=400)
 
             # 統計情報
             col1, col2, col3 = st.columns(3)
@@ -541,17 +343,28 @@ with tab3:
 
         # ピボットテーブルを作成
         pivot_data = h2h_summary.pivot_table(
-            index='team_name',
+            index='entity_name',
             columns='opponent_name',
             values='total_diff',
             aggfunc='sum'
         )
 
-        # フォーマット
-        pivot_display = pivot_data.map(
-            lambda x: f"{x:+.1f}" if pd.notna(x) else "-")
-
-        st.dataframe(pivot_display, width='stretch')
+        show_table(pivot_data, formats=dict.fromkeys(pivot_data.columns, SIGNED_1), width='stretch')
 
     else:
         st.info("直対成績データがありません。")
+
+# ========== タブ4: 累積ポイント推移 ==========
+with tab4:
+    st.markdown("## 🏁 累積ポイント推移")
+    st.markdown("半荘ごとの累積ポイントの推移です。横軸はリーグ全体の通算半荘数です。")
+
+    race_fig, plotted_points, total_points = cumulative_race_chart(
+        df, 'team_id', 'team_name',
+        title=f"チーム別 累積ポイント推移（{selected_period}）",
+        colors=get_team_colors()
+    )
+    st.plotly_chart(race_fig, width='stretch')
+
+    if plotted_points < total_points:
+        st.caption(f"※ 描画点数を {total_points:,} → {plotted_points:,} 点に間引いています（各区間の最大・最小は保持）")
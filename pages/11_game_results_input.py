@@ -2,7 +2,13 @@ import sqlite3
 from datetime import datetime, date
 import streamlit as st
 import pandas as pd
-from db import get_connection, show_sidebar_navigation, update_player_rating, DB_PATH
+from db import (
+    get_connection, update_player_rating, update_aggregates_for_game,
+    calc_duration_minutes, get_next_game_number, record_game, search_games, get_game_detail,
+    get_recent_games, sync_derived_tables,
+    GAME_PAGE_SIZE, RECENT_GAMES_LIMIT, DB_PATH
+)
+from navigation import show_sidebar_navigation
 
 st.set_page_config(
     page_title="半荘記録入力 | Mリーグダッシュボード",
@@ -63,13 +69,11 @@ with tab_new:
         default_date = datetime.strptime(last_game[1], "%Y-%m-%d").date()
         default_table_type_idx = ["レギュラー", "セミファイナル", "ファイナル", "その他"].index(
             last_game[2]) if last_game[2] in ["レギュラー", "セミファイナル", "ファイナル", "その他"] else 0
-        default_game_number = last_game[3]
     else:
         last_game = None
         default_season_idx = 0
         default_date = date.today()
         default_table_type_idx = 0
-        default_game_number = 1
 
     conn.close()
 
@@ -92,13 +96,17 @@ with tab_new:
             "卓区分", table_types, index=default_table_type_idx, key="new_table_type")
 
     with col4:
+        # 初期値は対局日・卓区分で未使用の次の番号（登録済みの対局を誤って上書きしないため）
+        game_date_key = game_date.strftime("%Y-%m-%d")
+        default_game_number = min(
+            get_next_game_number(selected_season, game_date_key, table_type), 100)
         game_number = st.number_input(
             "対局番号",
             min_value=1,
             max_value=100,
             value=default_game_number,
             help="同じ日に複数対局がある場合の識別番号",
-            key="new_game_number"
+            key=f"new_game_number_{st.session_state.form_counter}_{selected_season}_{game_date_key}_{table_type}"
         )
 
     # 開始・終了時間の入力（テキスト入力）
@@ -324,6 +332,19 @@ with tab_new:
     rank_df = pd.DataFrame(rank_display_data)
     st.dataframe(rank_df, hide_index=True, width='stretch')
 
+    # 同じ対局キーが登録済みなら、上書きを明示的に選んだ場合だけ保存する
+    existing_game = get_game_detail(
+        selected_season, game_date.strftime("%Y-%m-%d"), table_type, game_number)
+    overwrite_existing = False
+    if not existing_game.empty:
+        st.warning(
+            f"⚠️ {game_date.strftime('%Y-%m-%d')} {table_type} 第{game_number}局は登録済みです"
+            f"（{', '.join(existing_game['player_name'])}）。"
+            "修正する場合は「✏️ データ編集」タブを使ってください")
+        overwrite_existing = st.checkbox(
+            "登録済みの対局を上書きする",
+            key=f"overwrite_existing_{st.session_state.form_counter}")
+
     # 保存ボタンとリセットボタン
     st.markdown("---")
     col1, col2 = st.columns([1, 3])
@@ -336,76 +357,31 @@ with tab_new:
                 st.error("❌ ポイント合計が0ではありません。修正してください。")
             else:
                 try:
-                    conn = get_connection()
-                    cursor = conn.cursor()
-
                     # 時間をフォーマット（テキスト入力そのまま使用）
                     start_time_db = start_time_str.strip() if start_time_str.strip() else None
                     end_time_db = end_time_str.strip() if end_time_str.strip() else None
 
-                    # 4名分のデータを挿入
-                    for data in game_data:
-                        cursor.execute("""
-                            INSERT INTO game_results (
-                                season, game_date, table_type, game_number,
-                                seat_name, player_id, points, rank,
-                                start_time, end_time, rating_calculated
-                            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                        """, (
-                            selected_season,
-                            game_date.strftime("%Y-%m-%d"),
-                            table_type,
-                            game_number,
-                            data['seat'],
-                            data['player_id'],
-                            data['points'],
-                            data['rank'],
-                            start_time_db,
-                            end_time_db,
-                            0  # rating_calculated フラグを0で初期化
-                        ))
-
-                    conn.commit()
-                    conn.close()
-
-
-                    # レート自動更新を一括計算で共通関数に委譲
-                    try:
-                        from db import update_ratings_for_game
-                        game_date_str = game_date.strftime("%Y-%m-%d")
-                        conn = get_connection()
-                        cursor = conn.cursor()
-                        cursor.execute("""
-                            SELECT player_id, rank FROM game_results
-                            WHERE season = ? AND game_date = ? AND table_type = ? AND game_number = ?
-                            ORDER BY seat_name
-                        """, (selected_season, game_date_str, table_type, game_number))
-                        game_records = cursor.fetchall()
-                        player_ids = [pid for pid, _ in game_records]
-                        ranks = [rk for _, rk in game_records]
-                        update_ratings_for_game(player_ids, ranks, selected_season, game_date_str, game_number, conn=conn)
-                        # rating_calculated フラグをセット
-                        cursor.execute("""
-                            UPDATE game_results 
-                            SET rating_calculated = 1 
-                            WHERE season = ? AND game_date = ? AND table_type = ? AND game_number = ?
-                        """, (selected_season, game_date_str, table_type, game_number))
-                        conn.commit()
-                        conn.close()
+                    # 結果・集計テーブル・レーティングを1トランザクションで保存
+                    # （登録済みの異なる結果は、上書きを選んだ場合のみ置き換える）
+                    status = record_game(
+                        selected_season, game_date.strftime("%Y-%m-%d"), table_type, game_number,
+                        game_data, start_time_db, end_time_db, overwrite=overwrite_existing)
+
+                    if status == 'conflict':
+                        st.error("❌ 同じ対局番号の対局が登録済みのため保存しませんでした。"
+                                 "対局番号を変更するか、「✏️ データ編集」タブで修正してください")
+                    elif status == 'updated':
+                        st.warning("⚠️ 登録済みの対局を上書きしました")
+                        st.info("⚠️ 結果を変更した場合は、データ管理ページで「レーティング遡及計算」を実行してください")
+                    else:
                         st.success("✅ 対局結果とレーティングを保存しました")
-                    except Exception as e:
-                        st.error(f"❌ レーティング更新時にエラーが発生しました: {str(e)}")
-                        import traceback
-                        st.error(traceback.format_exc())
 
-                    # フォームカウンターをインクリメント（自動的にセッション状態がリセットされる）
-                    st.session_state.form_counter += 1
-                    st.rerun()
+                        # フォームカウンターをインクリメント（自動的にセッション状態がリセットされる）
+                        st.session_state.form_counter += 1
+                        st.rerun()
 
                 except (sqlite3.Error, ValueError) as e:
                     st.error(f"❌ エラーが発生しました: {str(e)}")
-                    if 'conn' in locals():
-                        conn.close()
 
     with col2:
         if st.button("🔄 リセット", key=f"reset_button_{st.session_state.form_counter}"):
@@ -417,31 +393,7 @@ with tab_new:
     st.markdown("---")
     st.subheader("📋 最近の対局")
 
-    conn = get_connection()
-
-    recent_games_query = """
-        SELECT 
-            season,
-            game_date,
-            table_type,
-            game_number,
-            start_time,
-            end_time,
-            COUNT(*) as player_count,
-            GROUP_CONCAT(
-                (SELECT player_name FROM players WHERE player_id = gr.player_id), 
-                ', '
-            ) as players
-        FROM game_results gr
-        WHERE season = ?
-        GROUP BY season, game_date, table_type, game_number
-        ORDER BY game_date DESC, game_number DESC
-        LIMIT 10
-    """
-
-    recent_df = pd.read_sql_query(
-        recent_games_query, conn, params=(selected_season,))
-    conn.close()
+    recent_df = get_recent_games(RECENT_GAMES_LIMIT, season=selected_season)
 
     if not recent_df.empty:
         st.dataframe(
@@ -454,7 +406,8 @@ with tab_new:
                 "start_time": "開始時間",
                 "end_time": "終了時間",
                 "player_count": "人数",
-                "players": "対局者"
+                "players": "対局者",
+                "results": "結果（順位順）"
             },
             hide_index=True,
             width='stretch'
@@ -505,101 +458,108 @@ with tab_edit:
         conn.close()
         st.stop()
 
-    col1, col2 = st.columns(2)
+    filter_col1, filter_col2, filter_col3, filter_col4, filter_col5 = st.columns(5)
 
-    with col1:
+    with filter_col1:
         edit_season = st.selectbox(
             "シーズン", edit_seasons, key="edit_season_select")
 
-    # そのシーズンの対局一覧を取得
+    # 選手リストを取得（絞り込み・編集用）
     cursor.execute("""
-        SELECT DISTINCT 
-            game_date,
-            table_type,
-            game_number,
-            start_time,
-            end_time
-        FROM game_results
-        WHERE season = ?
-        ORDER BY game_date DESC, game_number DESC
+        SELECT DISTINCT p.player_id, p.player_name, tn.team_name, tn.team_id
+        FROM players p
+        JOIN player_teams pt ON p.player_id = pt.player_id
+        JOIN team_names tn ON pt.team_id = tn.team_id AND pt.season = tn.season
+        WHERE pt.season = ?
+        ORDER BY tn.team_name, p.player_name
     """, (edit_season,))
 
-    games_list = cursor.fetchall()
+    edit_players_data = cursor.fetchall()
     conn.close()
 
-    if not games_list:
-        st.info(f"{edit_season}シーズンの対局記録がありません。")
-        st.stop()
+    filter_players = {row[0]: f"{row[1]} ({row[2]})" for row in edit_players_data}
+    filter_teams = {row[3]: row[2] for row in edit_players_data}
 
-    # 対局選択肢を作成
-    game_options = {}
-    game_options_list = []  # インデックスベースの選択肢リスト
-    for i, game in enumerate(games_list):
-        game_date_str = game[0]
-        table_type = game[1]
-        game_num = game[2]
-        start_time = game[3] if game[3] else "--:--"
-        end_time = game[4] if game[4] else "--:--"
-
-        display_text = f"{game_date_str} | {table_type} | 第{game_num}試合 | {start_time}~{end_time}"
-        game_options[display_text] = (game_date_str, table_type, game_num)
-        game_options_list.append(display_text)
+    with filter_col2:
+        filter_player_id = st.selectbox(
+            "選手", [None] + list(filter_players),
+            format_func=lambda x: "すべて" if x is None else filter_players[x],
+            key="edit_filter_player"
+        )
 
-    with col2:
-        # インデックスベースで選択
-        selected_game_index = st.selectbox(
-            "対局を選択",
-            range(len(game_options_list)),
-            format_func=lambda x: game_options_list[x],
-            key="edit_game_select"
+    with filter_col3:
+        filter_team_id = st.selectbox(
+            "チーム", [None] + list(filter_teams),
+            format_func=lambda x: "すべて" if x is None else filter_teams[x],
+            key="edit_filter_team"
         )
 
-    # 選択された対局のデータを取得
-    selected_game_display = game_options_list[selected_game_index]
-    game_date_str, table_type, game_num = game_options[selected_game_display]
+    with filter_col4:
+        filter_date_from = st.date_input("対局日（から）", value=None, key="edit_filter_date_from")
+
+    with filter_col5:
+        filter_date_to = st.date_input("対局日（まで）", value=None, key="edit_filter_date_to")
+
+    # ページ位置（各ページの開始キー）。条件が変わったら先頭ページに戻す
+    edit_filters = (edit_season, filter_player_id, filter_team_id, filter_date_from, filter_date_to)
+    if st.session_state.get("edit_game_filters") != edit_filters:
+        st.session_state.edit_game_filters = edit_filters
+        st.session_state.edit_game_cursors = [None]
+    edit_game_cursors = st.session_state.edit_game_cursors
+
+    # 表示中のページの対局だけを取得
+    games_page, has_next_page = search_games(
+        edit_season,
+        after=edit_game_cursors[-1],
+        player_id=filter_player_id,
+        team_id=filter_team_id,
+        date_from=filter_date_from,
+        date_to=filter_date_to
+    )
+
+    if games_page.empty:
+        st.info(f"{edit_season}シーズンの条件に合う対局記録がありません。")
+        st.stop()
 
-    conn = get_connection()
-    cursor = conn.cursor()
+    def _next_game_page():
+        last_game = games_page.iloc[-1]
+        edit_game_cursors.append(
+            (last_game["game_date"], int(last_game["game_number"]), last_game["table_type"]))
 
-    cursor.execute("""
-        SELECT 
-            gr.id,
-            gr.seat_name,
-            p.player_name,
-            gr.player_id,
-            gr.points,
-            gr.rank,
-            gr.start_time,
-            gr.end_time
-        FROM game_results gr
-        JOIN players p ON gr.player_id = p.player_id
-        WHERE gr.season = ? 
-            AND gr.game_date = ? 
-            AND gr.table_type = ?
-            AND gr.game_number = ?
-        ORDER BY 
-            CASE gr.seat_name
-                WHEN '東' THEN 1
-                WHEN '南' THEN 2
-                WHEN '西' THEN 3
-                WHEN '北' THEN 4
-            END
-    """, (edit_season, game_date_str, table_type, game_num))
-
-    game_records = cursor.fetchall()
-
-    # 選手リストを取得（編集用）
-    cursor.execute("""
-        SELECT DISTINCT p.player_id, p.player_name, tn.team_name
-        FROM players p
-        JOIN player_teams pt ON p.player_id = pt.player_id
-        JOIN team_names tn ON pt.team_id = tn.team_id AND pt.season = tn.season
-        WHERE pt.season = ?
-        ORDER BY tn.team_name, p.player_name
-    """, (edit_season,))
+    def _prev_game_page():
+        edit_game_cursors.pop()
 
-    edit_players_data = cursor.fetchall()
-    conn.close()
+    page_col1, page_col2, page_col3 = st.columns([1, 4, 1])
+    with page_col1:
+        st.button("◀ 新しい対局", on_click=_prev_game_page,
+                  disabled=len(edit_game_cursors) == 1, key="edit_game_prev")
+    with page_col2:
+        st.caption(f"{len(edit_game_cursors)}ページ目（1ページ{GAME_PAGE_SIZE}対局・新しい順）")
+    with page_col3:
+        st.button("古い対局 ▶", on_click=_next_game_page,
+                  disabled=not has_next_page, key="edit_game_next")
+
+    # 対局選択肢を作成
+    def _format_game_option(i):
+        game = games_page.iloc[i]
+        start_time = game["start_time"] if pd.notna(game["start_time"]) else "--:--"
+        end_time = game["end_time"] if pd.notna(game["end_time"]) else "--:--"
+        return (f"{game['game_date']} | {game['table_type']} | 第{game['game_number']}試合 | "
+                f"{start_time}~{end_time} | {game['players']}")
+
+    selected_game_index = st.selectbox(
+        "対局を選択",
+        range(len(games_page)),
+        format_func=_format_game_option,
+        key="edit_game_select"
+    )
+
+    # 選択された対局のデータを取得（4人分の記録とレーティングを1回で取得）
+    selected_game = games_page.iloc[selected_game_index]
+    game_date_str = selected_game["game_date"]
+    table_type = selected_game["table_type"]
+    game_num = int(selected_game["game_number"])
+    game_records = get_game_detail(edit_season, game_date_str, table_type, game_num)
 
     # 選手リストを作成
     edit_player_options = {
@@ -612,8 +572,9 @@ with tab_edit:
     st.markdown("---")
     st.subheader("✏️ データ編集")
 
-    # フォームのkeyに対局インデックスを含めることで、選択が変わるたびに確実に再生成される
-    form_key = f"edit_game_form_{selected_game_index}"
+    # フォームのkeyに対局キーを含めることで、選択やページが変わるたびに確実に再生成される
+    game_key = f"{edit_season}_{game_date_str}_{table_type}_{game_num}"
+    form_key = f"edit_game_form_{game_key}"
 
     with st.form(form_key):
         # 対局情報
@@ -625,7 +586,7 @@ with tab_edit:
             edit_game_date = st.date_input(
                 "対局日",
                 value=datetime.strptime(game_date_str, "%Y-%m-%d").date(),
-                key=f"edit_game_date_{selected_game_index}"
+                key=f"edit_game_date_{game_key}"
             )
 
         with info_col2:
@@ -633,7 +594,7 @@ with tab_edit:
                 "卓区分",
                 ["レギュラー", "セミファイナル", "ファイナル", "その他"],
                 index=["レギュラー", "セミファイナル", "ファイナル", "その他"].index(table_type),
-                key=f"edit_table_type_{selected_game_index}"
+                key=f"edit_table_type_{game_key}"
             )
 
         with info_col3:
@@ -642,22 +603,23 @@ with tab_edit:
                 min_value=1,
                 max_value=100,
                 value=game_num,
-                key=f"edit_game_number_{selected_game_index}"
+                key=f"edit_game_number_{game_key}"
             )
 
         # 時間情報
         time_col1, time_col2 = st.columns(2)
 
         # 既存の時間を取得（最初のレコードから）
-        existing_start_str = game_records[0][6] if game_records[0][6] else ""
-        existing_end_str = game_records[0][7] if game_records[0][7] else ""
+        first_record = game_records.iloc[0]
+        existing_start_str = first_record["start_time"] if pd.notna(first_record["start_time"]) else ""
+        existing_end_str = first_record["end_time"] if pd.notna(first_record["end_time"]) else ""
 
         with time_col1:
             edit_start_time_str = st.text_input(
                 "開始時間",
                 value=existing_start_str,
                 placeholder="例: 19:00",
-                key=f"edit_start_time_{selected_game_index}",
+                key=f"edit_start_time_{game_key}",
                 help="対局開始時刻（任意・HH:MM形式）"
             )
 
@@ -666,7 +628,7 @@ with tab_edit:
                 "終了時間",
                 value=existing_end_str,
                 placeholder="例: 20:30",
-                key=f"edit_end_time_{selected_game_index}",
+                key=f"edit_end_time_{game_key}",
                 help="対局終了時刻（任意・HH:MM形式）"
             )
 
@@ -684,17 +646,13 @@ with tab_edit:
         # 編集データ
         edit_game_data = []
         edit_points_list = []
-        # レーティング履歴取得用
+        # 対局前・対局後のレーティング（get_game_detail で取得済み）
         rating_histories = {}
-        conn = get_connection()
-        cursor = conn.cursor()
-        for i, record in enumerate(game_records):
-            record_id = record[0]
-            seat = record[1]
-            player_name = record[2]
-            player_id = record[3]
-            points = record[4]
-            rank = record[5]
+        for i, record in enumerate(game_records.itertuples(index=False)):
+            record_id = int(record.id)
+            seat = record.seat_name
+            player_id = int(record.player_id)
+            points = record.points
 
             # 現在の選手の表示名を取得
             current_player_display = None
@@ -705,21 +663,7 @@ with tab_edit:
             if not current_player_display:
                 current_player_display = edit_player_display_names[0]
 
-            # レーティング履歴取得
-            cursor.execute("""
-                SELECT old_rating, new_rating FROM rating_history
-                WHERE player_id = ? AND game_date = ? AND game_number = ?
-                ORDER BY id ASC LIMIT 1
-            """, (player_id, game_date_str, game_num))
-            rating_row = cursor.fetchone()
-            if rating_row:
-                before_r, after_r = rating_row[0], rating_row[1]
-            else:
-                # 履歴がなければ現在レートを取得
-                cursor.execute("SELECT COALESCE(rating, 1500.0) FROM player_ratings WHERE player_id = ?", (player_id,))
-                r = cursor.fetchone()
-                before_r = after_r = r[0] if r else 1500.0
-
+            before_r, after_r = record.rating_before, record.rating_after
             rating_histories[player_id] = (before_r, after_r)
 
             cols = st.columns([1, 3, 2.5, 1.5, 1.5])
@@ -732,7 +676,7 @@ with tab_edit:
                     f"選手{i+1}",
                     edit_player_display_names,
                     index=edit_player_display_names.index(current_player_display),
-                    key=f"edit_player_{i}_{selected_game_index}",
+                    key=f"edit_player_{i}_{game_key}",
                     label_visibility="collapsed"
                 )
 
@@ -747,7 +691,7 @@ with tab_edit:
                     value=float(points),
                     step=0.1,
                     format="%.1f",
-                    key=f"edit_points_{i}_{selected_game_index}",
+                    key=f"edit_points_{i}_{game_key}",
                     label_visibility="collapsed"
                 )
             edit_points_list.append(edited_points)
@@ -764,7 +708,6 @@ with tab_edit:
                 'points': edited_points,
                 'rank': 0  # 後で計算
             })
-        conn.close()
 
         # 順位を自動計算（獲得ポイントの高い順、同点は同着）
         points_with_indices = [(edit_points_list[i], i) for i in range(4)]
@@ -840,6 +783,11 @@ with tab_edit:
                     # 時間をフォーマット（テキスト入力そのまま使用）
                     start_time_db = edit_start_time_str.strip() if edit_start_time_str.strip() else None
                     end_time_db = edit_end_time_str.strip() if edit_end_time_str.strip() else None
+                    duration_db = calc_duration_minutes(start_time_db, end_time_db)
+
+                    # 更新前の対局を集計テーブルから差し引く
+                    update_aggregates_for_game(
+                        cursor, edit_season, game_date_str, table_type, game_num, sign=-1)
 
                     # 4名分のデータを更新
                     for data in edit_game_data:
@@ -854,6 +802,7 @@ with tab_edit:
                                 rank = ?,
                                 start_time = ?,
                                 end_time = ?,
+                                duration_minutes = ?,
                                 rating_calculated = 0
                             WHERE id = ?
                         """, (
@@ -866,9 +815,17 @@ with tab_edit:
                             data['rank'],
                             start_time_db,
                             end_time_db,
+                            duration_db,
                             data['id']
                         ))
 
+                    # 更新後の対局を集計テーブルに反映
+                    update_aggregates_for_game(
+                        cursor, edit_season, edit_game_date.strftime("%Y-%m-%d"), edit_table_type, edit_game_number)
+
+                    # 処理済みの変更ジャーナルを削除
+                    sync_derived_tables(conn)
+
                     conn.commit()
                     conn.close()
 
@@ -876,6 +833,10 @@ with tab_edit:
                     st.info("⚠️ データ管理ページで「レーティング遡及計算」を実行してください")
                     st.rerun()
 
+                except sqlite3.IntegrityError:
+                    st.error("❌ 変更後の日付・卓区分・試合番号の対局が既に登録されています")
+                    if 'conn' in locals():
+                        conn.close()
                 except (sqlite3.Error, ValueError) as e:
                     st.error(f"❌ エラーが発生しました: {str(e)}")
                     if 'conn' in locals():
@@ -886,7 +847,9 @@ with tab_edit:
                 conn = get_connection()
                 cursor = conn.cursor()
 
-                # この対局の全記録を削除
+                # 集計テーブルから差し引いてから、この対局の全記録を削除
+                update_aggregates_for_game(
+                    cursor, edit_season, game_date_str, table_type, game_num, sign=-1)
                 cursor.execute("""
                     DELETE FROM game_results
                     WHERE season = ? 
@@ -895,6 +858,9 @@ with tab_edit:
                         AND game_number = ?
                 """, (edit_season, game_date_str, table_type, game_num))
 
+                # 処理済みの変更ジャーナルを削除
+                sync_derived_tables(conn)
+
                 conn.commit()
                 conn.close()
 
@@ -1,6 +1,12 @@
 import streamlit as st
 import pandas as pd
-from db import get_connection, show_sidebar_navigation
+from charts import cumulative_race_chart
+from db import (
+    compute_group_breakdown, get_connection, get_pair_entities, get_pair_matrix,
+    get_pair_stats, get_season_partials, merge_partials, pair_matrix_submatrix
+)
+from navigation import show_sidebar_navigation
+from tables import SIGNED_1, show_table
 
 st.set_page_config(
     page_title="選手半荘別分析 | Mリーグダッシュボード",
@@ -18,6 +24,7 @@ st.markdown("""
 - 席順別ランキング（累積ポイント・平均順位）
 - 試合番号別ランキング（累積ポイント・平均順位）
 - 直対ランキング（対選手別の成績）
+- 累積ポイント推移（半荘ごと）
 """)
 
 # ========== データ取得 ==========
@@ -58,13 +65,14 @@ if selected_period == "全期間":
             p.player_name,
             gr.season,
             gr.game_date,
+            gr.table_type,
             gr.game_number,
             gr.seat_name,
             gr.points,
             gr.rank
         FROM game_results gr
         JOIN players p ON gr.player_id = p.player_id
-        ORDER BY gr.season, gr.game_date, gr.game_number
+        ORDER BY gr.season, gr.game_date, gr.table_type, gr.game_number
     """
     cursor.execute(query)
 else:
@@ -74,6 +82,7 @@ else:
             p.player_name,
             gr.season,
             gr.game_date,
+            gr.table_type,
             gr.game_number,
             gr.seat_name,
             gr.points,
@@ -81,7 +90,7 @@ else:
         FROM game_results gr
         JOIN players p ON gr.player_id = p.player_id
         WHERE gr.season = ?
-        ORDER BY gr.game_date, gr.game_number
+        ORDER BY gr.game_date, gr.table_type, gr.game_number
     """
     cursor.execute(query, (selected_period,))
 
@@ -95,7 +104,7 @@ if not results:
 # DataFrameに変換
 df = pd.DataFrame(results, columns=[
     'player_id', 'player_name', 'season', 'game_date',
-    'game_number', 'seat_name', 'points', 'rank'
+    'table_type', 'game_number', 'seat_name', 'points', 'rank'
 ])
 
 # 月の情報を追加
@@ -105,7 +114,7 @@ st.markdown("---")
 st.info(f"📊 データ件数: {len(df)}対局 / {df['player_name'].nunique()}選手")
 
 # ========== タブ構成 ==========
-tab1, tab2, tab3 = st.tabs(["🧭 席順別", "🎮 試合番号別", "⚔️ 直対"])
+tab1, tab2, tab3, tab4 = st.tabs(["🧭 席順別", "🎮 試合番号別", "⚔️ 直対", "🏁 累積推移"])
 
 # ========== タブ1: 席順別ランキング ==========
 with tab1:
@@ -114,45 +123,31 @@ with tab1:
     seats = ['東', '南', '西', '北']
     seat_tabs = st.tabs([f"{seat}家" for seat in seats])
 
+    # 席順×選手の成績はシーズン別部分集計を合算して求める
+    seat_partials = get_season_partials(
+        None if selected_period == "全期間" else selected_period)
+    seat_stats = merge_partials(seat_partials, ['seat_name', 'player_id'])
+    seat_stats['player_name'] = seat_stats['player_id'].map(
+        dict(zip(df['player_id'], df['player_name'])))
+
     for seat_idx, seat in enumerate(seats):
         with seat_tabs[seat_idx]:
-            seat_df = df[df['seat_name'] == seat]
+            player_stats = seat_stats[seat_stats['seat_name'] == seat]
 
-            if len(seat_df) == 0:
+            if len(player_stats) == 0:
                 st.info(f"{seat}家のデータがありません")
                 continue
 
-            # 選手ごとの統計
-            player_stats = seat_df.groupby(['player_id', 'player_name']).agg({
-                'points': ['sum', 'mean', 'count'],
-                'rank': 'mean'
-            }).reset_index()
-
-            player_stats.columns = ['player_id', 'player_name',
-                                    'cumulative_points', 'avg_points', 'games', 'avg_rank']
+            player_stats = player_stats.rename(columns={
+                'points_sum': 'cumulative_points',
+                'rank_1st': '1位', 'rank_2nd': '2位', 'rank_3rd': '3位', 'rank_4th': '4位'
+            })
 
             # 順位計算
             player_stats = player_stats.sort_values(
                 'cumulative_points', ascending=False)
             player_stats.insert(0, '順位', range(1, len(player_stats) + 1))
 
-            # 1位〜4位の回数を計算
-            rank_counts = seat_df.groupby(
-                'player_id')['rank'].value_counts().unstack(fill_value=0)
-            for i in range(1, 5):
-                if i not in rank_counts.columns:
-                    rank_counts[i] = 0
-            rank_counts = rank_counts[[1, 2, 3, 4]]
-            rank_counts.columns = ['1位', '2位', '3位', '4位']
-
-            # マージ
-            player_stats = player_stats.merge(
-                rank_counts,
-                left_on='player_id',
-                right_index=True,
-                how='left'
-            ).fillna(0)
-
             # 1位率を計算
             player_stats['1位率'] = (
                 player_stats['1位'] / player_stats['games'] * 100).round(1)
@@ -168,23 +163,16 @@ with tab1:
                 '対局数', '平均順位', '1位', '2位', '3位', '4位', '1位率(%)'
             ]
 
-            # フォーマット
-            display_df['累積pt'] = display_df['累積pt'].apply(
-                lambda x: f"{x:+.1f}")
-            display_df['平均pt'] = display_df['平均pt'].apply(
-                lambda x: f"{x:+.1f}")
-            display_df['平均順位'] = display_df['平均順位'].apply(lambda x: f"{x:.2f}")
-            display_df['1位率(%)'] = display_df['1位率(%)'].apply(
-                lambda x: f"{x:.1f}")
-
-            st.dataframe(display_df, width='stretch',
-                         hide_index=True, height=400)
+            show_table(display_df, width='stretch',
+                       hide_index=True, height=400)
 
 # ========== タブ2: 試合番号別ランキング ==========
 with tab2:
     st.markdown("## 🎮 試合番号別ランキング")
 
-    game_numbers = sorted(df['game_number'].unique())
+    # 試合番号×選手の成績を一括集計し、各試合番号の表はその切り出しを並べ替えて表示
+    game_breakdown = compute_group_breakdown(df, 'game_number', ['player_id', 'player_name'])
+    game_numbers = sorted(game_breakdown)
 
     tab_game_cumulative, tab_game_avg_rank = st.tabs(
         ["累積ポイントランキング", "平均順位ランキング"])
@@ -194,49 +182,13 @@ with tab2:
 
         for game_number in game_numbers:
             with st.expander(f"🎮 第{game_number}試合", expanded=False):
-                game_df = df[df['game_number'] == game_number]
-
-                # 選手ごとの統計
-                player_stats = game_df.groupby(['player_id', 'player_name']).agg({
-                    'points': ['sum', 'mean', 'count'],
-                    'rank': 'mean'
-                }).reset_index()
-
-                player_stats.columns = [
-                    'player_id',
-                    'player_name',
-                    'cumulative_points',
-                    'avg_points',
-                    'games',
-                    'avg_rank'
-                ]
+                player_stats = game_breakdown[game_number]
 
                 # 順位計算
                 player_stats = player_stats.sort_values(
                     'cumulative_points', ascending=False)
                 player_stats.insert(0, '順位', range(1, len(player_stats) + 1))
 
-                # 1位〜4位の回数を計算
-                rank_counts = game_df.groupby(
-                    'player_id')['rank'].value_counts().unstack(fill_value=0)
-                for i in range(1, 5):
-                    if i not in rank_counts.columns:
-                        rank_counts[i] = 0
-                rank_counts = rank_counts[[1, 2, 3, 4]]
-                rank_counts.columns = ['1位', '2位', '3位', '4位']
-
-                # マージ
-                player_stats = player_stats.merge(
-                    rank_counts,
-                    left_on='player_id',
-                    right_index=True,
-                    how='left'
-                ).fillna(0)
-
-                # 1位率を計算
-                player_stats['1位率'] = (
-                    player_stats['1位'] / player_stats['games'] * 100).round(1)
-
                 # 表示用に整形
                 display_df = player_stats[[
                     '順位', 'player_name', 'cumulative_points', 'avg_points',
@@ -248,67 +200,21 @@ with tab2:
                     '対局数', '平均順位', '1位', '2位', '3位', '4位', '1位率(%)'
                 ]
 
-                # フォーマット
-                display_df['累積pt'] = display_df['累積pt'].apply(
-                    lambda x: f"{x:+.1f}")
-                display_df['平均pt'] = display_df['平均pt'].apply(
-                    lambda x: f"{x:+.1f}")
-                display_df['平均順位'] = display_df['平均順位'].apply(
-                    lambda x: f"{x:.2f}")
-                display_df['1位率(%)'] = display_df['1位率(%)'].apply(
-                    lambda x: f"{x:.1f}")
-
-                st.dataframe(display_df, width='stretch',
-                             hide_index=True, height=400)
+                show_table(display_df, width='stretch',
+                           hide_index=True, height=400)
 
     with tab_game_avg_rank:
         st.markdown("### 試合番号別 平均順位ランキング")
 
         for game_number in game_numbers:
             with st.expander(f"🎮 第{game_number}試合", expanded=False):
-                game_df = df[df['game_number'] == game_number]
-
-                # 選手ごとの統計
-                player_stats = game_df.groupby(['player_id', 'player_name']).agg({
-                    'points': ['sum', 'mean', 'count'],
-                    'rank': 'mean'
-                }).reset_index()
-
-                player_stats.columns = [
-                    'player_id',
-                    'player_name',
-                    'cumulative_points',
-                    'avg_points',
-                    'games',
-                    'avg_rank'
-                ]
+                player_stats = game_breakdown[game_number]
 
                 # 順位計算（平均順位の低い順）
                 player_stats = player_stats.sort_values(
                     'avg_rank', ascending=True)
                 player_stats.insert(0, '順位', range(1, len(player_stats) + 1))
 
-                # 1位〜4位の回数を計算
-                rank_counts = game_df.groupby(
-                    'player_id')['rank'].value_counts().unstack(fill_value=0)
-                for i in range(1, 5):
-                    if i not in rank_counts.columns:
-                        rank_counts[i] = 0
-                rank_counts = rank_counts[[1, 2, 3, 4]]
-                rank_counts.columns = ['1位', '2位', '3位', '4位']
-
-                # マージ
-                player_stats = player_stats.merge(
-                    rank_counts,
-                    left_on='player_id',
-                    right_index=True,
-                    how='left'
-                ).fillna(0)
-
-                # 1位率を計算
-                player_stats['1位率'] = (
-                    player_stats['1位'] / player_stats['games'] * 100).round(1)
-
                 # 表示用に整形
                 display_df = player_stats[[
                     '順位', 'player_name', 'avg_rank', 'games',
@@ -320,16 +226,8 @@ with tab2:
                     '累積pt', '1位', '2位', '3位', '4位', '1位率(%)'
                 ]
 
-                # フォーマット
-                display_df['平均順位'] = display_df['平均順位'].apply(
-                    lambda x: f"{x:.2f}")
-                display_df['累積pt'] = display_df['累積pt'].apply(
-                    lambda x: f"{x:+.1f}")
-                display_df['1位率(%)'] = display_df['1位率(%)'].apply(
-                    lambda x: f"{x:.1f}")
-
-                st.dataframe(display_df, width='stretch',
-                             hide_index=True, height=400)
+                show_table(display_df, width='stretch',
+                           hide_index=True, height=400)
 
 # ========== タブ3: 直対ランキング ==========
 with tab3:
@@ -345,102 +243,35 @@ with tab3:
     - マイナスが大きいほど、その相手に弱い
     """)
 
-    # 直対成績を計算
-    conn = get_connection()
-    cursor = conn.cursor()
-
-    if selected_period == "全期間":
-        query = """
-            SELECT 
-                gr.season,
-                gr.game_date,
-                gr.game_number,
-                gr.player_id,
-                p.player_name,
-                gr.points
-            FROM game_results gr
-            JOIN players p ON gr.player_id = p.player_id
-            ORDER BY gr.season, gr.game_date, gr.game_number
-        """
-        cursor.execute(query)
-    else:
-        query = """
-            SELECT 
-                gr.season,
-                gr.game_date,
-                gr.game_number,
-                gr.player_id,
-                p.player_name,
-                gr.points
-            FROM game_results gr
-            JOIN players p ON gr.player_id = p.player_id
-            WHERE gr.season = ?
-            ORDER BY gr.game_date, gr.game_number
-        """
-        cursor.execute(query, (selected_period,))
-
-    game_data = cursor.fetchall()
-    conn.close()
-
-    game_df = pd.DataFrame(game_data, columns=[
-        'season', 'game_date', 'game_number', 'player_id', 'player_name', 'points'
-    ])
-
-    # 直対成績を計算
-    head_to_head = []
-
-    for (season, date, number), group in game_df.groupby(['season', 'game_date', 'game_number']):
-        players_in_game = group[['player_id', 'player_name', 'points']].values
-
-        for player1 in players_in_game:
-            for player2 in players_in_game:
-                if player1[0] != player2[0]:
-                    head_to_head.append({
-                        'player_id': player1[0],
-                        'player_name': player1[1],
-                        'opponent_id': player2[0],
-                        'opponent_name': player2[1],
-                        'point_diff': player1[2] - player2[2]
-                    })
-
-    h2h_df = pd.DataFrame(head_to_head)
-
-    if not h2h_df.empty:
-        # 選手別の直対成績を集計
-        h2h_summary = h2h_df.groupby(['player_id', 'player_name', 'opponent_id', 'opponent_name']).agg({
-            'point_diff': ['sum', 'mean', 'count']
-        }).reset_index()
-
-        h2h_summary.columns = ['player_id', 'player_name', 'opponent_id', 'opponent_name',
-                               'total_diff', 'avg_diff', 'games']
+    # 直対成績は pair_stats（半荘記録入力時に更新）から取得
+    h2h_season = None if selected_period == "全期間" else selected_period
+    h2h_players = get_pair_entities("player", h2h_season)
 
+    if not h2h_players.empty:
         # 選手選択
-        players_list = sorted(h2h_summary['player_name'].unique())
+        player_name_to_id = dict(
+            zip(h2h_players['entity_name'], h2h_players['entity_id']))
+        players_list = sorted(player_name_to_id.keys())
 
         selected_player = st.selectbox("選手を選択", players_list)
 
         if selected_player:
             st.markdown(f"### {selected_player} の直対成績")
 
-            player_h2h = h2h_summary[h2h_summary['player_name']
-                                     == selected_player].copy()
+            player_h2h = get_pair_stats(
+                "player", h2h_season, entity_ids=[player_name_to_id[selected_player]])
             player_h2h = player_h2h.sort_values('total_diff', ascending=False)
             player_h2h.insert(0, '順位', range(1, len(player_h2h) + 1))
 
             # 表示用に整形
             display_df = player_h2h[[
-                '順位', 'opponent_name', 'games', 'total_diff', 'avg_diff'
+                '順位', 'opponent_name', 'games', 'total_diff', 'avg_diff', 'ahead', 'behind'
             ]].copy()
 
-            display_df.columns = ['順位', '対戦相手', '対局数', '累積pt差', '平均pt差']
+            display_df.columns = ['順位', '対戦相手', '対局数', '累積pt差', '平均pt差', '先着', '後着']
 
-            display_df['累積pt差'] = display_df['累積pt差'].apply(
-                lambda x: f"{x:+.1f}")
-            display_df['平均pt差'] = display_df['平均pt差'].apply(
-                lambda x: f"{x:+.1f}")
-
-            st.dataframe(display_df, width='stretch',
-                         hide_index=True, height=400)
+            show_table(display_df, width='stretch',
+                       hide_index=True, height=400)
 
             # 統計情報
             col1, col2, col3 = st.columns(3)
@@ -498,29 +329,45 @@ with tab3:
         conn.close()
 
         top_players = top_players_df['player_name'].tolist()
+        top_player_ids = top_players_df['player_id'].tolist()
 
-        # TOP20内の直対成績のみを抽出
-        top_h2h = h2h_summary[
-            (h2h_summary['player_name'].isin(top_players)) &
-            (h2h_summary['opponent_name'].isin(top_players))
-        ]
-
-        # ピボットテーブルを作成
-        pivot_data = top_h2h.pivot_table(
-            index='player_name',
-            columns='opponent_name',
-            values='total_diff',
-            aggfunc='sum'
-        )
+        # 直対成績の疎行列からTOP20同士の部分行列のみを取り出す
+        h2h_matrix = get_pair_matrix("player", h2h_season)
+        pivot_data = pair_matrix_submatrix(h2h_matrix, top_player_ids)
+        pivot_data.index = top_players
+        pivot_data.columns = top_players
 
-        # 名前順でソート
-        pivot_data = pivot_data.reindex(index=top_players, columns=top_players)
+        show_table(pivot_data, formats=dict.fromkeys(pivot_data.columns, SIGNED_1), width='stretch', height=600)
 
-        # フォーマット
-        pivot_display = pivot_data.map(
-            lambda x: f"{x:+.1f}" if pd.notna(x) else "-")
+    else:
+        st.info("直対成績データがありません。")
 
-        st.dataframe(pivot_display, width='stretch', height=600)
+# ========== タブ4: 累積ポイント推移 ==========
+with tab4:
+    st.markdown("## 🏁 累積ポイント推移")
+    st.markdown("半荘ごとの累積ポイントの推移です。横軸はリーグ全体の通算半荘数です。")
+
+    # 既定は累積pt上位10名
+    player_totals = df.groupby(['player_id', 'player_name'])['points'].sum(
+    ).sort_values(ascending=False).reset_index()
+    player_options = dict(zip(player_totals['player_name'], player_totals['player_id']))
+
+    selected_players = st.multiselect(
+        "表示する選手",
+        list(player_options),
+        default=list(player_options)[:10],
+        key="race_players"
+    )
+
+    if selected_players:
+        race_fig, plotted_points, total_points = cumulative_race_chart(
+            df, 'player_id', 'player_name',
+            title=f"選手別 累積ポイント推移（{selected_period}）",
+            entity_ids=[player_options[name] for name in selected_players]
+        )
+        st.plotly_chart(race_fig, width='stretch')
 
+        if plotted_points < total_points:
+            st.caption(f"※ 描画点数を {total_points:,} → {plotted_points:,} 点に間引いています（各区間の最大・最小は保持）")
     else:
-        st.info("直対成績データがありません。")
+        st.info("表示する選手を選択してください")
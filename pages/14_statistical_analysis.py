@@ -2,7 +2,12 @@ import sys
 import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
-from db import get_connection, show_sidebar_navigation
+from db import (
+    get_connection, get_season_partials, get_table_versions, merge_partials
+)
+from navigation import show_sidebar_navigation
+from tables import DECIMAL_2, DECIMAL_3, SIGNED_2, show_table
+from inference import bootstrap_group_means, permutation_chi_square_test, permutation_test_groups
 sys.path.append("..")
 
 st.set_page_config(
@@ -67,75 +72,21 @@ st.markdown("""
 各席（東・南・西・北）での全選手の成績を集計し、席による有利・不利を分析します。
 """)
 
-# データ取得
-conn = get_connection()
-
-if selected_period == "全期間":
-    query = """
-        SELECT 
-            seat_name,
-            COUNT(*) as games,
-            AVG(points) as avg_points,
-            AVG(rank) as avg_rank,
-            SUM(CASE WHEN rank = 1 THEN 1 ELSE 0 END) as rank_1st,
-            SUM(CASE WHEN rank = 2 THEN 1 ELSE 0 END) as rank_2nd,
-            SUM(CASE WHEN rank = 3 THEN 1 ELSE 0 END) as rank_3rd,
-            SUM(CASE WHEN rank = 4 THEN 1 ELSE 0 END) as rank_4th
-        FROM game_results
-        GROUP BY seat_name
-        ORDER BY 
-            CASE seat_name
-                WHEN '東' THEN 1
-                WHEN '南' THEN 2
-                WHEN '西' THEN 3
-                WHEN '北' THEN 4
-            END
-    """
-    cursor = conn.cursor()
-    cursor.execute(query)
-else:
-    query = """
-        SELECT 
-            seat_name,
-            COUNT(*) as games,
-            AVG(points) as avg_points,
-            AVG(rank) as avg_rank,
-            SUM(CASE WHEN rank = 1 THEN 1 ELSE 0 END) as rank_1st,
-            SUM(CASE WHEN rank = 2 THEN 1 ELSE 0 END) as rank_2nd,
-            SUM(CASE WHEN rank = 3 THEN 1 ELSE 0 END) as rank_3rd,
-            SUM(CASE WHEN rank = 4 THEN 1 ELSE 0 END) as rank_4th
-        FROM game_results
-        WHERE season = ?
-        GROUP BY seat_name
-        ORDER BY 
-            CASE seat_name
-                WHEN '東' THEN 1
-                WHEN '南' THEN 2
-                WHEN '西' THEN 3
-                WHEN '北' THEN 4
-            END
-    """
-    cursor = conn.cursor()
-    cursor.execute(query, (selected_period,))
-
-results = cursor.fetchall()
-conn.close()
+# データ取得（シーズン別部分集計を合算）
+period_season = None if selected_period == "全期間" else selected_period
+partials = get_season_partials(period_season)
 
-if not results:
+if partials.empty:
     st.warning("選択した期間に該当するデータがありません。")
     st.stop()
 
-# DataFrameに変換
-df = pd.DataFrame(results, columns=[
-    'seat_name', 'games', 'avg_points', 'avg_rank',
-    'rank_1st', 'rank_2nd', 'rank_3rd', 'rank_4th'
-])
+seat_order = {'東': 1, '南': 2, '西': 3, '北': 4}
+df = merge_partials(partials, ['seat_name'])
+df = df.sort_values('seat_name', key=lambda s: s.map(seat_order)).reset_index(drop=True)
 
-# 1位率などを計算
-df['rate_1st'] = (df['rank_1st'] / df['games'] * 100).round(2)
-df['rate_2nd'] = (df['rank_2nd'] / df['games'] * 100).round(2)
-df['rate_3rd'] = (df['rank_3rd'] / df['games'] * 100).round(2)
-df['rate_4th'] = (df['rank_4th'] / df['games'] * 100).round(2)
+# 1位率などを丸める
+rate_cols = ['rate_1st', 'rate_2nd', 'rate_3rd', 'rate_4th']
+df[rate_cols] = df[rate_cols].round(2)
 
 # ========== サマリーテーブル ==========
 st.markdown("### 📊 席順別統計サマリー")
@@ -148,25 +99,18 @@ display_df = df[['seat_name', 'games', 'avg_points', 'avg_rank',
 display_df.columns = ['席', '対局数', '平均pt', '平均順位',
                       '1位', '2位', '3位', '4位', '1位率(%)']
 
-# フォーマット
-display_df['平均pt'] = display_df['平均pt'].apply(lambda x: f"{x:+.2f}")
-display_df['平均順位'] = display_df['平均順位'].apply(lambda x: f"{x:.3f}")
-display_df['1位率(%)'] = display_df['1位率(%)'].apply(lambda x: f"{x:.2f}")
-
-st.dataframe(
+show_table(
     display_df,
+    formats={'平均pt': SIGNED_2, '平均順位': DECIMAL_3, '1位率(%)': DECIMAL_2},
     hide_index=True,
     width='stretch',
     column_config={
         '席': st.column_config.TextColumn(width="small"),
         '対局数': st.column_config.NumberColumn(width="small"),
-        '平均pt': st.column_config.TextColumn(width="small"),
-        '平均順位': st.column_config.TextColumn(width="small"),
         '1位': st.column_config.NumberColumn(width="small"),
         '2位': st.column_config.NumberColumn(width="small"),
         '3位': st.column_config.NumberColumn(width="small"),
         '4位': st.column_config.NumberColumn(width="small"),
-        '1位率(%)': st.column_config.TextColumn(width="small"),
     }
 )
 
@@ -187,7 +131,7 @@ with tab1:
         x=df['seat_name'],
         y=df['avg_points'],
         marker_color=colors,
-        text=df['avg_points'].apply(lambda x: f"{x:+.2f}"),
+        texttemplate="%{y:+.2f}",
         textposition='outside',
         showlegend=False
     ))
@@ -217,7 +161,7 @@ with tab2:
         x=df['seat_name'],
         y=df['avg_rank'],
         marker_color=colors,
-        text=df['avg_rank'].apply(lambda x: f"{x:.3f}"),
+        texttemplate="%{y:.3f}",
         textposition='outside',
         showlegend=False
     ))
@@ -248,7 +192,7 @@ with tab3:
         x=df['seat_name'],
         y=df['rate_1st'],
         marker_color='#FFD700',
-        text=df['rate_1st'].apply(lambda x: f"{x:.1f}%"),
+        texttemplate="%{y:.1f}%",
         textposition='inside'
     ))
 
@@ -257,7 +201,7 @@ with tab3:
         x=df['seat_name'],
         y=df['rate_2nd'],
         marker_color='#C0C0C0',
-        text=df['rate_2nd'].apply(lambda x: f"{x:.1f}%"),
+        texttemplate="%{y:.1f}%",
         textposition='inside'
     ))
 
@@ -266,7 +210,7 @@ with tab3:
         x=df['seat_name'],
         y=df['rate_3rd'],
         marker_color='#CD7F32',
-        text=df['rate_3rd'].apply(lambda x: f"{x:.1f}%"),
+        texttemplate="%{y:.1f}%",
         textposition='inside'
     ))
 
@@ -275,7 +219,7 @@ with tab3:
         x=df['seat_name'],
         y=df['rate_4th'],
         marker_color='#808080',
-        text=df['rate_4th'].apply(lambda x: f"{x:.1f}%"),
+        texttemplate="%{y:.1f}%",
         textposition='inside'
     ))
 
@@ -315,7 +259,7 @@ with tab4:
         x=df['seat_name'],
         y=df['rate_1st'],
         marker_color=colors,
-        text=df['rate_1st'].apply(lambda x: f"{x:.2f}%"),
+        texttemplate="%{y:.2f}%",
         textposition='outside',
         name='実測値',
         showlegend=True
@@ -345,6 +289,134 @@ with tab4:
             st.info(
                 f"**{row['seat_name']}家**: {row['rate_1st']:.2f}% （理論値と一致）")
 
+# ========== 統計的検定 ==========
+@st.cache_data(show_spinner="統計的検定を計算中...")
+def run_seat_inference(season, version):
+    """
+    席順別の検定を実行（期間ごとにキャッシュ。version は半荘記録の変更時にキャッシュを更新するためのキー）
+    1対局の4人は独立でないため、並べ替えは対局内で行い、ブートストラップは対局単位で抽出する
+    """
+    conn = get_connection()
+    query = """
+        SELECT season, game_date, table_type, game_number, seat_name, points, rank
+        FROM game_results
+        WHERE seat_name IN ('東', '南', '西', '北')
+    """
+    params = ()
+    if season is not None:
+        query += " AND season = ?"
+        params = (season,)
+    games_df = pd.read_sql_query(query, conn, params=params)
+    conn.close()
+
+    seats = [seat for seat in ['東', '南', '西', '北'] if seat in set(games_df['seat_name'])]
+    game_ids = games_df.groupby(
+        ['season', 'game_date', 'table_type', 'game_number'], dropna=False, sort=False).ngroup().values
+    seat_values = games_df['seat_name'].values
+    point_values = games_df['points'].values
+
+    chi2 = permutation_chi_square_test(seat_values, games_df['rank'].values, blocks=game_ids,
+                                       group_labels=seats, category_labels=[1, 2, 3, 4])
+    boot = bootstrap_group_means(point_values, seat_values, blocks=game_ids)
+    perm = permutation_test_groups(point_values, seat_values, blocks=game_ids)
+
+    residuals_df = pd.DataFrame(chi2['residuals'], index=seats, columns=['1位', '2位', '3位', '4位'])
+    boot_df = pd.DataFrame([
+        {'seat_name': seat, 'mean': boot[seat][0], 'lower': boot[seat][1], 'upper': boot[seat][2]}
+        for seat in seats
+    ])
+    perm_df = pd.DataFrame({
+        'seat_name': [str(label) for label in perm['labels']],
+        'diff': perm['diffs'],
+        'p_value': perm['group_p_values'],
+    }).set_index('seat_name').reindex(seats).reset_index()
+
+    return {
+        'chi2_statistic': chi2['statistic'],
+        'chi2_dof': chi2['dof'],
+        'chi2_p_value': chi2['p_value'],
+        'chi2_asymptotic_p_value': chi2['asymptotic_p_value'],
+        'chi2_perm_count': chi2['n_perm'],
+        'residuals': residuals_df,
+        'bootstrap': boot_df,
+        'perm_p_value': perm['p_value'],
+        'perm_count': perm['n_perm'],
+        'permutation': perm_df,
+    }
+
+
+st.markdown("---")
+st.subheader("🔬 統計的検定")
+
+st.markdown("""
+席による差が偶然の範囲を超えているかを検定します（有意水準 5%）。
+- **カイ二乗検定**: 席と順位の分布が独立か（席によって順位の出方が変わるか）
+- **ブートストラップ**: 席別平均ポイントの95%信頼区間（対局単位で復元抽出）
+- **並べ替え検定**: 席のラベルを入れ替えたときに、観測された平均ptの差が生じる確率
+
+1対局では各席・各順位が1回ずつ現れ、素点の合計は0になるため、同じ対局の4人の結果は独立ではありません。
+p値はいずれも、対局内で席を入れ替えた並べ替えから求めています。
+""")
+
+# 対象期間の半荘記録が変わった場合のみ再計算（変更ジャーナルの最新 seq）
+game_versions = get_table_versions("game_results")
+if period_season is None:
+    inference_version = max(game_versions.values(), default=0)
+else:
+    inference_version = game_versions.get(period_season, 0)
+inference = run_seat_inference(period_season, inference_version)
+
+col1, col2 = st.columns(2)
+
+with col1:
+    st.markdown("#### 📐 カイ二乗検定（席 × 順位）")
+    st.metric(
+        "p値",
+        f"{inference['chi2_p_value']:.4f}",
+        f"χ² = {inference['chi2_statistic']:.2f}（自由度 {inference['chi2_dof']}）",
+        delta_color="off"
+    )
+    st.caption(f"対局内の並べ替え {inference['chi2_perm_count']:,}回"
+               f"（参考: 行を独立とみなした漸近p値 {inference['chi2_asymptotic_p_value']:.4f}）")
+    if inference['chi2_p_value'] < 0.05:
+        st.success("席によって順位分布に有意な差があります")
+    else:
+        st.info("席による順位分布の差は有意ではありません")
+
+    st.markdown("**標準化残差**（±2を超えるセルは期待値から大きく外れている）")
+    residuals = inference['residuals']
+    show_table(residuals, formats=dict.fromkeys(residuals.columns, SIGNED_2), width='stretch')
+
+with col2:
+    st.markdown("#### 🎲 並べ替え検定（平均pt）")
+    st.metric("全体のp値", f"{inference['perm_p_value']:.4f}")
+    st.caption(f"対局内の並べ替え {inference['perm_count']:,}回")
+
+    test_df = inference['permutation'].merge(inference['bootstrap'], on='seat_name')
+    display_df = pd.DataFrame({
+        '席': test_df['seat_name'] + '家',
+        '平均pt': test_df['mean'],
+        '95%下限': test_df['lower'],
+        '95%上限': test_df['upper'],
+        '他席との差': test_df['diff'],
+        'p値': test_df['p_value'],
+        '判定': test_df['p_value'].lt(0.05).map({True: '有意', False: '-'}),
+    })
+    show_table(
+        display_df,
+        formats={'平均pt': SIGNED_2, '95%下限': SIGNED_2, '95%上限': SIGNED_2,
+                 '他席との差': SIGNED_2, 'p値': "%.4f"},
+        hide_index=True,
+        width='stretch'
+    )
+
+st.info("""
+💡 **検定結果の見方**
+- p値が0.05未満であれば、その差は偶然では説明しにくい（統計的に有意）
+- 信頼区間が0をまたがない席は、平均ptが0から有意に離れている
+- 複数の席を同時に検定しているため、境界付近のp値は慎重に解釈してください
+""")
+
 # ========== 統計的考察 ==========
 st.markdown("---")
 st.subheader("📝 統計的考察")
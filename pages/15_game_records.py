@@ -1,7 +1,10 @@
 import sys
 import streamlit as st
 import pandas as pd
-from db import get_connection, show_sidebar_navigation
+import plotly.graph_objects as go
+from db import format_duration, get_connection, get_game_durations
+from navigation import show_sidebar_navigation
+from tables import show_table
 sys.path.append("..")
 
 st.set_page_config(
@@ -17,38 +20,9 @@ st.title("📜 対局記録")
 st.markdown("""
 半荘記録から、特筆すべき対局の記録を表示します。
 - **試合時間記録**: 最短・最長対局のランキング
+- **対局時間の分布**: 卓区分別・開始時刻別・面子別の対局時間
 """)
 
-# ========== 対局時間を計算する関数 ==========
-def calc_duration_minutes(start_time, end_time):
-    """HH:MM形式の時刻から対局時間（分）を計算"""
-    try:
-        start_parts = start_time.split(':')
-        end_parts = end_time.split(':')
-
-        start_minutes = int(start_parts[0]) * 60 + int(start_parts[1])
-        end_minutes = int(end_parts[0]) * 60 + int(end_parts[1])
-
-        duration = end_minutes - start_minutes
-
-        # 日をまたぐ場合（負の値になる場合）
-        if duration < 0:
-            duration += 24 * 60
-
-        return duration
-    except (ValueError, IndexError, TypeError):
-        return None
-
-
-def format_duration(minutes):
-    """分を H:MM 形式に変換"""
-    if minutes is None:
-        return "-"
-    hours = int(minutes // 60)
-    mins = int(minutes % 60)
-    return f"{hours}:{mins:02d}"
-
-
 # ========== データ取得 ==========
 conn = get_connection()
 cursor = conn.cursor()
@@ -57,7 +31,7 @@ cursor = conn.cursor()
 cursor.execute("""
     SELECT DISTINCT season 
     FROM game_results 
-    WHERE start_time IS NOT NULL AND end_time IS NOT NULL
+    WHERE duration_minutes IS NOT NULL
     ORDER BY season DESC
 """)
 seasons = [row[0] for row in cursor.fetchall()]
@@ -74,155 +48,111 @@ st.markdown("---")
 period_options = ["全期間"] + seasons
 selected_period = st.selectbox("期間", period_options)
 
-# データ取得: 各対局の開始/終了時刻を選択期間で取得し、選手別に集計します
-conn = get_connection()
-
-if selected_period == "全期間":
-    query = """
-        SELECT 
-            gr.player_id,
-            p.player_name,
-            gr.game_date,
-            gr.game_number,
-            gr.start_time,
-            gr.end_time
-        FROM game_results gr
-        JOIN players p ON gr.player_id = p.player_id
-        WHERE gr.start_time IS NOT NULL AND gr.end_time IS NOT NULL
-        ORDER BY gr.game_date, gr.game_number
-    """
-    time_df = pd.read_sql_query(query, conn)
-else:
-    query = """
-        SELECT 
-            gr.player_id,
-            p.player_name,
-            gr.game_date,
-            gr.game_number,
-            gr.start_time,
-            gr.end_time
-        FROM game_results gr
-        JOIN players p ON gr.player_id = p.player_id
-        WHERE gr.season = ? AND gr.start_time IS NOT NULL AND gr.end_time IS NOT NULL
-        ORDER BY gr.game_date, gr.game_number
-    """
-    time_df = pd.read_sql_query(query, conn, params=(selected_period,))
+# 選手別の対局時間（書き込み時に計算済みの duration_minutes を集計）
+period_season = None if selected_period == "全期間" else selected_period
+season_filter = "" if period_season is None else "AND gr.season = ?"
+season_params = () if period_season is None else (period_season,)
 
+conn = get_connection()
+player_time_stats = pd.read_sql_query(f"""
+    SELECT 
+        gr.player_id,
+        p.player_name,
+        COUNT(*) as games,
+        AVG(gr.duration_minutes) as avg_duration,
+        MIN(gr.duration_minutes) as min_duration,
+        MAX(gr.duration_minutes) as max_duration
+    FROM game_results gr
+    JOIN players p ON gr.player_id = p.player_id
+    WHERE gr.duration_minutes IS NOT NULL {season_filter}
+    GROUP BY gr.player_id, p.player_name
+""", conn, params=season_params)
 conn.close()
 
-if time_df.empty:
+if player_time_stats.empty:
     st.info(f"{selected_period}の有効な対局時間データがありません。")
 else:
-    # 各行の対局時間を計算
-    def calc_duration(row):
-        return calc_duration_minutes(row['start_time'], row['end_time'])
-
-    time_df['duration'] = time_df.apply(calc_duration, axis=1)
-    time_df = time_df[time_df['duration'].notna()]
-
-    if time_df.empty:
-        st.info(f"{selected_period}の有効な対局時間データがありません。")
-    else:
-        # 選手別に集計
-        player_time_stats = time_df.groupby(['player_id', 'player_name']).agg(
-            games=('duration', 'count'),
-            avg_duration=('duration', 'mean'),
-            min_duration=('duration', 'min'),
-            max_duration=('duration', 'max')
-        ).reset_index()
-
-        player_time_stats = player_time_stats.sort_values('avg_duration', ascending=True)
-        player_time_stats.insert(0, '順位', range(1, len(player_time_stats) + 1))
+    player_time_stats = player_time_stats.sort_values('avg_duration', ascending=True)
+    player_time_stats.insert(0, '順位', range(1, len(player_time_stats) + 1))
 
-        display_df = player_time_stats[[
-            '順位', 'player_name', 'games', 'avg_duration', 'min_duration', 'max_duration'
-        ]].copy()
-        display_df.columns = ['順位', '選手名', '対局数', '平均時間', '最短時間', '最長時間']
+    display_df = player_time_stats[[
+        '順位', 'player_name', 'games', 'avg_duration', 'min_duration', 'max_duration'
+    ]].copy()
+    display_df.columns = ['順位', '選手名', '対局数', '平均時間', '最短時間', '最長時間']
 
-        display_df['平均時間'] = display_df['平均時間'].apply(format_duration)
-        display_df['最短時間'] = display_df['最短時間'].apply(format_duration)
-        display_df['最長時間'] = display_df['最長時間'].apply(format_duration)
+    display_df['平均時間'] = display_df['平均時間'].apply(format_duration)
+    display_df['最短時間'] = display_df['最短時間'].apply(format_duration)
+    display_df['最長時間'] = display_df['最長時間'].apply(format_duration)
 
-        st.dataframe(display_df, hide_index=True)
+    show_table(display_df, hide_index=True)
 
-        st.info("💡 対局時間は「開始時間」から「終了時間」までの所要時間です。時間が記録されている対局のみが対象となります。")
+    st.info("💡 対局時間は「開始時間」から「終了時間」までの所要時間です。時間が記録されている対局のみが対象となります。")
 
 st.markdown("---")
 st.caption("※ データはデータベースに登録された情報を表示しています。")
+# 対局単位の集計（duration_minutes は半荘記録の保存時に計算済み）
 conn = get_connection()
-
-if selected_period == "全期間":
-    query = """
-        SELECT 
-            gr.season,
-            gr.game_date,
-            gr.table_type,
-            gr.game_number,
-            gr.start_time,
-            gr.end_time,
-            GROUP_CONCAT(p.player_name, ', ') as players
-        FROM game_results gr
-        JOIN players p ON gr.player_id = p.player_id
-        WHERE gr.start_time IS NOT NULL AND gr.end_time IS NOT NULL
-        GROUP BY gr.season, gr.game_date, gr.table_type, gr.game_number
-        ORDER BY gr.game_date, gr.game_number
-    """
-    cursor = conn.cursor()
-    cursor.execute(query)
-else:
-    query = """
-        SELECT 
-            gr.season,
-            gr.game_date,
-            gr.table_type,
-            gr.game_number,
-            gr.start_time,
-            gr.end_time,
-            GROUP_CONCAT(p.player_name, ', ') as players
+cursor = conn.cursor()
+cursor.execute(f"""
+    SELECT COUNT(*), AVG(duration_minutes), MIN(duration_minutes), MAX(duration_minutes)
+    FROM (
+        SELECT MIN(gr.duration_minutes) as duration_minutes
         FROM game_results gr
-        JOIN players p ON gr.player_id = p.player_id
-        WHERE gr.season = ? 
-            AND gr.start_time IS NOT NULL 
-            AND gr.end_time IS NOT NULL
+        WHERE gr.duration_minutes IS NOT NULL {season_filter}
         GROUP BY gr.season, gr.game_date, gr.table_type, gr.game_number
-        ORDER BY gr.game_date, gr.game_number
-    """
-    cursor = conn.cursor()
-    cursor.execute(query, (selected_period,))
-
-results = cursor.fetchall()
+    )
+""", season_params)
+total_games, avg_duration, min_duration, max_duration = cursor.fetchone()
 conn.close()
 
-if not results:
+if not total_games:
     st.warning("選択した期間に試合時間が記録された対局がありません。")
     st.stop()
 
-# DataFrameに変換
-df = pd.DataFrame(results, columns=[
-    'season', 'game_date', 'table_type', 'game_number',
-    'start_time', 'end_time', 'players'
-])
-
-# 対局時間を計算
-df['duration_minutes'] = df.apply(
-    lambda row: calc_duration_minutes(row['start_time'], row['end_time']),
-    axis=1
-)
 
-# 計算できなかった行を除外
-df = df[df['duration_minutes'].notna()].copy()
+def fetch_duration_top10(descending):
+    """対局時間の短い順（descending=True で長い順）に上位10対局を取得（対局時間インデックスを順に走査）"""
+    order = "DESC" if descending else "ASC"
+    conn = get_connection()
+    top_df = pd.read_sql_query(f"""
+        WITH top_games AS (
+            SELECT DISTINCT gr.duration_minutes, gr.season, gr.game_date, gr.table_type, gr.game_number
+            FROM game_results gr
+            WHERE gr.duration_minutes IS NOT NULL {season_filter}
+            ORDER BY gr.duration_minutes {order}, gr.season {order}, gr.game_date {order},
+                     gr.table_type {order}, gr.game_number {order}
+            LIMIT 10
+        )
+        SELECT 
+            t.season,
+            t.game_date,
+            t.table_type,
+            t.game_number,
+            MIN(gr.start_time) as start_time,
+            MIN(gr.end_time) as end_time,
+            t.duration_minutes,
+            GROUP_CONCAT(p.player_name, ', ') as players
+        FROM top_games t
+        JOIN game_results gr
+            ON gr.season = t.season
+            AND gr.game_date = t.game_date
+            AND gr.table_type IS t.table_type
+            AND gr.game_number IS t.game_number
+        JOIN players p ON gr.player_id = p.player_id
+        GROUP BY t.season, t.game_date, t.table_type, t.game_number, t.duration_minutes
+        ORDER BY t.duration_minutes {order}, t.season {order}, t.game_date {order}
+    """, conn, params=season_params)
+    conn.close()
 
-if df.empty:
-    st.warning("試合時間を計算できる対局がありません。")
-    st.stop()
+    # 対局時間をフォーマット
+    top_df['duration_formatted'] = top_df['duration_minutes'].apply(format_duration)
+    return top_df
 
-# 対局時間をフォーマット
-df['duration_formatted'] = df['duration_minutes'].apply(format_duration)
 
 # ========== 最短対局トップ10 ==========
 st.markdown("### 🏃 最短対局 TOP10")
 
-shortest_df = df.nsmallest(10, 'duration_minutes').copy()
+shortest_df = fetch_duration_top10(descending=False)
 
 # 表示用に整形
 shortest_display = shortest_df[[
@@ -237,7 +167,7 @@ shortest_display.columns = [
 # ランクを追加
 shortest_display.insert(0, '順位', range(1, len(shortest_display) + 1))
 
-st.dataframe(
+show_table(
     shortest_display,
     hide_index=True,
     column_config={
@@ -261,7 +191,7 @@ if not shortest_df.empty:
 st.markdown("---")
 st.markdown("### 🐢 最長対局 TOP10")
 
-longest_df = df.nlargest(10, 'duration_minutes').copy()
+longest_df = fetch_duration_top10(descending=True)
 
 # 表示用に整形
 longest_display = longest_df[[
@@ -276,7 +206,7 @@ longest_display.columns = [
 # ランクを追加
 longest_display.insert(0, '順位', range(1, len(longest_display) + 1))
 
-st.dataframe(
+show_table(
     longest_display,
     hide_index=True,
     column_config={
@@ -303,21 +233,105 @@ st.markdown("### 📊 試合時間の統計")
 col1, col2, col3, col4 = st.columns(4)
 
 with col1:
-    total_games = len(df)
     st.metric("記録対局数", f"{total_games}局")
 
 with col2:
-    avg_duration = df['duration_minutes'].mean()
     st.metric("平均時間", format_duration(int(avg_duration)))
 
 with col3:
-    min_duration = df['duration_minutes'].min()
     st.metric("最短時間", format_duration(int(min_duration)))
 
 with col4:
-    max_duration = df['duration_minutes'].max()
     st.metric("最長時間", format_duration(int(max_duration)))
 
+# ========== 対局時間の分布 ==========
+st.markdown("---")
+st.markdown("### 📈 対局時間の分布")
+
+durations_df = get_game_durations(period_season)
+
+tab_table_type, tab_start_hour, tab_lineup = st.tabs(
+    ["卓区分別", "開始時刻別", "面子別"], key="duration_tabs", on_change="rerun")
+
+
+def summarize_durations(group_col):
+    """group_col ごとの対局数・平均・最短・最長・標準偏差"""
+    summary = durations_df.groupby(group_col)['duration_minutes'].agg(
+        ['count', 'mean', 'min', 'max', 'std']).reset_index()
+    summary.columns = [group_col, '対局数', '平均時間', '最短時間', '最長時間', '標準偏差(分)']
+    for col in ['平均時間', '最短時間', '最長時間']:
+        summary[col] = summary[col].apply(format_duration)
+    return summary
+
+
+if tab_table_type.open:
+    with tab_table_type:
+        fig = go.Figure()
+        for table_type, group in durations_df.groupby('table_type'):
+            fig.add_trace(go.Box(
+                y=group['duration_minutes'],
+                name=table_type or '（未設定）',
+                boxmean=True
+            ))
+        fig.update_layout(
+            yaxis_title="対局時間（分）",
+            height=400,
+            showlegend=False
+        )
+        st.plotly_chart(fig, width='stretch')
+
+        summary = summarize_durations('table_type')
+        summary = summary.rename(columns={'table_type': '卓区分'})
+        show_table(summary, hide_index=True, width='stretch')
+
+if tab_start_hour.open:
+    with tab_start_hour:
+        hour_df = durations_df[durations_df['start_hour'].notna()].copy()
+        hour_df['start_hour'] = hour_df['start_hour'].astype(int)
+        hour_stats = hour_df.groupby('start_hour')['duration_minutes'].agg(
+            ['count', 'mean']).reset_index()
+
+        fig = go.Figure(go.Bar(
+            x=hour_stats['start_hour'].astype(str) + "時台",
+            y=hour_stats['mean'],
+            text=hour_stats['mean'].apply(format_duration),
+            textposition='outside',
+            customdata=hour_stats['count'],
+            hovertemplate="%{x}<br>平均 %{text}<br>%{customdata}局<extra></extra>"
+        ))
+        fig.update_layout(
+            xaxis_title="開始時刻",
+            yaxis_title="平均対局時間（分）",
+            height=400
+        )
+        st.plotly_chart(fig, width='stretch')
+
+        summary = summarize_durations('start_hour')
+        summary = summary.rename(columns={'start_hour': '開始時刻'})
+        show_table(summary, formats={'開始時刻': "%d時台"}, hide_index=True, width='stretch')
+
+if tab_lineup.open:
+    with tab_lineup:
+        st.markdown("同じ4名で2局以上対局した面子の対局時間（平均の短い順）")
+
+        lineup_counts = durations_df['lineup'].value_counts()
+        repeated = durations_df[durations_df['lineup'].isin(
+            lineup_counts[lineup_counts >= 2].index)]
+
+        if repeated.empty:
+            st.info("同じ面子で2局以上対局した記録がありません。")
+        else:
+            lineup_stats = repeated.groupby('lineup')['duration_minutes'].agg(
+                ['count', 'mean', 'min', 'max']).reset_index().sort_values('mean')
+            display_df = pd.DataFrame({
+                '対局者': lineup_stats['lineup'],
+                '対局数': lineup_stats['count'],
+                '平均時間': lineup_stats['mean'].apply(format_duration),
+                '最短時間': lineup_stats['min'].apply(format_duration),
+                '最長時間': lineup_stats['max'].apply(format_duration),
+            })
+            show_table(display_df, hide_index=True, width='stretch')
+
 # 時間分布の説明
 st.markdown("---")
 st.info("""
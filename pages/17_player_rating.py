@@ -2,7 +2,9 @@ import sys
 import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
-from db import get_connection, get_player_ratings, get_player_rating_history, show_sidebar_navigation
+from db import get_connection, get_player_ratings, get_player_rating_history
+from navigation import show_sidebar_navigation
+from tables import show_table
 
 sys.path.append("..")
 
@@ -51,7 +53,6 @@ with tab1:
         ]
         
         # フォーマット
-        display_df['レート'] = display_df['レート'].apply(lambda x: f"{x:.1f}")
         display_df['対局数'] = display_df['対局数'].astype(int)
         
         # 指標表示
@@ -65,7 +66,7 @@ with tab1:
         with col4:
             st.metric("📈 総対局数", int(rating_df['games'].sum()))
         
-        st.dataframe(display_df, hide_index=True)
+        show_table(display_df, hide_index=True)
         
         # グラフ表示
         st.markdown("---")
@@ -208,11 +209,7 @@ with tab2:
             display_history = display_history.sort_values('対局日', ascending=False)
             display_history.insert(0, '順位', range(1, len(display_history) + 1))
             
-            display_history['対局前'] = display_history['対局前'].apply(lambda x: f"{x:.1f}")
-            display_history['変動Δ'] = display_history['変動Δ'].apply(lambda x: f"{x:+.1f}")
-            display_history['対局後'] = display_history['対局後'].apply(lambda x: f"{x:.1f}")
-            
-            st.dataframe(display_history, hide_index=True)
+            show_table(display_history, hide_index=True)
         else:
             st.info("📊 この選手のレーティング履歴がまだありません。")
     else:
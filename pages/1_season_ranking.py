@@ -2,13 +2,18 @@ import sys
 import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
+from charts import ranking_bar_chart
 from db import (
     get_team_colors,
     get_seasons,
     get_season_data,
     get_connection,
-    show_sidebar_navigation
+    format_duration,
+    get_cube_rollup,
+    get_team_names_for_season
 )
+from navigation import show_sidebar_navigation
+from tables import show_table
 sys.path.append("..")
 
 st.set_page_config(
@@ -43,28 +48,13 @@ col1, col2 = st.columns([2, 1])
 
 with col1:
     # 横棒グラフ
-    fig = go.Figure()
-
-    for _, row in filtered_df.iterrows():
-        color = team_colors.get(row["team_id"], "#888888")
-        fig.add_trace(go.Bar(
-            y=[row["team_name"]],
-            x=[row["points"]],
-            orientation="h",
-            marker_color=color,
-            name=row["team_name"],
-            text=f"{row['points']:+.1f}",
-            textposition="outside",
-            showlegend=False
-        ))
-
-    fig.update_layout(
+    fig = ranking_bar_chart(
+        filtered_df.assign(color=filtered_df["team_id"].map(team_colors)),
+        "team_name", "points",
         title=f"{selected_season}シーズン チーム別ポイント",
         xaxis_title="ポイント",
-        yaxis_title="",
-        height=400,
-        margin=dict(l=20, r=100, t=50, b=50),
-        xaxis=dict(zeroline=True, zerolinecolor="gray", zerolinewidth=2)
+        color_col="color",
+        hover=(("ポイント", "points", "+.1f"),)
     )
 
     st.plotly_chart(fig)
@@ -76,10 +66,9 @@ with col2:
     rank_df = filtered_df.sort_values(
         "rank")[["rank", "team_name", "points"]].copy()
     rank_df.columns = ["順位", "チーム", "ポイント"]
-    rank_df["ポイント"] = rank_df["ポイント"].apply(lambda x: f"{x:+.1f}")
     rank_df = rank_df.reset_index(drop=True)
 
-    st.dataframe(rank_df, hide_index=True)
+    show_table(rank_df, hide_index=True)
 
 st.markdown("---")
 
@@ -99,189 +88,171 @@ cursor.execute("""
 game_count = cursor.fetchone()[0]
 
 if game_count > 0:
-    # 半荘記録からチーム別月別成績を取得
-    query = """
-        SELECT 
-            strftime('%Y-%m', gr.game_date) as month,
-            pt.team_id,
-            tn.team_name,
-            SUM(gr.points) as total_points,
-            COUNT(*) as games,
-            AVG(gr.rank) as avg_rank
-        FROM game_results gr
-        JOIN player_teams pt ON gr.player_id = pt.player_id AND gr.season = pt.season
-        JOIN team_names tn ON pt.team_id = tn.team_id AND pt.season = tn.season
-        WHERE gr.season = ?
-        GROUP BY month, pt.team_id, tn.team_name
-        ORDER BY month, total_points DESC
-    """
-
-    df = pd.read_sql_query(query, conn, params=(selected_season,))
+    # 半荘記録からチーム別月別成績を取得（集計キューブのロールアップ）
+    df = get_cube_rollup(['month', 'team_id'], season=selected_season, conn=conn)
+    df = df.merge(get_team_names_for_season(selected_season)[['team_id', 'team_name']], on='team_id')
+    df = df.rename(columns={'points_sum': 'total_points'})
+    df = df.sort_values(['month', 'total_points'], ascending=[True, False])
     conn.close()
 
     if not df.empty:
         months = sorted(df['month'].unique())
 
         # タブで累積ポイントと平均順位を分ける
-        tab_cumulative, tab_avg_rank = st.tabs(["累積ポイント推移", "平均順位推移"])
-
-        with tab_cumulative:
-            st.markdown("### 📈 月別累積ポイント推移")
-
-            # 折れ線グラフ作成
-            fig1 = go.Figure()
-
-            teams = df['team_name'].unique()
-
-            for team_name in sorted(teams):
-                team_data = df[df['team_name'] ==
-                               team_name].sort_values('month')
-
-                fig1.add_trace(go.Scatter(
-                    x=team_data['month'],
-                    y=team_data['total_points'],
-                    mode='lines+markers',
-                    name=team_name,
-                    line=dict(width=2),
-                    marker=dict(size=8),
-                    hovertemplate=(
-                        f'<b>{team_name}</b><br>' +
-                        '月: %{x}<br>' +
-                        '累積pt: %{y:+.1f}<br>' +
-                        '<extra></extra>'
-                    )
-                ))
-
-            fig1.update_layout(
-                title=f"{selected_season}シーズン 月別累積ポイント推移",
-                xaxis_title="月",
-                yaxis_title="累積ポイント",
-                height=500,
-                hovermode='x unified',
-                legend=dict(
-                    orientation="v",
-                    yanchor="top",
-                    y=1,
-                    xanchor="left",
-                    x=1.02
-                ),
-                yaxis=dict(zeroline=True, zerolinecolor="gray",
-                           zerolinewidth=1)
-            )
-
-            st.plotly_chart(fig1, width='stretch')
-
-            # 統計サマリー
-            st.markdown("#### 📊 統計情報")
-
-            col1, col2, col3 = st.columns(3)
-
-            with col1:
-                st.metric("対象月数", f"{len(months)}ヶ月")
-
-            with col2:
-                total_games = df['games'].sum()
-                st.metric("総対局数", f"{int(total_games)}対局")
-
-            with col3:
-                avg_games_per_month = total_games / \
-                    len(months) if len(months) > 0 else 0
-                st.metric("月平均対局数", f"{avg_games_per_month:.1f}対局")
-
-            # 最新月のランキング
-            st.markdown("#### 🏆 最新月のランキング")
-
-            latest_month = months[-1]
-            latest_month_df = df[df['month'] == latest_month].sort_values(
-                'total_points', ascending=False)
-            latest_month_df = latest_month_df.reset_index(drop=True)
-            latest_month_df.insert(0, '順位', range(1, len(latest_month_df) + 1))
-
-            display_latest = latest_month_df[[
-                '順位', 'team_name', 'total_points', 'avg_rank', 'games']].copy()
-            display_latest.columns = ['順位', 'チーム名', '累積pt', '平均順位', '対局数']
-            display_latest['累積pt'] = display_latest['累積pt'].apply(
-                lambda x: f"{x:+.1f}")
-            display_latest['平均順位'] = display_latest['平均順位'].apply(
-                lambda x: f"{x:.2f}")
-
-            st.caption(f"**{latest_month}**")
-            st.dataframe(display_latest, hide_index=True, width='stretch')
-
-        with tab_avg_rank:
-            st.markdown("### 📈 月別平均順位推移")
-
-            # 折れ線グラフ作成
-            fig2 = go.Figure()
-
-            teams = df['team_name'].unique()
-
-            for team_name in sorted(teams):
-                team_data = df[df['team_name'] ==
-                               team_name].sort_values('month')
-
-                fig2.add_trace(go.Scatter(
-                    x=team_data['month'],
-                    y=team_data['avg_rank'],
-                    mode='lines+markers',
-                    name=team_name,
-                    line=dict(width=2),
-                    marker=dict(size=8),
-                    hovertemplate=(
-                        f'<b>{team_name}</b><br>' +
-                        '月: %{x}<br>' +
-                        '平均順位: %{y:.2f}<br>' +
-                        '<extra></extra>'
+        tab_cumulative, tab_avg_rank = st.tabs(
+            ["累積ポイント推移", "平均順位推移"], key="monthly_tabs", on_change="rerun")
+
+        if tab_cumulative.open:
+            with tab_cumulative:
+                st.markdown("### 📈 月別累積ポイント推移")
+
+                # 折れ線グラフ作成
+                fig1 = go.Figure()
+
+                teams = df['team_name'].unique()
+
+                for team_name in sorted(teams):
+                    team_data = df[df['team_name'] ==
+                                   team_name].sort_values('month')
+
+                    fig1.add_trace(go.Scatter(
+                        x=team_data['month'],
+                        y=team_data['total_points'],
+                        mode='lines+markers',
+                        name=team_name,
+                        line=dict(width=2),
+                        marker=dict(size=8),
+                        hovertemplate=(
+                            f'<b>{team_name}</b><br>' +
+                            '月: %{x}<br>' +
+                            '累積pt: %{y:+.1f}<br>' +
+                            '<extra></extra>'
+                        )
+                    ))
+
+                fig1.update_layout(
+                    title=f"{selected_season}シーズン 月別累積ポイント推移",
+                    xaxis_title="月",
+                    yaxis_title="累積ポイント",
+                    height=500,
+                    hovermode='x unified',
+                    legend=dict(
+                        orientation="v",
+                        yanchor="top",
+                        y=1,
+                        xanchor="left",
+                        x=1.02
+                    ),
+                    yaxis=dict(zeroline=True, zerolinecolor="gray",
+                               zerolinewidth=1)
+                )
+
+                st.plotly_chart(fig1, width='stretch')
+
+                # 統計サマリー
+                st.markdown("#### 📊 統計情報")
+
+                col1, col2, col3 = st.columns(3)
+
+                with col1:
+                    st.metric("対象月数", f"{len(months)}ヶ月")
+
+                with col2:
+                    total_games = df['games'].sum()
+                    st.metric("総対局数", f"{int(total_games)}対局")
+
+                with col3:
+                    avg_games_per_month = total_games / \
+                        len(months) if len(months) > 0 else 0
+                    st.metric("月平均対局数", f"{avg_games_per_month:.1f}対局")
+
+                # 最新月のランキング
+                st.markdown("#### 🏆 最新月のランキング")
+
+                latest_month = months[-1]
+                latest_month_df = df[df['month'] == latest_month].sort_values(
+                    'total_points', ascending=False)
+                latest_month_df = latest_month_df.reset_index(drop=True)
+                latest_month_df.insert(0, '順位', range(1, len(latest_month_df) + 1))
+
+                display_latest = latest_month_df[[
+                    '順位', 'team_name', 'total_points', 'avg_rank', 'games']].copy()
+                display_latest.columns = ['順位', 'チーム名', '累積pt', '平均順位', '対局数']
+
+                st.caption(f"**{latest_month}**")
+                show_table(display_latest, hide_index=True, width='stretch')
+
+        if tab_avg_rank.open:
+            with tab_avg_rank:
+                st.markdown("### 📈 月別平均順位推移")
+
+                # 折れ線グラフ作成
+                fig2 = go.Figure()
+
+                teams = df['team_name'].unique()
+
+                for team_name in sorted(teams):
+                    team_data = df[df['team_name'] ==
+                                   team_name].sort_values('month')
+
+                    fig2.add_trace(go.Scatter(
+                        x=team_data['month'],
+                        y=team_data['avg_rank'],
+                        mode='lines+markers',
+                        name=team_name,
+                        line=dict(width=2),
+                        marker=dict(size=8),
+                        hovertemplate=(
+                            f'<b>{team_name}</b><br>' +
+                            '月: %{x}<br>' +
+                            '平均順位: %{y:.2f}<br>' +
+                            '<extra></extra>'
+                        )
+                    ))
+
+                fig2.update_layout(
+                    title=f"{selected_season}シーズン 月別平均順位推移",
+                    xaxis_title="月",
+                    yaxis_title="平均順位",
+                    height=500,
+                    hovermode='x unified',
+                    legend=dict(
+                        orientation="v",
+                        yanchor="top",
+                        y=1,
+                        xanchor="left",
+                        x=1.02
+                    ),
+                    yaxis=dict(
+                        autorange="reversed",  # 順位は小さいほうが良い
+                        dtick=0.5,
+                        zeroline=False
                     )
-                ))
-
-            fig2.update_layout(
-                title=f"{selected_season}シーズン 月別平均順位推移",
-                xaxis_title="月",
-                yaxis_title="平均順位",
-                height=500,
-                hovermode='x unified',
-                legend=dict(
-                    orientation="v",
-                    yanchor="top",
-                    y=1,
-                    xanchor="left",
-                    x=1.02
-                ),
-                yaxis=dict(
-                    autorange="reversed",  # 順位は小さいほうが良い
-                    dtick=0.5,
-                    zeroline=False
                 )
-            )
-
-            st.plotly_chart(fig2, width='stretch')
-
-            # 最良平均順位の月を表示
-            st.markdown("#### 🏆 平均順位ベスト月")
-
-            best_rank_data = []
-            for team_name in teams:
-                team_data = df[df['team_name'] == team_name]
-                best_month_idx = team_data['avg_rank'].idxmin()
-                best_month = team_data.loc[best_month_idx, 'month']
-                best_rank = team_data.loc[best_month_idx, 'avg_rank']
-                best_points = team_data.loc[best_month_idx, 'total_points']
-
-                best_rank_data.append({
-                    'チーム名': team_name,
-                    'ベスト月': best_month,
-                    '平均順位': best_rank,
-                    '累積pt': best_points
-                })
-
-            best_rank_df = pd.DataFrame(best_rank_data).sort_values('平均順位')
-            best_rank_df['平均順位'] = best_rank_df['平均順位'].apply(
-                lambda x: f"{x:.2f}")
-            best_rank_df['累積pt'] = best_rank_df['累積pt'].apply(
-                lambda x: f"{x:+.1f}")
-
-            st.dataframe(best_rank_df, hide_index=True, width='stretch')
+
+                st.plotly_chart(fig2, width='stretch')
+
+                # 最良平均順位の月を表示
+                st.markdown("#### 🏆 平均順位ベスト月")
+
+                best_rank_data = []
+                for team_name in teams:
+                    team_data = df[df['team_name'] == team_name]
+                    best_month_idx = team_data['avg_rank'].idxmin()
+                    best_month = team_data.loc[best_month_idx, 'month']
+                    best_rank = team_data.loc[best_month_idx, 'avg_rank']
+                    best_points = team_data.loc[best_month_idx, 'total_points']
+
+                    best_rank_data.append({
+                        'チーム名': team_name,
+                        'ベスト月': best_month,
+                        '平均順位': best_rank,
+                        '累積pt': best_points
+                    })
+
+                best_rank_df = pd.DataFrame(best_rank_data).sort_values('平均順位')
+
+                show_table(best_rank_df, hide_index=True, width='stretch')
     else:
         st.info(f"{selected_season}シーズンの半荘記録がありません。")
 else:
@@ -306,71 +277,47 @@ cursor.execute("""
 game_count = cursor.fetchone()[0]
 
 if game_count > 0:
-    # 席順別統計を取得
-    query = """
-        SELECT 
-            gr.seat_name,
-            pt.team_id,
-            tn.team_name,
-            COUNT(*) as games,
-            SUM(gr.points) as total_points,
-            AVG(gr.points) as avg_points,
-            AVG(gr.rank) as avg_rank,
-            SUM(CASE WHEN gr.rank = 1 THEN 1 ELSE 0 END) as rank_1st,
-            SUM(CASE WHEN gr.rank = 2 THEN 1 ELSE 0 END) as rank_2nd,
-            SUM(CASE WHEN gr.rank = 3 THEN 1 ELSE 0 END) as rank_3rd,
-            SUM(CASE WHEN gr.rank = 4 THEN 1 ELSE 0 END) as rank_4th
-        FROM game_results gr
-        JOIN player_teams pt ON gr.player_id = pt.player_id AND gr.season = pt.season
-        JOIN team_names tn ON pt.team_id = tn.team_id AND pt.season = tn.season
-        WHERE gr.season = ?
-        GROUP BY gr.seat_name, pt.team_id, tn.team_name
-        ORDER BY gr.seat_name, total_points DESC
-    """
-
-    seat_df = pd.read_sql_query(query, conn, params=(selected_season,))
+    # 席順別統計を取得（集計キューブのロールアップ）
+    seat_df = get_cube_rollup(['seat_name', 'team_id'], season=selected_season, conn=conn)
+    seat_df = seat_df.merge(
+        get_team_names_for_season(selected_season)[['team_id', 'team_name']], on='team_id')
+    seat_df = seat_df.rename(columns={'points_sum': 'total_points'})
+    seat_df = seat_df.sort_values(['seat_name', 'total_points'], ascending=[True, False])
 
     if not seat_df.empty:
         seats = ['東', '南', '西', '北']
 
         for seat in seats:
-            with st.expander(f"🧭 {seat}家", expanded=False):
-                seat_data = seat_df[seat_df['seat_name'] == seat].copy()
-
-                if not seat_data.empty:
-                    # 1位率を計算
-                    seat_data['first_rate'] = (
-                        seat_data['rank_1st'] / seat_data['games'] * 100).round(1)
-
-                    # 順位を追加
-                    seat_data = seat_data.sort_values(
-                        'total_points', ascending=False)
-                    seat_data.insert(0, '順位', range(1, len(seat_data) + 1))
-
-                    # 表示用に整形
-                    display_df = seat_data[[
-                        '順位', 'team_name', 'games', 'total_points', 'avg_points',
-                        'avg_rank', 'rank_1st', 'rank_2nd', 'rank_3rd', 'rank_4th', 'first_rate'
-                    ]].copy()
-
-                    display_df.columns = [
-                        '順位', 'チーム名', '対局数', '累積pt', '平均pt',
-                        '平均順位', '1位', '2位', '3位', '4位', '1位率(%)'
-                    ]
-
-                    display_df['累積pt'] = display_df['累積pt'].apply(
-                        lambda x: f"{x:+.1f}")
-                    display_df['平均pt'] = display_df['平均pt'].apply(
-                        lambda x: f"{x:+.1f}")
-                    display_df['平均順位'] = display_df['平均順位'].apply(
-                        lambda x: f"{x:.2f}")
-                    display_df['1位率(%)'] = display_df['1位率(%)'].apply(
-                        lambda x: f"{x:.1f}")
-
-                    st.dataframe(display_df, width='stretch',
-                                 hide_index=True, height=300)
-                else:
-                    st.info(f"{seat}家のデータがありません")
+            seat_expander = st.expander(f"🧭 {seat}家", expanded=False, on_change="rerun")
+            if seat_expander.open:
+                with seat_expander:
+                    seat_data = seat_df[seat_df['seat_name'] == seat].copy()
+
+                    if not seat_data.empty:
+                        # 1位率を計算
+                        seat_data['first_rate'] = (
+                            seat_data['rank_1st'] / seat_data['games'] * 100).round(1)
+
+                        # 順位を追加
+                        seat_data = seat_data.sort_values(
+                            'total_points', ascending=False)
+                        seat_data.insert(0, '順位', range(1, len(seat_data) + 1))
+
+                        # 表示用に整形
+                        display_df = seat_data[[
+                            '順位', 'team_name', 'games', 'total_points', 'avg_points',
+                            'avg_rank', 'rank_1st', 'rank_2nd', 'rank_3rd', 'rank_4th', 'first_rate'
+                        ]].copy()
+
+                        display_df.columns = [
+                            '順位', 'チーム名', '対局数', '累積pt', '平均pt',
+                            '平均順位', '1位', '2位', '3位', '4位', '1位率(%)'
+                        ]
+
+                        show_table(display_df, width='stretch',
+                                   hide_index=True, height=300)
+                    else:
+                        st.info(f"{seat}家のデータがありません")
     else:
         st.info(f"{selected_season}シーズンの席順別データがありません。")
 else:
@@ -393,73 +340,46 @@ query = """
         tn.team_name,
         gr.game_date,
         gr.game_number,
-        gr.start_time,
-        gr.end_time
+        gr.duration_minutes as duration
     FROM game_results gr
     JOIN player_teams pt ON gr.player_id = pt.player_id AND gr.season = pt.season
     JOIN team_names tn ON pt.team_id = tn.team_id AND pt.season = tn.season
-    WHERE gr.season = ? AND gr.start_time IS NOT NULL AND gr.end_time IS NOT NULL
+    WHERE gr.season = ? AND gr.duration_minutes IS NOT NULL
 """
 
 time_df = pd.read_sql_query(query, conn, params=(selected_season,))
 conn.close()
 
 if not time_df.empty:
-    # 対局時間（分）を計算
-    def calc_duration(game_row):
-        try:
-            start_parts = game_row['start_time'].split(':')
-            end_parts = game_row['end_time'].split(':')
-            start_minutes = int(start_parts[0]) * 60 + int(start_parts[1])
-            end_minutes = int(end_parts[0]) * 60 + int(end_parts[1])
-            duration = end_minutes - start_minutes
-            if duration < 0:
-                duration += 24 * 60  # 日付をまたぐ場合
-            return duration
-        except (ValueError, IndexError, AttributeError):
-            return None
-
-    time_df['duration'] = time_df.apply(calc_duration, axis=1)
-    time_df = time_df[time_df['duration'].notna()]
-
-    if not time_df.empty:
-        # チーム別の統計
-        team_time_stats = time_df.groupby(['team_id', 'team_name']).agg({
-            'duration': ['count', 'mean', 'min', 'max']
-        }).reset_index()
-
-        team_time_stats.columns = [
-            'team_id', 'team_name', 'games', 'avg_duration', 'min_duration', 'max_duration']
-
-        # 平均時間でソート
-        team_time_stats = team_time_stats.sort_values(
-            'avg_duration', ascending=True)
-        team_time_stats.insert(0, '順位', range(1, len(team_time_stats) + 1))
-
-        # 時間を時:分形式に変換
-        def format_duration(minutes):
-            hours = int(minutes // 60)
-            mins = int(minutes % 60)
-            return f"{hours}:{mins:02d}"
-
-        # 表示用に整形
-        display_df = team_time_stats[[
-            '順位', 'team_name', 'games', 'avg_duration', 'min_duration', 'max_duration'
-        ]].copy()
-
-        display_df.columns = [
-            '順位', 'チーム名', '対局数', '平均時間', '最短時間', '最長時間'
-        ]
-
-        display_df['平均時間'] = display_df['平均時間'].apply(format_duration)
-        display_df['最短時間'] = display_df['最短時間'].apply(format_duration)
-        display_df['最長時間'] = display_df['最長時間'].apply(format_duration)
-
-        st.dataframe(display_df, width='stretch', hide_index=True)
-
-        st.info("💡 対局時間は「開始時間」から「終了時間」までの所要時間です。時間が記録されている対局のみが対象となります。")
-    else:
-        st.info(f"{selected_season}シーズンの有効な対局時間データがありません。")
+    # チーム別の統計
+    team_time_stats = time_df.groupby(['team_id', 'team_name']).agg({
+        'duration': ['count', 'mean', 'min', 'max']
+    }).reset_index()
+
+    team_time_stats.columns = [
+        'team_id', 'team_name', 'games', 'avg_duration', 'min_duration', 'max_duration']
+
+    # 平均時間でソート
+    team_time_stats = team_time_stats.sort_values(
+        'avg_duration', ascending=True)
+    team_time_stats.insert(0, '順位', range(1, len(team_time_stats) + 1))
+
+    # 表示用に整形
+    display_df = team_time_stats[[
+        '順位', 'team_name', 'games', 'avg_duration', 'min_duration', 'max_duration'
+    ]].copy()
+
+    display_df.columns = [
+        '順位', 'チーム名', '対局数', '平均時間', '最短時間', '最長時間'
+    ]
+
+    display_df['平均時間'] = display_df['平均時間'].apply(format_duration)
+    display_df['最短時間'] = display_df['最短時間'].apply(format_duration)
+    display_df['最長時間'] = display_df['最長時間'].apply(format_duration)
+
+    show_table(display_df, width='stretch', hide_index=True)
+
+    st.info("💡 対局時間は「開始時間」から「終了時間」までの所要時間です。時間が記録されている対局のみが対象となります。")
 else:
     st.info(f"{selected_season}シーズンの対局時間データがありません。「🎮 半荘記録入力」ページで開始・終了時間を記録してください。")
 
@@ -2,15 +2,17 @@ import sys
 import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
+from charts import ranking_bar_chart
 from db import (
     get_team_colors,
     get_season_points,
     get_cumulative_points,
     get_team_history,
     get_teams,
-    get_connection,
-    show_sidebar_navigation
+    get_connection
 )
+from navigation import show_sidebar_navigation
+from tables import show_table
 sys.path.append("..")
 
 st.set_page_config(
@@ -38,28 +40,14 @@ col1, col2 = st.columns([2, 1])
 
 with col1:
     # 累積ポイント棒グラフ
-    fig = go.Figure()
-
-    for _, row in cumulative_df.sort_values("total_points", ascending=True).iterrows():
-        color = team_colors.get(row["team_id"], "#888888")
-        fig.add_trace(go.Bar(
-            y=[row["team_name"]],
-            x=[row["total_points"]],
-            orientation="h",
-            marker_color=color,
-            name=row["team_name"],
-            text=f"{row['total_points']:+.1f}",
-            textposition="outside",
-            showlegend=False
-        ))
-
-    fig.update_layout(
+    bar_df = cumulative_df.sort_values("total_points", ascending=True)
+    fig = ranking_bar_chart(
+        bar_df.assign(color=bar_df["team_id"].map(team_colors)),
+        "team_name", "total_points",
         title="チーム別 累積ポイント",
         xaxis_title="累積ポイント",
-        yaxis_title="",
-        height=400,
-        margin=dict(l=20, r=100, t=50, b=50),
-        xaxis=dict(zeroline=True, zerolinecolor="gray", zerolinewidth=2)
+        color_col="color",
+        hover=(("累積pt", "total_points", "+.1f"), ("参加", "seasons", "d"))
     )
 
     st.plotly_chart(fig)
@@ -71,10 +59,8 @@ with col2:
     display_df = cumulative_df[["rank", "team_name",
                                 "total_points", "seasons", "avg_points"]].copy()
     display_df.columns = ["順位", "チーム", "累積pt", "参加", "平均pt"]
-    display_df["累積pt"] = display_df["累積pt"].apply(lambda x: f"{x:+.1f}")
-    display_df["平均pt"] = display_df["平均pt"].apply(lambda x: f"{x:+.1f}")
 
-    st.dataframe(display_df, hide_index=True)
+    show_table(display_df, hide_index=True)
 
 st.markdown("---")
 
@@ -216,10 +202,7 @@ st.markdown("#### シーズン成績履歴")
 history_display = team_history[[
     "season", "team_name", "points", "rank"]].copy()
 history_display.columns = ["シーズン", "チーム名", "ポイント", "順位"]
-history_display["ポイント"] = history_display["ポイント"].apply(lambda x: f"{x:+.1f}")
-history_display["順位"] = history_display["順位"].apply(lambda x: f"{x}位")
-
-st.dataframe(history_display, hide_index=True)
+show_table(history_display, formats={"順位": "%d位"}, hide_index=True)
 
 st.markdown("---")
 
@@ -351,14 +334,10 @@ if game_count > 0:
             display_most = most_games_month_df[[
                 '順位', 'team_name', 'total_points', 'avg_rank', 'games']].copy()
             display_most.columns = ['順位', 'チーム名', '累積pt', '平均順位', '対局数']
-            display_most['累積pt'] = display_most['累積pt'].apply(
-                lambda x: f"{x:+.1f}")
-            display_most['平均順位'] = display_most['平均順位'].apply(
-                lambda x: f"{x:.2f}")
 
             st.caption(
                 f"**{month_names[most_games_month-1]}** ({int(month_games[month_games['month']==most_games_month]['games'].values[0])}対局)")
-            st.dataframe(display_most, hide_index=True, width='stretch')
+            show_table(display_most, hide_index=True, width='stretch')
 
         with tab_avg_rank:
             st.markdown("### 📈 月別平均順位推移")
@@ -437,12 +416,8 @@ if game_count > 0:
                 })
 
             best_rank_df = pd.DataFrame(best_rank_data).sort_values('平均順位')
-            best_rank_df['平均順位'] = best_rank_df['平均順位'].apply(
-                lambda x: f"{x:.2f}")
-            best_rank_df['累積pt'] = best_rank_df['累積pt'].apply(
-                lambda x: f"{x:+.1f}")
 
-            st.dataframe(best_rank_df, hide_index=True, width='stretch')
+            show_table(best_rank_df, hide_index=True, width='stretch')
     else:
         st.info("半荘記録がありません。")
 else:
@@ -2,7 +2,12 @@ import sys
 import sqlite3
 import streamlit as st
 import pandas as pd
-from db import get_connection, show_sidebar_navigation
+from db import (
+    get_connection, is_manual_team_season,
+    rebuild_team_season_points, REGULAR_TABLE_TYPE
+)
+from navigation import show_sidebar_navigation
+from tables import show_table
 sys.path.append("..")
 
 st.set_page_config(
@@ -18,6 +23,7 @@ st.title("⚙️ データ管理")
 
 st.markdown("""
 このページでは、シーズン別のチームポイントを管理できます。
+半荘記録があるシーズンは、チームポイントと順位を半荘記録から自動集計します（ペナルティのみ入力）。
 """)
 
 # シーズン選択
@@ -52,6 +58,35 @@ if teams_df.empty:
     st.warning(f"{selected_season}年度のチーム情報がありません。")
     st.stop()
 
+# ========== 集計方法 ==========
+# 手入力管理の行があるか、半荘記録がなければ手入力管理とみなす
+conn = get_connection()
+cursor = conn.cursor()
+stored_manual = is_manual_team_season(cursor, selected_season)
+cursor.execute("""
+    SELECT pt.team_id, SUM(gr.points)
+    FROM game_results gr
+    JOIN player_teams pt ON gr.player_id = pt.player_id AND gr.season = pt.season
+    WHERE gr.season = ? AND gr.table_type = ?
+    GROUP BY pt.team_id
+""", (selected_season, REGULAR_TABLE_TYPE))
+earned_from_games = {team_id: points for team_id, points in cursor.fetchall()}
+conn.close()
+
+manual_mode = st.toggle(
+    "手入力で管理（半荘記録から集計しない）",
+    value=stored_manual or not earned_from_games,
+    key=f"team_manual_override_{selected_season}",
+    help="半荘記録のないシーズンや、半荘記録が一部しか登録されていないシーズンはオンにしてください"
+)
+
+if manual_mode:
+    st.caption("✏️ 最終ポイントとペナルティを手入力し、順位は保存時に計算します")
+else:
+    st.caption("🔄 チームポイントと順位はレギュラーシーズンの半荘記録から自動集計されます。ペナルティのみ入力してください")
+    if stored_manual:
+        st.warning("⚠️ 現在は手入力のポイントが保存されています。保存すると半荘記録から再集計され、手入力の値は上書きされます")
+
 # 既存データを取得
 conn = get_connection()
 existing_query = f"""
@@ -113,6 +148,37 @@ with st.form(f"team_points_form_{selected_season}"):
 
         col1, col2, col3 = st.columns([2, 2, 2])
 
+        if not manual_mode:
+            # 自動集計: 獲得ポイントは半荘記録の合計、ペナルティのみ入力
+            earned_points = round(earned_from_games.get(team_id, 0.0), 1)
+            with col1:
+                st.metric("獲得ポイント（半荘記録）", f"{earned_points:+.1f}")
+            with col2:
+                penalty = st.number_input(
+                    "ペナルティ",
+                    min_value=-500.0,
+                    max_value=0.0,
+                    value=float(current_penalty),
+                    step=0.1,
+                    format="%.1f",
+                    key=f"penalty_{selected_season}_{team_id}",
+                    help="マイナス値で入力（例: -10.0）"
+                )
+            with col3:
+                st.metric(
+                    "最終ポイント",
+                    f"{earned_points + penalty:+.1f}",
+                    help="獲得ポイント + ペナルティ"
+                )
+
+            updated_data.append({
+                "team_id": team_id,
+                "team_name": team_name,
+                "points": earned_points + penalty,
+                "penalty": penalty
+            })
+            continue
+
         with col1:
             point = st.number_input(
                 "最終ポイント",
@@ -160,14 +226,28 @@ with st.form(f"team_points_form_{selected_season}"):
             conn = get_connection()
             cursor = conn.cursor()
 
-            # ポイントでソートしてランクを計算
-            sorted_data = sorted(
-                updated_data, key=lambda x: x["points"], reverse=True)
-            for rank, data in enumerate(sorted_data, start=1):
+            if manual_mode:
+                # ポイントでソートしてランクを計算
+                sorted_data = sorted(
+                    updated_data, key=lambda x: x["points"], reverse=True)
+                for rank, data in enumerate(sorted_data, start=1):
+                    cursor.execute("""
+                        INSERT OR REPLACE INTO team_season_points
+                        (team_id, season, points, penalty, rank, manual_override)
+                        VALUES (?, ?, ?, ?, ?, 1)
+                    """, (data["team_id"], selected_season, data["points"], data["penalty"], rank))
+            else:
+                # 自動集計: ペナルティのみ保存し、半荘記録からポイントと順位を再集計
                 cursor.execute("""
-                    INSERT OR REPLACE INTO team_season_points (team_id, season, points, penalty, rank)
-                    VALUES (?, ?, ?, ?, ?)
-                """, (data["team_id"], selected_season, data["points"], data["penalty"], rank))
+                    UPDATE team_season_points SET manual_override = 0 WHERE season = ?
+                """, (selected_season,))
+                for data in updated_data:
+                    cursor.execute("""
+                        INSERT INTO team_season_points (team_id, season, points, penalty, rank)
+                        VALUES (?, ?, 0, ?, 0)
+                        ON CONFLICT (season, team_id) DO UPDATE SET penalty = excluded.penalty
+                    """, (data["team_id"], selected_season, data["penalty"]))
+                rebuild_team_season_points(conn, selected_season)
 
             conn.commit()
             conn.close()
@@ -196,15 +276,7 @@ if not existing_data.empty:
     display_data = display_data.sort_values(
         "最終ポイント", ascending=False).reset_index(drop=True)
 
-    # フォーマット
-    display_data["最終ポイント"] = display_data["最終ポイント"].apply(
-        lambda x: f"{x:+.1f}")
-    display_data["ペナルティ"] = display_data["ペナルティ"].apply(
-        lambda x: f"{x:.1f}" if x != 0 else "-")
-    display_data["獲得ポイント"] = display_data["獲得ポイント"].apply(
-        lambda x: f"{x:+.1f}")
-
-    st.dataframe(display_data, width="stretch")
+    show_table(display_data, width="stretch")
 
     # データ整合性チェック
     st.markdown("---")
@@ -307,3 +379,105 @@ with col2:
     - game_resultsを時系列で処理
     - 各対局後のレートを計算
     """)
+
+# ========== 集計テーブル管理セクション ==========
+
+st.markdown("---")
+st.subheader("⚔️ 集計テーブル管理")
+
+col1, col2 = st.columns(2)
+
+with col1:
+    if st.button("🔄 集計テーブル（直対・キューブ・シーズン成績）を再構築", key="derived_tables_rebuild_button"):
+        try:
+            from db import rebuild_aggregates, clear_season_partials
+
+            with st.spinner("集計テーブルを再構築中..."):
+                rebuild_aggregates()
+                clear_season_partials()
+
+            st.success("✅ 集計テーブルの再構築が完了しました")
+        except Exception as e:
+            st.error(f"❌ エラーが発生しました: {str(e)}")
+
+with col2:
+    st.info("""
+    ℹ️ **操作内容**
+    - 半荘記録から選手・チームの直対集計（pair_stats）・集計キューブ（game_cube）と、自動集計シーズンの選手成績・チームポイントを作り直します
+    - 選手の所属チーム・チーム名の変更は変更ジャーナルにより自動で反映されます（集計がずれた場合に実行してください）
+    """)
+
+# ========== 半荘記録一括インポートセクション ==========
+
+st.markdown("---")
+st.subheader("📥 半荘記録の一括インポート")
+
+st.markdown("""
+CSV / JSON 形式の半荘記録をまとめて登録できます。
+1行 = 1人分の結果で、同じ対局の4行は連続して並べてください。
+""")
+
+uploaded_files = st.file_uploader(
+    "ファイルを選択",
+    type=["csv", "json", "jsonl"],
+    accept_multiple_files=True,
+    key="import_results_uploader"
+)
+
+col1, col2 = st.columns(2)
+
+with col1:
+    dry_run = st.checkbox("検証のみ（登録しない）", key="import_results_dry_run")
+    restart = st.checkbox(
+        "最初から取り込み直す", key="import_results_restart",
+        help="オフの場合、中断したファイルは前回の続きから取り込みます")
+    if st.button("📥 インポート実行", key="import_results_button", disabled=not uploaded_files):
+        try:
+            from import_results import import_results
+
+            progress_text = st.empty()
+
+            def show_progress(stats):
+                progress_text.caption(
+                    f"⏳ {stats['rows']:,}行 / {stats['games']:,}対局 取り込み済み"
+                    f"（{stats['rows_per_sec']:,.0f}行/秒）"
+                )
+
+            with st.spinner("半荘記録を取り込み中..."):
+                result = import_results(
+                    uploaded_files, dry_run=dry_run, restart=restart, progress=show_progress)
+
+            st.success(
+                f"✅ {'検証' if dry_run else 'インポート'}が完了しました"
+                f"（{result['games']}対局 / {result['rows']}行"
+                f"、レーティング計算 {result['rating_games']}対局）"
+            )
+            if result["skipped_sources"]:
+                st.info(f"ℹ️ 取り込み済みのため {len(result['skipped_sources'])}ファイルを読み飛ばしました")
+            if not result["errors"].empty:
+                st.warning(f"⚠️ {len(result['errors'])}対局をスキップしました")
+                st.dataframe(
+                    result["errors"].rename(columns={
+                        "season": "シーズン",
+                        "game_date": "日付",
+                        "table_type": "卓区分",
+                        "game_number": "試合番号",
+                        "reason": "理由"
+                    }),
+                    width="stretch",
+                    hide_index=True
+                )
+        except (sqlite3.Error, ValueError) as e:
+            st.error(f"❌ エラーが発生しました: {e}")
+
+with col2:
+    st.info("""
+    ℹ️ **ファイルの列**
+    - season, game_date, table_type, game_number, seat_name
+    - player_name（または player_id）, points, rank
+    - start_time, end_time（任意、HH:MM形式）
+
+    素点合計・着順・人数を検証し、不正な対局と登録済みの対局はスキップします。
+    取り込みはチャンクごとにコミットされ、中断しても同じファイルで再実行すると続きから再開します。
+    コマンドラインからは `python import_results.py ファイル名` で実行できます。
+    """)
@@ -5,8 +5,9 @@ from db import (
     get_connection,
     get_players,
     get_teams,
-    show_sidebar_navigation
+    sync_derived_tables
 )
+from navigation import show_sidebar_navigation
 sys.path.append("..")
 
 st.set_page_config(
@@ -408,6 +409,9 @@ with tab3:
                                     VALUES (?, ?, ?)
                                 """, (selected_player_id, new_team_id, season))
 
+                                # 所属変更を集計テーブルに反映
+                                sync_derived_tables(conn)
+
                                 conn.commit()
                                 conn.close()
 
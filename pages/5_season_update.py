@@ -1,7 +1,8 @@
 import sqlite3
 import streamlit as st
 import pandas as pd
-from db import get_connection, show_sidebar_navigation
+from db import get_connection, rollover_season, sync_derived_tables
+from navigation import show_sidebar_navigation
 
 # 共通サイドバーナビゲーションを表示
 show_sidebar_navigation()
@@ -46,7 +47,9 @@ if not prev_season_exists:
 # ========== タブ構成 ==========
 tab1, tab2, tab3 = st.tabs(["🏷️ チーム名設定", "👥 選手移籍入力", "✅ 確認と登録"])
 
-# セッション状態の初期化
+STATUS_OPTIONS = ["残留", "移籍", "退団"]
+
+# セッション状態の初期化（入力内容はシーズンごとに DataFrame で保持）
 if "season_update_team_names" not in st.session_state:
     st.session_state.season_update_team_names = {}
 if "season_update_player_moves" not in st.session_state:
@@ -54,65 +57,69 @@ if "season_update_player_moves" not in st.session_state:
 if "season_update_confirmed" not in st.session_state:
     st.session_state.season_update_confirmed = False
 
-# ========== タブ1: チーム名設定 ==========
-with tab1:
-    st.subheader(f"🏷️ {new_season}シーズンのチーム名設定")
-    st.markdown(f"前シーズン（{new_season-1}）のチーム名がデフォルトで表示されます。変更がある場合のみ編集してください。")
-
-    # 前シーズンのチーム名を取得
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT t.team_id, t.short_name, tn.team_name
-        FROM teams t
-        JOIN team_names tn ON t.team_id = tn.team_id
-        WHERE tn.season = ?
-        ORDER BY t.team_id
-    """, (new_season - 1,))
-    prev_teams = cursor.fetchall()
-    conn.close()
-
-    st.markdown("---")
-
-    # チーム名入力フォーム
-    team_name_changes = {}
+saved_teams = st.session_state.season_update_team_names.get(new_season)
+saved_moves = st.session_state.season_update_player_moves.get(new_season)
 
-    for team_id, short_name, prev_name in prev_teams:
-        col1, col2, col3 = st.columns([1, 2, 2])
+# 前シーズンのチーム名・所属選手を一括取得
+conn = get_connection()
+prev_teams = pd.read_sql_query("""
+    SELECT t.team_id, t.short_name, tn.team_name
+    FROM teams t
+    JOIN team_names tn ON t.team_id = tn.team_id
+    WHERE tn.season = ?
+    ORDER BY t.team_id
+""", conn, params=(new_season - 1,))
+prev_players = pd.read_sql_query("""
+    SELECT p.player_id, p.player_name, pt.team_id, t.short_name
+    FROM players p
+    JOIN player_teams pt ON p.player_id = pt.player_id
+    JOIN teams t ON pt.team_id = t.team_id
+    WHERE pt.season = ?
+    ORDER BY t.team_id, p.player_name
+""", conn, params=(new_season - 1,))
+team_options = pd.read_sql_query(
+    "SELECT team_id, short_name FROM teams ORDER BY team_id", conn)
+conn.close()
 
-        with col1:
-            st.write(f"**{short_name}**")
+short_name_to_id = dict(zip(team_options["short_name"], team_options["team_id"]))
 
-        with col2:
-            st.text_input(
-                "前シーズン",
-                value=prev_name,
-                disabled=True,
-                key=f"prev_name_{team_id}",
-                label_visibility="collapsed"
-            )
+# ========== タブ1: チーム名設定 ==========
+with tab1:
+    st.subheader(f"🏷️ {new_season}シーズンのチーム名設定")
+    st.markdown(f"前シーズン（{new_season-1}）のチーム名がデフォルトで表示されます。変更がある場合のみ「{new_season}年」列を編集してください。")
 
-        with col3:
-            # セッション状態に保存されている値があればそれを使用、なければ前シーズンの名前
-            default_value = st.session_state.season_update_team_names.get(
-                team_id, prev_name)
-            new_name = st.text_input(
-                f"{new_season}シーズン",
-                value=default_value,
-                key=f"new_name_{team_id}",
-                placeholder=f"例: {prev_name}",
-                label_visibility="collapsed"
-            )
-            team_name_changes[team_id] = new_name
+    if saved_teams is not None:
+        team_frame = saved_teams
+    else:
+        team_frame = pd.DataFrame({
+            "team_id": prev_teams["team_id"],
+            "チーム": prev_teams["short_name"],
+            f"{new_season-1}年": prev_teams["team_name"],
+            f"{new_season}年": prev_teams["team_name"],
+        })
+
+    edited_teams = st.data_editor(
+        team_frame,
+        hide_index=True,
+        width="stretch",
+        disabled=["team_id", "チーム", f"{new_season-1}年"],
+        column_config={"team_id": None},
+        key=f"season_update_team_editor_{new_season}",
+    )
 
     # チーム名をセッション状態に保存
     if st.button("チーム名を保存", key="save_team_names", type="primary"):
-        st.session_state.season_update_team_names = team_name_changes
-        st.success("✅ チーム名を保存しました。次のタブで選手移籍を入力してください。")
-        st.rerun()
+        new_names = edited_teams[f"{new_season}年"].fillna("").str.strip()
+        if (new_names == "").any():
+            st.error("❌ チーム名が空欄のチームがあります")
+        else:
+            st.session_state.season_update_team_names[new_season] = edited_teams.assign(
+                **{f"{new_season}年": new_names})
+            st.success("✅ チーム名を保存しました。次のタブで選手移籍を入力してください。")
+            st.rerun()
 
     # 保存済みの場合は表示
-    if st.session_state.season_update_team_names:
+    if saved_teams is not None:
         st.markdown("---")
         st.success("✅ チーム名は保存済みです")
 
@@ -120,146 +127,63 @@ with tab1:
 with tab2:
     st.subheader(f"👥 {new_season}シーズンの選手移籍入力")
 
-    if not st.session_state.season_update_team_names:
+    if saved_teams is None:
         st.warning("⚠️ 先に「チーム名設定」タブでチーム名を保存してください。")
+    elif prev_players.empty:
+        st.info(f"ℹ️ {new_season-1}シーズンに所属選手が登録されていません。")
     else:
-        st.markdown(f"前シーズン（{new_season-1}）所属の選手について、残留・移籍・退団を選択してください。")
-
-        # 前シーズンの選手所属情報を取得
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT p.player_id, p.player_name, pt.team_id, t.short_name, tn.team_name
-            FROM players p
-            JOIN player_teams pt ON p.player_id = pt.player_id
-            JOIN teams t ON pt.team_id = t.team_id
-            JOIN team_names tn ON pt.team_id = tn.team_id AND pt.season = tn.season
-            WHERE pt.season = ?
-            ORDER BY t.team_id, p.player_name
-        """, (new_season - 1,))
-        prev_players = cursor.fetchall()
-
-        # チーム選択肢を取得
-        cursor.execute(
-            "SELECT team_id, short_name FROM teams ORDER BY team_id")
-        team_options = {row[1]: row[0] for row in cursor.fetchall()}
-        conn.close()
-
-        if not prev_players:
-            st.info(f"ℹ️ {new_season-1}シーズンに所属選手が登録されていません。")
+        st.markdown(f"前シーズン（{new_season-1}）所属の選手について、残留・移籍・退団を選択してください。移籍の場合は移籍先も選択してください。")
+
+        if saved_moves is not None:
+            move_frame = saved_moves
         else:
-            st.markdown("---")
+            move_frame = pd.DataFrame({
+                "player_id": prev_players["player_id"],
+                "team_id": prev_players["team_id"],
+                "選手名": prev_players["player_name"],
+                "前チーム": prev_players["short_name"],
+                "状態": "残留",
+                "移籍先": None,
+            })
 
-            # チームごとにグループ化して表示
-            current_team = None
-            player_moves = {}
-
-            for player_id, player_name, team_id, short_name, team_name in prev_players:
-                # 新しいチームの場合はヘッダーを表示
-                if current_team != team_id:
-                    if current_team is not None:
-                        st.markdown("---")
-                    st.markdown(f"### 📋 {short_name} ({team_name})")
-                    current_team = team_id
-
-                col1, col2, col3 = st.columns([2, 2, 3])
-
-                with col1:
-                    st.write(f"**{player_name}**")
-
-                with col2:
-                    # セッション状態から前回の選択を取得
-                    prev_status = st.session_state.season_update_player_moves.get(
-                        player_id, {}).get("status", "残留")
-                    status = st.selectbox(
-                        "状態",
-                        ["残留", "移籍", "退団"],
-                        index=["残留", "移籍", "退団"].index(prev_status),
-                        key=f"status_{player_id}",
-                        label_visibility="collapsed"
-                    )
-
-                with col3:
-                    if status == "移籍":
-                        # セッション状態から前回の選択を取得
-                        prev_new_team = st.session_state.season_update_player_moves.get(
-                            player_id, {}).get("new_team_id")
-                        prev_new_team_name = None
-                        if prev_new_team:
-                            for name, tid in team_options.items():
-                                if tid == prev_new_team:
-                                    prev_new_team_name = name
-                                    break
-
-                        new_team_name = st.selectbox(
-                            "移籍先",
-                            list(team_options.keys()),
-                            index=list(team_options.keys()).index(
-                                prev_new_team_name) if prev_new_team_name else 0,
-                            key=f"new_team_{player_id}",
-                            label_visibility="collapsed"
-                        )
-                        new_team_id = team_options[new_team_name]
-                        player_moves[player_id] = {
-                            "player_name": player_name,
-                            "prev_team_id": team_id,
-                            "prev_team_name": short_name,
-                            "status": status,
-                            "new_team_id": new_team_id,
-                            "new_team_name": new_team_name
-                        }
-                    else:
-                        if status == "残留":
-                            st.text_input(
-                                "継続",
-                                value=f"{short_name} で継続",
-                                disabled=True,
-                                key=f"stay_{player_id}",
-                                label_visibility="collapsed"
-                            )
-                            player_moves[player_id] = {
-                                "player_name": player_name,
-                                "prev_team_id": team_id,
-                                "prev_team_name": short_name,
-                                "status": status,
-                                "new_team_id": team_id,
-                                "new_team_name": short_name
-                            }
-                        else:  # 退団
-                            st.text_input(
-                                "退団",
-                                value="Mリーグ退団",
-                                disabled=True,
-                                key=f"retire_{player_id}",
-                                label_visibility="collapsed"
-                            )
-                            player_moves[player_id] = {
-                                "player_name": player_name,
-                                "prev_team_id": team_id,
-                                "prev_team_name": short_name,
-                                "status": status,
-                                "new_team_id": None,
-                                "new_team_name": None
-                            }
-
-            # 選手移籍情報をセッション状態に保存
-            if st.button("選手移籍を保存", key="save_player_moves", type="primary"):
-                st.session_state.season_update_player_moves = player_moves
+        edited_moves = st.data_editor(
+            move_frame,
+            hide_index=True,
+            width="stretch",
+            disabled=["player_id", "team_id", "選手名", "前チーム"],
+            column_config={
+                "player_id": None,
+                "team_id": None,
+                "状態": st.column_config.SelectboxColumn(
+                    options=STATUS_OPTIONS, required=True),
+                "移籍先": st.column_config.SelectboxColumn(
+                    options=list(short_name_to_id)),
+            },
+            key=f"season_update_player_editor_{new_season}",
+        )
+
+        # 選手移籍情報をセッション状態に保存
+        if st.button("選手移籍を保存", key="save_player_moves", type="primary"):
+            missing = edited_moves[(edited_moves["状態"] == "移籍") & edited_moves["移籍先"].isna()]
+            if not missing.empty:
+                st.error(f"❌ 移籍先が未選択の選手がいます: {'、'.join(missing['選手名'])}")
+            else:
+                st.session_state.season_update_player_moves[new_season] = edited_moves
                 st.success("✅ 選手移籍情報を保存しました。「確認と登録」タブで内容を確認してください。")
                 st.rerun()
 
-            # 保存済みの場合は表示
-            if st.session_state.season_update_player_moves:
-                st.markdown("---")
-                st.success("✅ 選手移籍情報は保存済みです")
+        # 保存済みの場合は表示
+        if saved_moves is not None:
+            st.markdown("---")
+            st.success("✅ 選手移籍情報は保存済みです")
 
 # ========== タブ3: 確認と登録 ==========
 with tab3:
     st.subheader(f"✅ {new_season}シーズン更新内容の確認")
 
-    if not st.session_state.season_update_team_names:
+    if saved_teams is None:
         st.warning("⚠️ チーム名設定を完了してください。")
-    elif not st.session_state.season_update_player_moves:
+    elif saved_moves is None and not prev_players.empty:
         st.warning("⚠️ 選手移籍入力を完了してください。")
     else:
         st.success("✅ すべての情報が入力されています。内容を確認して登録してください。")
@@ -268,53 +192,35 @@ with tab3:
         st.markdown("---")
         st.markdown("### 🏷️ チーム名変更")
 
-        team_name_list = []
-        for team_id, new_name in st.session_state.season_update_team_names.items():
-            # 前シーズンの名前を取得
-            conn = get_connection()
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT t.short_name, tn.team_name
-                FROM teams t
-                JOIN team_names tn ON t.team_id = tn.team_id
-                WHERE t.team_id = ? AND tn.season = ?
-            """, (team_id, new_season - 1))
-            result = cursor.fetchone()
-            conn.close()
-
-            if result:
-                short_name, prev_name = result
-                change_status = "変更あり" if prev_name != new_name else "変更なし"
-                team_name_list.append({
-                    "チーム": short_name,
-                    f"{new_season-1}年": prev_name,
-                    f"{new_season}年": new_name,
-                    "状態": change_status
-                })
-
-        df_teams = pd.DataFrame(team_name_list)
+        prev_col, new_col = f"{new_season-1}年", f"{new_season}年"
+        df_teams = saved_teams.drop(columns="team_id").assign(
+            状態=(saved_teams[prev_col] != saved_teams[new_col]).map(
+                {True: "変更あり", False: "変更なし"}))
         st.dataframe(df_teams, hide_index=True, width="stretch")
 
         # 選手移籍の確認
         st.markdown("---")
         st.markdown("### 👥 選手移籍")
 
-        player_move_list = []
-        for player_id, info in st.session_state.season_update_player_moves.items():
-            if info["status"] == "残留":
-                move_info = "残留"
-            elif info["status"] == "移籍":
-                move_info = f"OUT: {info['prev_team_name']} → IN: {info['new_team_name']}"
-            else:  # 退団
-                move_info = f"OUT: {info['prev_team_name']} (退団)"
-
-            player_move_list.append({
-                "選手名": info["player_name"],
-                "移籍情報": move_info,
-                "状態": info["status"]
-            })
+        if saved_moves is None:
+            saved_moves = pd.DataFrame(
+                columns=["player_id", "team_id", "選手名", "前チーム", "状態", "移籍先"])
+
+        # 移籍先が前チームと同じ場合は残留として扱う
+        moves = saved_moves.copy()
+        moves.loc[(moves["状態"] == "移籍") & (moves["移籍先"] == moves["前チーム"]), "状態"] = "残留"
 
-        df_players = pd.DataFrame(player_move_list)
+        move_info = pd.Series("残留", index=moves.index)
+        is_transfer = moves["状態"] == "移籍"
+        is_retire = moves["状態"] == "退団"
+        move_info[is_transfer] = "OUT: " + moves["前チーム"] + " → IN: " + moves["移籍先"].fillna("")
+        move_info[is_retire] = "OUT: " + moves["前チーム"] + " (退団)"
+
+        df_players = pd.DataFrame({
+            "選手名": moves["選手名"],
+            "移籍情報": move_info,
+            "状態": moves["状態"],
+        })
 
         # フィルタ
         col1, col2, col3 = st.columns(3)
@@ -338,18 +244,16 @@ with tab3:
             st.dataframe(filtered_df, hide_index=True, width="stretch")
 
             # 統計情報
+            status_counts = df_players["状態"].value_counts()
             col1, col2, col3, col4 = st.columns(4)
             with col1:
                 st.metric("合計", len(df_players))
             with col2:
-                stay_count = len(df_players[df_players["状態"] == "残留"])
-                st.metric("残留", stay_count)
+                st.metric("残留", int(status_counts.get("残留", 0)))
             with col3:
-                transfer_count = len(df_players[df_players["状態"] == "移籍"])
-                st.metric("移籍", transfer_count)
+                st.metric("移籍", int(status_counts.get("移籍", 0)))
             with col4:
-                retire_count = len(df_players[df_players["状態"] == "退団"])
-                st.metric("退団", retire_count)
+                st.metric("退団", int(status_counts.get("退団", 0)))
         else:
             st.info("表示する状態を選択してください")
 
@@ -361,33 +265,28 @@ with tab3:
             st.warning("⚠️ 登録後は元に戻せません。内容を十分に確認してから登録してください。")
         with col2:
             if st.button("🚀 データベースに登録", type="primary"):
-                try:
-                    conn = get_connection()
-                    cursor = conn.cursor()
+                # 変更分だけを差分として渡す（残留・名称変更なしは引き継ぎで反映される）
+                changed_teams = saved_teams[saved_teams[prev_col] != saved_teams[new_col]]
+                team_name_changes = dict(zip(changed_teams["team_id"], changed_teams[new_col]))
+                player_moves = dict(zip(
+                    moves.loc[is_transfer, "player_id"],
+                    moves.loc[is_transfer, "移籍先"].map(short_name_to_id)))
+                player_moves.update(dict.fromkeys(moves.loc[is_retire, "player_id"]))
 
-                    # 1. チーム名を登録
-                    for team_id, new_name in st.session_state.season_update_team_names.items():
-                        cursor.execute("""
-                            INSERT OR REPLACE INTO team_names (team_id, season, team_name)
-                            VALUES (?, ?, ?)
-                        """, (team_id, new_season, new_name))
-
-                    # 2. 選手所属を登録（退団者以外）
-                    for player_id, info in st.session_state.season_update_player_moves.items():
-                        if info["status"] != "退団":
-                            cursor.execute("""
-                                INSERT OR REPLACE INTO player_teams (player_id, team_id, season)
-                                VALUES (?, ?, ?)
-                            """, (player_id, info["new_team_id"], new_season))
-
-                    conn.commit()
-                    conn.close()
+                try:
+                    result = rollover_season(
+                        new_season - 1, new_season, team_name_changes, player_moves)
+                    # 新シーズンに登録済みの半荘記録があれば集計テーブルに反映
+                    sync_derived_tables()
 
-                    st.success(f"✅ {new_season}シーズンのデータを登録しました！")
+                    st.success(
+                        f"✅ {new_season}シーズンのデータを登録しました！"
+                        f"（{result['teams']}チーム・{result['players']}選手、"
+                        f"移籍 {result['transferred']}名・退団 {result['retired']}名）")
 
                     # セッション状態をクリア
-                    st.session_state.season_update_team_names = {}
-                    st.session_state.season_update_player_moves = {}
+                    st.session_state.season_update_team_names.pop(new_season, None)
+                    st.session_state.season_update_player_moves.pop(new_season, None)
                     st.session_state.season_update_confirmed = True
 
                     st.balloons()
@@ -403,8 +302,6 @@ with tab3:
                     """)
 
                 except (sqlite3.Error, ValueError) as e:
-                    conn.rollback()
-                    conn.close()
                     st.error(f"❌ エラーが発生しました: {e}")
 
 # ========== サイドバー ==========
@@ -1,7 +1,11 @@
 import sqlite3
 import streamlit as st
 import pandas as pd
-from db import get_connection, show_sidebar_navigation
+from db import (
+    get_connection, is_manual_player_season,
+    rebuild_player_season_stats, REGULAR_TABLE_TYPE
+)
+from navigation import show_sidebar_navigation
 
 # 共通サイドバーナビゲーションを表示
 show_sidebar_navigation()
@@ -9,8 +13,9 @@ show_sidebar_navigation()
 st.title("📊 選手成績入力")
 
 st.markdown("""
-シーズンごとの選手成績を一括で入力できます。
-- 試合数、ポイント、順位回数、ペナルティを入力
+シーズンごとの選手成績を管理します。
+- 半荘記録があるシーズンは、試合数・ポイント・順位回数を半荘記録から自動集計（ペナルティのみ入力）
+- 半荘記録のない（または不完全な）シーズンは「手入力で管理」にして、すべての項目を入力
 - チームごとにグループ化表示
 - 既存データは自動的に表示されます
 """)
@@ -38,6 +43,33 @@ with col1:
 with col2:
     st.info(f"💡 {selected_season}シーズンに所属している選手の成績を入力できます")
 
+# ========== 集計方法 ==========
+# 手入力管理の行があるか、半荘記録がなければ手入力管理とみなす
+conn = get_connection()
+cursor = conn.cursor()
+stored_manual = is_manual_player_season(cursor, selected_season)
+cursor.execute("""
+    SELECT COUNT(*) FROM game_results WHERE season = ? AND table_type = ?
+""", (selected_season, REGULAR_TABLE_TYPE))
+game_rows = cursor.fetchone()[0]
+conn.close()
+
+manual_mode = st.toggle(
+    "手入力で管理（半荘記録から集計しない）",
+    value=stored_manual or game_rows == 0,
+    key=f"manual_override_{selected_season}",
+    help="半荘記録のないシーズンや、半荘記録が一部しか登録されていないシーズンはオンにしてください"
+)
+
+if manual_mode:
+    st.caption("✏️ 試合数・ポイント・順位回数・ペナルティをすべて手入力します")
+else:
+    st.caption(
+        f"🔄 試合数・ポイント・順位回数はレギュラーシーズンの半荘記録（{game_rows // 4}半荘）から自動集計されます。"
+        "ペナルティのみ入力してください")
+    if stored_manual:
+        st.warning("⚠️ 現在は手入力の成績が保存されています。保存すると半荘記録から再集計され、手入力の値は上書きされます")
+
 # ========== 選手一覧と成績入力 ==========
 st.markdown("---")
 st.subheader(f"🎯 {selected_season}シーズン 選手成績")
@@ -53,26 +85,52 @@ st.info("""
 conn = get_connection()
 cursor = conn.cursor()
 
-cursor.execute("""
+# 試合数・獲得ポイント・順位回数の取得元（手入力の保存値 / 半荘記録の集計）
+if manual_mode:
+    stats_query = """
+        SELECT player_id, games, points - COALESCE(penalty, 0) as earned,
+               rank_1st, rank_2nd, rank_3rd, rank_4th
+        FROM player_season_stats
+        WHERE season = ?
+    """
+    stats_params = (selected_season,)
+else:
+    stats_query = """
+        SELECT
+            player_id,
+            COUNT(*) as games,
+            SUM(points) as earned,
+            SUM(CASE WHEN rank = 1 THEN 1 ELSE 0 END) as rank_1st,
+            SUM(CASE WHEN rank = 2 THEN 1 ELSE 0 END) as rank_2nd,
+            SUM(CASE WHEN rank = 3 THEN 1 ELSE 0 END) as rank_3rd,
+            SUM(CASE WHEN rank = 4 THEN 1 ELSE 0 END) as rank_4th
+        FROM game_results
+        WHERE season = ? AND table_type = ?
+        GROUP BY player_id
+    """
+    stats_params = (selected_season, REGULAR_TABLE_TYPE)
+
+cursor.execute(f"""
     SELECT 
         p.player_id,
         p.player_name,
         pt.team_id,
         tn.team_name,
-        COALESCE(pss.games, 0) as games,
-        COALESCE(pss.points, 0) as points,
+        COALESCE(st.games, 0) as games,
+        ROUND(COALESCE(st.earned, 0) + COALESCE(pss.penalty, 0), 1) as points,
         COALESCE(pss.penalty, 0) as penalty,
-        COALESCE(pss.rank_1st, 0) as rank_1st,
-        COALESCE(pss.rank_2nd, 0) as rank_2nd,
-        COALESCE(pss.rank_3rd, 0) as rank_3rd,
-        COALESCE(pss.rank_4th, 0) as rank_4th
+        COALESCE(st.rank_1st, 0) as rank_1st,
+        COALESCE(st.rank_2nd, 0) as rank_2nd,
+        COALESCE(st.rank_3rd, 0) as rank_3rd,
+        COALESCE(st.rank_4th, 0) as rank_4th
     FROM player_teams pt
     JOIN players p ON pt.player_id = p.player_id
     JOIN team_names tn ON pt.team_id = tn.team_id AND pt.season = tn.season
     LEFT JOIN player_season_stats pss ON p.player_id = pss.player_id AND pss.season = ?
+    LEFT JOIN ({stats_query}) st ON p.player_id = st.player_id
     WHERE pt.season = ?
     ORDER BY tn.team_name, p.player_name
-""", (selected_season, selected_season))
+""", (selected_season,) + stats_params + (selected_season,))
 
 players_data = cursor.fetchall()
 conn.close()
@@ -86,11 +144,14 @@ df = pd.DataFrame(players_data, columns=[
     'player_id', 'player_name', 'team_id', 'team_name',
     'games', 'points', 'penalty', 'rank_1st', 'rank_2nd', 'rank_3rd', 'rank_4th'
 ])
+# 獲得ポイント（ペナルティ適用前）
+df['earned'] = df['points'] - df['penalty']
 
 # セッションステートの初期化
-if 'stats_data' not in st.session_state or st.session_state.get('stats_season') != selected_season:
+if 'stats_data' not in st.session_state or \
+        st.session_state.get('stats_season') != (selected_season, manual_mode):
     st.session_state.stats_data = df.to_dict('records')
-    st.session_state.stats_season = selected_season
+    st.session_state.stats_season = (selected_season, manual_mode)
 
 # チームごとにグループ化して表示
 teams = df['team_name'].unique()
@@ -117,9 +178,34 @@ for team_name in teams:
 
             cols[0].markdown(f"**{player['player_name']}**")
 
-            # 入力フィールド
             player_idx = st.session_state.stats_data.index(player)
 
+            if not manual_mode:
+                # 自動集計: ペナルティのみ入力し、最終ポイントは獲得ポイント + ペナルティ
+                penalty = cols[3].number_input(
+                    "ペナルティ",
+                    min_value=-500.0,
+                    max_value=0.0,
+                    value=float(player['penalty']),
+                    step=0.1,
+                    format="%.1f",
+                    key=f"penalty_{selected_season}_{player['player_id']}",
+                    label_visibility="collapsed",
+                    help="マイナス値で入力"
+                )
+                points = player['earned'] + penalty
+                cols[1].markdown(f"{player['games']}")
+                cols[2].markdown(f"{points:.1f}")
+                for col, rank_col in zip(cols[4:], ['rank_1st', 'rank_2nd', 'rank_3rd', 'rank_4th']):
+                    col.markdown(f"{player[rank_col]}")
+
+                st.session_state.stats_data[player_idx].update({
+                    'points': points,
+                    'penalty': penalty
+                })
+                continue
+
+            # 入力フィールド
             games = cols[1].number_input(
                 "試合数",
                 min_value=0,
@@ -211,24 +297,39 @@ with col1:
             cursor = conn.cursor()
 
             success_count = 0
-            for player_data in st.session_state.stats_data:
-                # INSERT OR REPLACE で既存データを更新
+            if manual_mode:
+                for player_data in st.session_state.stats_data:
+                    # INSERT OR REPLACE で既存データを更新（手入力管理として保存）
+                    cursor.execute("""
+                        INSERT OR REPLACE INTO player_season_stats 
+                        (player_id, season, games, points, penalty, rank_1st, rank_2nd, rank_3rd, rank_4th,
+                         manual_override)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 1)
+                    """, (
+                        player_data['player_id'],
+                        selected_season,
+                        player_data['games'],
+                        player_data['points'],
+                        player_data['penalty'],
+                        player_data['rank_1st'],
+                        player_data['rank_2nd'],
+                        player_data['rank_3rd'],
+                        player_data['rank_4th']
+                    ))
+                    success_count += 1
+            else:
+                # 自動集計: ペナルティのみ保存し、半荘記録から再集計
                 cursor.execute("""
-                    INSERT OR REPLACE INTO player_season_stats 
-                    (player_id, season, games, points, penalty, rank_1st, rank_2nd, rank_3rd, rank_4th)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    player_data['player_id'],
-                    selected_season,
-                    player_data['games'],
-                    player_data['points'],
-                    player_data['penalty'],
-                    player_data['rank_1st'],
-                    player_data['rank_2nd'],
-                    player_data['rank_3rd'],
-                    player_data['rank_4th']
-                ))
-                success_count += 1
+                    UPDATE player_season_stats SET manual_override = 0 WHERE season = ?
+                """, (selected_season,))
+                for player_data in st.session_state.stats_data:
+                    cursor.execute("""
+                        INSERT INTO player_season_stats (player_id, season, penalty)
+                        VALUES (?, ?, ?)
+                        ON CONFLICT (player_id, season) DO UPDATE SET penalty = excluded.penalty
+                    """, (player_data['player_id'], selected_season, player_data['penalty']))
+                    success_count += 1
+                rebuild_player_season_stats(conn, selected_season)
 
             conn.commit()
             conn.close()
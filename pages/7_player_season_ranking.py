@@ -1,13 +1,17 @@
 import sys
 import streamlit as st
 import pandas as pd
-import plotly.graph_objects as go
+from charts import ranking_bar_chart
 from db import (
     get_player_seasons,
     get_player_season_ranking,
     get_connection,
-    show_sidebar_navigation
+    format_duration,
+    get_cube_rollup,
+    get_players
 )
+from navigation import show_sidebar_navigation
+from tables import COLUMN_FORMATS, show_table
 sys.path.append("..")
 
 st.set_page_config(
@@ -44,35 +48,16 @@ col1, col2 = st.columns([2, 1])
 
 with col1:
     # 横棒グラフ（上位20名）
-    fig = go.Figure()
-
     display_df = season_df.head(20).sort_values("points", ascending=True)
 
-    for _, row in display_df.iterrows():
-        color = row["color"] if pd.notna(row["color"]) else "#888888"
-        fig.add_trace(go.Bar(
-            y=[row["player_name"]],
-            x=[row["points"]],
-            orientation="h",
-            marker_color=color,
-            name=row["player_name"],
-            text=f"{row['points']:+.1f}",
-            textposition="outside",
-            showlegend=False,
-            hovertemplate=f"<b>{row['player_name']}</b><br>" +
-                         f"{row['team_name']}<br>" +
-                         f"ポイント: {row['points']:+.1f}<br>" +
-                         f"試合数: {row['games']}<br>" +
-                         "<extra></extra>"
-        ))
-
-    fig.update_layout(
+    fig = ranking_bar_chart(
+        display_df, "player_name", "points",
         title=f"{selected_season}シーズン 選手別ポイント（上位20名）",
         xaxis_title="ポイント",
-        yaxis_title="",
+        color_col="color",
+        hover=((None, "team_name", None), ("ポイント", "points", "+.1f"), ("試合数", "games", "d")),
         height=600,
-        margin=dict(l=150, r=100, t=50, b=50),
-        xaxis=dict(zeroline=True, zerolinecolor="gray", zerolinewidth=2)
+        margin_left=150
     )
 
     st.plotly_chart(fig, width="stretch")
@@ -84,10 +69,9 @@ with col2:
     rank_df = season_df.head(
         10)[["rank", "player_name", "team_name", "points", "games"]].copy()
     rank_df.columns = ["順位", "選手名", "所属", "ポイント", "試合数"]
-    rank_df["ポイント"] = rank_df["ポイント"].apply(lambda x: f"{x:+.1f}")
     rank_df = rank_df.reset_index(drop=True)
 
-    st.dataframe(rank_df, hide_index=True, height=400)
+    show_table(rank_df, hide_index=True, height=400)
 
     # 統計情報
     st.markdown("### 📈 統計情報")
@@ -122,7 +106,6 @@ detail_df = filtered_df[["rank", "player_name", "team_name", "games", "points",
                          "rank_1st", "rank_2nd", "rank_3rd", "rank_4th"]].copy()
 detail_df.columns = ["順位", "選手名", "所属チーム",
                      "試合数", "ポイント", "1位", "2位", "3位", "4位"]
-detail_df["ポイント"] = detail_df["ポイント"].apply(lambda x: f"{x:+.1f}")
 
 # 平均順位を計算
 filtered_df['avg_rank'] = (
@@ -131,9 +114,9 @@ filtered_df['avg_rank'] = (
     filtered_df['rank_3rd'] * 3 +
     filtered_df['rank_4th'] * 4
 ) / filtered_df['games']
-detail_df["平均順位"] = filtered_df['avg_rank'].apply(lambda x: f"{x:.2f}")
+detail_df["平均順位"] = filtered_df['avg_rank']
 
-st.dataframe(
+show_table(
     detail_df,
     hide_index=True,
     column_config={
@@ -141,12 +124,12 @@ st.dataframe(
         "選手名": st.column_config.TextColumn(width="medium"),
         "所属チーム": st.column_config.TextColumn(width="medium"),
         "試合数": st.column_config.NumberColumn(width="small"),
-        "ポイント": st.column_config.TextColumn(width="small"),
+        "ポイント": st.column_config.NumberColumn(width="small", format=COLUMN_FORMATS["ポイント"]),
         "1位": st.column_config.NumberColumn(width="small"),
         "2位": st.column_config.NumberColumn(width="small"),
         "3位": st.column_config.NumberColumn(width="small"),
         "4位": st.column_config.NumberColumn(width="small"),
-        "平均順位": st.column_config.TextColumn(width="small"),
+        "平均順位": st.column_config.NumberColumn(width="small", format=COLUMN_FORMATS["平均順位"]),
     }
 )
 
@@ -170,27 +153,11 @@ cursor.execute("""
 game_count = cursor.fetchone()[0]
 
 if game_count > 0:
-    # 半荘記録から選手別月別成績を取得
-    query = """
-        SELECT 
-            strftime('%Y-%m', gr.game_date) as month,
-            gr.player_id,
-            p.player_name,
-            SUM(gr.points) as total_points,
-            COUNT(*) as games,
-            AVG(gr.rank) as avg_rank,
-            SUM(CASE WHEN gr.rank = 1 THEN 1 ELSE 0 END) as rank_1st,
-            SUM(CASE WHEN gr.rank = 2 THEN 1 ELSE 0 END) as rank_2nd,
-            SUM(CASE WHEN gr.rank = 3 THEN 1 ELSE 0 END) as rank_3rd,
-            SUM(CASE WHEN gr.rank = 4 THEN 1 ELSE 0 END) as rank_4th
-        FROM game_results gr
-        JOIN players p ON gr.player_id = p.player_id
-        WHERE gr.season = ?
-        GROUP BY month, gr.player_id, p.player_name
-        ORDER BY month, total_points DESC
-    """
-
-    df = pd.read_sql_query(query, conn, params=(selected_season,))
+    # 半荘記録から選手別月別成績を取得（集計キューブのロールアップ）
+    df = get_cube_rollup(['month', 'player_id'], season=selected_season, conn=conn)
+    df = df.merge(get_players()[['player_id', 'player_name']], on='player_id')
+    df = df.rename(columns={'points_sum': 'total_points'})
+    df = df.sort_values(['month', 'total_points'], ascending=[True, False])
     conn.close()
 
     if not df.empty:
@@ -199,38 +166,33 @@ if game_count > 0:
         st.markdown("### 月別ランキング（累積ポイント順）")
 
         for month in months:
-            with st.expander(f"📅 {month}", expanded=False):
-                month_df = df[df['month'] == month].copy()
-
-                # 累積ポイント順に並べる
-                month_df = month_df.sort_values(
-                    'total_points', ascending=False)
-                month_df.insert(0, '順位', range(1, len(month_df) + 1))
-
-                # 1位率を計算
-                month_df['first_rate'] = (
-                    month_df['rank_1st'] / month_df['games'] * 100).round(1)
-
-                # 表示用に整形
-                display_df = month_df[[
-                    '順位', 'player_name', 'total_points', 'games', 'avg_rank',
-                    'rank_1st', 'rank_2nd', 'rank_3rd', 'rank_4th', 'first_rate'
-                ]].copy()
-
-                display_df.columns = [
-                    '順位', '選手名', '累積pt', '対局数', '平均順位',
-                    '1位', '2位', '3位', '4位', '1位率(%)'
-                ]
-
-                display_df['累積pt'] = display_df['累積pt'].apply(
-                    lambda x: f"{x:+.1f}")
-                display_df['平均順位'] = display_df['平均順位'].apply(
-                    lambda x: f"{x:.2f}")
-                display_df['1位率(%)'] = display_df['1位率(%)'].apply(
-                    lambda x: f"{x:.1f}")
-
-                st.dataframe(display_df, width='stretch',
-                             hide_index=True, height=400)
+            month_expander = st.expander(f"📅 {month}", expanded=False, on_change="rerun")
+            if month_expander.open:
+                with month_expander:
+                    month_df = df[df['month'] == month].copy()
+
+                    # 累積ポイント順に並べる
+                    month_df = month_df.sort_values(
+                        'total_points', ascending=False)
+                    month_df.insert(0, '順位', range(1, len(month_df) + 1))
+
+                    # 1位率を計算
+                    month_df['first_rate'] = (
+                        month_df['rank_1st'] / month_df['games'] * 100).round(1)
+
+                    # 表示用に整形
+                    display_df = month_df[[
+                        '順位', 'player_name', 'total_points', 'games', 'avg_rank',
+                        'rank_1st', 'rank_2nd', 'rank_3rd', 'rank_4th', 'first_rate'
+                    ]].copy()
+
+                    display_df.columns = [
+                        '順位', '選手名', '累積pt', '対局数', '平均順位',
+                        '1位', '2位', '3位', '4位', '1位率(%)'
+                    ]
+
+                    show_table(display_df, width='stretch',
+                               hide_index=True, height=400)
     else:
         st.info(f"{selected_season}シーズンの半荘記録がありません。")
 else:
@@ -255,70 +217,46 @@ cursor.execute("""
 game_count = cursor.fetchone()[0]
 
 if game_count > 0:
-    # 席順別統計を取得
-    query = """
-        SELECT 
-            gr.seat_name,
-            gr.player_id,
-            p.player_name,
-            COUNT(*) as games,
-            SUM(gr.points) as total_points,
-            AVG(gr.points) as avg_points,
-            AVG(gr.rank) as avg_rank,
-            SUM(CASE WHEN gr.rank = 1 THEN 1 ELSE 0 END) as rank_1st,
-            SUM(CASE WHEN gr.rank = 2 THEN 1 ELSE 0 END) as rank_2nd,
-            SUM(CASE WHEN gr.rank = 3 THEN 1 ELSE 0 END) as rank_3rd,
-            SUM(CASE WHEN gr.rank = 4 THEN 1 ELSE 0 END) as rank_4th
-        FROM game_results gr
-        JOIN players p ON gr.player_id = p.player_id
-        WHERE gr.season = ?
-        GROUP BY gr.seat_name, gr.player_id, p.player_name
-        ORDER BY gr.seat_name, total_points DESC
-    """
-
-    seat_df = pd.read_sql_query(query, conn, params=(selected_season,))
+    # 席順別統計を取得（集計キューブのロールアップ）
+    seat_df = get_cube_rollup(['seat_name', 'player_id'], season=selected_season, conn=conn)
+    seat_df = seat_df.merge(get_players()[['player_id', 'player_name']], on='player_id')
+    seat_df = seat_df.rename(columns={'points_sum': 'total_points'})
+    seat_df = seat_df.sort_values(['seat_name', 'total_points'], ascending=[True, False])
 
     if not seat_df.empty:
         seats = ['東', '南', '西', '北']
 
         for seat in seats:
-            with st.expander(f"🧭 {seat}家", expanded=False):
-                seat_data = seat_df[seat_df['seat_name'] == seat].copy()
-
-                if not seat_data.empty:
-                    # 1位率を計算
-                    seat_data['first_rate'] = (
-                        seat_data['rank_1st'] / seat_data['games'] * 100).round(1)
-
-                    # 順位を追加
-                    seat_data = seat_data.sort_values(
-                        'total_points', ascending=False)
-                    seat_data.insert(0, '順位', range(1, len(seat_data) + 1))
-
-                    # 表示用に整形
-                    display_df = seat_data[[
-                        '順位', 'player_name', 'games', 'total_points', 'avg_points',
-                        'avg_rank', 'rank_1st', 'rank_2nd', 'rank_3rd', 'rank_4th', 'first_rate'
-                    ]].copy()
-
-                    display_df.columns = [
-                        '順位', '選手名', '対局数', '累積pt', '平均pt',
-                        '平均順位', '1位', '2位', '3位', '4位', '1位率(%)'
-                    ]
-
-                    display_df['累積pt'] = display_df['累積pt'].apply(
-                        lambda x: f"{x:+.1f}")
-                    display_df['平均pt'] = display_df['平均pt'].apply(
-                        lambda x: f"{x:+.1f}")
-                    display_df['平均順位'] = display_df['平均順位'].apply(
-                        lambda x: f"{x:.2f}")
-                    display_df['1位率(%)'] = display_df['1位率(%)'].apply(
-                        lambda x: f"{x:.1f}")
-
-                    st.dataframe(display_df, width='stretch',
-                                 hide_index=True, height=400)
-                else:
-                    st.info(f"{seat}家のデータがありません")
+            seat_expander = st.expander(f"🧭 {seat}家", expanded=False, on_change="rerun")
+            if seat_expander.open:
+                with seat_expander:
+                    seat_data = seat_df[seat_df['seat_name'] == seat].copy()
+
+                    if not seat_data.empty:
+                        # 1位率を計算
+                        seat_data['first_rate'] = (
+                            seat_data['rank_1st'] / seat_data['games'] * 100).round(1)
+
+                        # 順位を追加
+                        seat_data = seat_data.sort_values(
+                            'total_points', ascending=False)
+                        seat_data.insert(0, '順位', range(1, len(seat_data) + 1))
+
+                        # 表示用に整形
+                        display_df = seat_data[[
+                            '順位', 'player_name', 'games', 'total_points', 'avg_points',
+                            'avg_rank', 'rank_1st', 'rank_2nd', 'rank_3rd', 'rank_4th', 'first_rate'
+                        ]].copy()
+
+                        display_df.columns = [
+                            '順位', '選手名', '対局数', '累積pt', '平均pt',
+                            '平均順位', '1位', '2位', '3位', '4位', '1位率(%)'
+                        ]
+
+                        show_table(display_df, width='stretch',
+                                   hide_index=True, height=400)
+                    else:
+                        st.info(f"{seat}家のデータがありません")
     else:
         st.info(f"{selected_season}シーズンの席順別データがありません。")
 else:
@@ -338,11 +276,10 @@ query = """
         p.player_name,
         gr.game_date,
         gr.game_number,
-        gr.start_time,
-        gr.end_time
+        gr.duration_minutes as duration
     FROM game_results gr
     JOIN players p ON gr.player_id = p.player_id
-    WHERE gr.season = ? AND gr.start_time IS NOT NULL AND gr.end_time IS NOT NULL
+    WHERE gr.season = ? AND gr.duration_minutes IS NOT NULL
     ORDER BY gr.game_date, gr.game_number
 """
 
@@ -352,37 +289,28 @@ conn.close()
 if time_df.empty:
     st.info(f"{selected_season}シーズンの対局時間データがありません。「🎮 半荘記録入力」ページで開始・終了時間を記録してください。")
 else:
-    def calc_duration(row):
-        return calc_duration_minutes(row['start_time'], row['end_time'])
-
-    time_df['duration'] = time_df.apply(calc_duration, axis=1)
-    time_df = time_df[time_df['duration'].notna()]
-
-    if time_df.empty:
-        st.info(f"{selected_season}シーズンの有効な対局時間データがありません。")
-    else:
-        player_time_stats = time_df.groupby(['player_id', 'player_name']).agg(
-            games=('duration', 'count'),
-            avg_duration=('duration', 'mean'),
-            min_duration=('duration', 'min'),
-            max_duration=('duration', 'max')
-        ).reset_index()
+    player_time_stats = time_df.groupby(['player_id', 'player_name']).agg(
+        games=('duration', 'count'),
+        avg_duration=('duration', 'mean'),
+        min_duration=('duration', 'min'),
+        max_duration=('duration', 'max')
+    ).reset_index()
 
-        player_time_stats = player_time_stats.sort_values('avg_duration', ascending=True)
-        player_time_stats.insert(0, '順位', range(1, len(player_time_stats) + 1))
+    player_time_stats = player_time_stats.sort_values('avg_duration', ascending=True)
+    player_time_stats.insert(0, '順位', range(1, len(player_time_stats) + 1))
 
-        display_df = player_time_stats[[
-            '順位', 'player_name', 'games', 'avg_duration', 'min_duration', 'max_duration'
-        ]].copy()
-        display_df.columns = ['順位', '選手名', '対局数', '平均時間', '最短時間', '最長時間']
+    display_df = player_time_stats[[
+        '順位', 'player_name', 'games', 'avg_duration', 'min_duration', 'max_duration'
+    ]].copy()
+    display_df.columns = ['順位', '選手名', '対局数', '平均時間', '最短時間', '最長時間']
 
-        display_df['平均時間'] = display_df['平均時間'].apply(format_duration)
-        display_df['最短時間'] = display_df['最短時間'].apply(format_duration)
-        display_df['最長時間'] = display_df['最長時間'].apply(format_duration)
+    display_df['平均時間'] = display_df['平均時間'].apply(format_duration)
+    display_df['最短時間'] = display_df['最短時間'].apply(format_duration)
+    display_df['最長時間'] = display_df['最長時間'].apply(format_duration)
 
-        st.dataframe(display_df, width='stretch', hide_index=True)
+    show_table(display_df, width='stretch', hide_index=True)
 
-        st.info("💡 対局時間は「開始時間」から「終了時間」までの所要時間です。時間が記録されている対局のみが対象となります。")
+    st.info("💡 対局時間は「開始時間」から「終了時間」までの所要時間です。時間が記録されている対局のみが対象となります。")
 
 st.markdown("---")
 st.caption("※ データはデータベースに登録された情報を表示しています。")
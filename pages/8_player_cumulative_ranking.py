@@ -2,14 +2,17 @@ import sys
 import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
+from charts import ranking_bar_chart
 from db import (
+    format_duration,
     get_player_cumulative_stats,
     get_player_history,
     get_players,
     get_player_all_stats,
-    get_connection,
-    show_sidebar_navigation
+    get_connection
 )
+from navigation import show_sidebar_navigation
+from tables import COLUMN_FORMATS, show_table
 sys.path.append("..")
 
 st.set_page_config(
@@ -37,36 +40,18 @@ col1, col2 = st.columns([2, 1])
 
 with col1:
     # 累積ポイント棒グラフ（上位20名）
-    fig = go.Figure()
-
     display_df = cumulative_df.head(20).sort_values(
         "total_points", ascending=True)
 
-    for _, row in display_df.iterrows():
-        fig.add_trace(go.Bar(
-            y=[row["player_name"]],
-            x=[row["total_points"]],
-            orientation="h",
-            marker_color="#4A90E2",
-            name=row["player_name"],
-            text=f"{row['total_points']:+.1f}",
-            textposition="outside",
-            showlegend=False,
-            hovertemplate=f"<b>{row['player_name']}</b><br>" +
-                         f"{row['team_name']}<br>" +
-                         f"累積pt: {row['total_points']:+.1f}<br>" +
-                         f"参加: {int(row['seasons'])}シーズン<br>" +
-                         f"平均pt: {row['avg_points']:+.1f}<br>" +
-                         "<extra></extra>"
-        ))
-
-    fig.update_layout(
+    fig = ranking_bar_chart(
+        display_df, "player_name", "total_points",
         title="選手別 累積ポイント（上位20名）",
         xaxis_title="累積ポイント",
-        yaxis_title="",
+        color="#4A90E2",
+        hover=((None, "team_name", None), ("累積pt", "total_points", "+.1f"),
+               ("参加", "seasons", ".0f"), ("平均pt", "avg_points", "+.1f")),
         height=600,
-        margin=dict(l=150, r=100, t=50, b=50),
-        xaxis=dict(zeroline=True, zerolinecolor="gray", zerolinewidth=2)
+        margin_left=150
     )
 
     st.plotly_chart(fig)
@@ -78,10 +63,8 @@ with col2:
     display_df = cumulative_df.head(10)[["rank", "player_name", "team_name", "total_points",
                                          "seasons", "avg_points"]].copy()
     display_df.columns = ["順位", "選手名", "所属", "累積pt", "参加", "平均pt"]
-    display_df["累積pt"] = display_df["累積pt"].apply(lambda x: f"{x:+.1f}")
-    display_df["平均pt"] = display_df["平均pt"].apply(lambda x: f"{x:+.1f}")
 
-    st.dataframe(display_df, hide_index=True, height=400)
+    show_table(display_df, hide_index=True, height=400)
 
     # 統計情報
     st.markdown("### 📈 統計情報")
@@ -232,8 +215,6 @@ detail_df = filtered_df[["rank", "player_name", "team_name", "total_games", "tot
                          "seasons", "avg_points"]].copy()
 detail_df.columns = ["順位", "選手名", "所属", "試合数",
                      "累積pt", "1位", "2位", "3位", "4位", "参加", "平均pt"]
-detail_df["累積pt"] = detail_df["累積pt"].apply(lambda x: f"{x:+.1f}")
-detail_df["平均pt"] = detail_df["平均pt"].apply(lambda x: f"{x:+.1f}")
 
 # 平均順位を計算
 filtered_df['avg_rank'] = (
@@ -242,9 +223,9 @@ filtered_df['avg_rank'] = (
     filtered_df['total_3rd'] * 3 +
     filtered_df['total_4th'] * 4
 ) / filtered_df['total_games']
-detail_df["平均順位"] = filtered_df['avg_rank'].apply(lambda x: f"{x:.2f}")
+detail_df["平均順位"] = filtered_df['avg_rank']
 
-st.dataframe(
+show_table(
     detail_df,
     hide_index=True,
     column_config={
@@ -252,14 +233,14 @@ st.dataframe(
         "選手名": st.column_config.TextColumn(width="medium"),
         "所属": st.column_config.TextColumn(width="medium"),
         "試合数": st.column_config.NumberColumn(width="small"),
-        "累積pt": st.column_config.TextColumn(width="small"),
+        "累積pt": st.column_config.NumberColumn(width="small", format=COLUMN_FORMATS["累積pt"]),
         "1位": st.column_config.NumberColumn(width="small"),
         "2位": st.column_config.NumberColumn(width="small"),
         "3位": st.column_config.NumberColumn(width="small"),
         "4位": st.column_config.NumberColumn(width="small"),
         "参加": st.column_config.NumberColumn(width="small"),
-        "平均pt": st.column_config.TextColumn(width="small"),
-        "平均順位": st.column_config.TextColumn(width="small"),
+        "平均pt": st.column_config.NumberColumn(width="small", format=COLUMN_FORMATS["平均pt"]),
+        "平均順位": st.column_config.NumberColumn(width="small", format=COLUMN_FORMATS["平均順位"]),
     }
 )
 
@@ -306,8 +287,6 @@ if not player_history.empty:
                                       "rank_1st", "rank_2nd", "rank_3rd", "rank_4th"]].copy()
     history_display.columns = ["シーズン", "所属チーム",
                                "試合数", "ポイント", "1位", "2位", "3位", "4位"]
-    history_display["ポイント"] = history_display["ポイント"].apply(
-        lambda x: f"{x:+.1f}")
 
     # 平均順位を計算
     player_history['avg_rank'] = (
@@ -316,10 +295,9 @@ if not player_history.empty:
         player_history['rank_3rd'] * 3 +
         player_history['rank_4th'] * 4
     ) / player_history['games']
-    history_display["平均順位"] = player_history['avg_rank'].apply(
-        lambda x: f"{x:.2f}")
+    history_display["平均順位"] = player_history['avg_rank']
 
-    st.dataframe(history_display, hide_index=True)
+    show_table(history_display, hide_index=True)
 else:
     st.info(f"{selected_player_name} の成績データがありません。")
 
@@ -390,14 +368,7 @@ if game_count > 0:
                     '1位', '2位', '3位', '4位', '1位率(%)'
                 ]
 
-                display_df['累積pt'] = display_df['累積pt'].apply(
-                    lambda x: f"{x:+.1f}")
-                display_df['平均順位'] = display_df['平均順位'].apply(
-                    lambda x: f"{x:.2f}")
-                display_df['1位率(%)'] = display_df['1位率(%)'].apply(
-                    lambda x: f"{x:.1f}")
-
-                st.dataframe(display_df, hide_index=True, height=400)
+                show_table(display_df, hide_index=True, height=400)
     else:
         st.info("半荘記録がありません。")
 else:
@@ -467,17 +438,8 @@ if game_count > 0:
                         '平均順位', '1位', '2位', '3位', '4位', '1位率(%)'
                     ]
 
-                    display_df['累積pt'] = display_df['累積pt'].apply(
-                        lambda x: f"{x:+.1f}")
-                    display_df['平均pt'] = display_df['平均pt'].apply(
-                        lambda x: f"{x:+.1f}")
-                    display_df['平均順位'] = display_df['平均順位'].apply(
-                        lambda x: f"{x:.2f}")
-                    display_df['1位率(%)'] = display_df['1位率(%)'].apply(
-                        lambda x: f"{x:.1f}")
-
-                    st.dataframe(display_df, width='stretch',
-                                 hide_index=True, height=400)
+                    show_table(display_df, width='stretch',
+                               hide_index=True, height=400)
                 else:
                     st.info(f"{seat}家のデータがありません")
     else:
@@ -502,72 +464,45 @@ query = """
         p.player_name,
         gr.game_date,
         gr.game_number,
-        gr.start_time,
-        gr.end_time
+        gr.duration_minutes as duration
     FROM game_results gr
     JOIN players p ON gr.player_id = p.player_id
-    WHERE gr.start_time IS NOT NULL AND gr.end_time IS NOT NULL
+    WHERE gr.duration_minutes IS NOT NULL
 """
 
 time_df = pd.read_sql_query(query, conn)
 conn.close()
 
 if not time_df.empty:
-    # 対局時間（分）を計算
-    def calc_duration(game_row):
-        try:
-            start_parts = game_row['start_time'].split(':')
-            end_parts = game_row['end_time'].split(':')
-            start_minutes = int(start_parts[0]) * 60 + int(start_parts[1])
-            end_minutes = int(end_parts[0]) * 60 + int(end_parts[1])
-            duration = end_minutes - start_minutes
-            if duration < 0:
-                duration += 24 * 60  # 日付をまたぐ場合
-            return duration
-        except (ValueError, IndexError, TypeError):
-            return None
-
-    time_df['duration'] = time_df.apply(calc_duration, axis=1)
-    time_df = time_df[time_df['duration'].notna()]
-
-    if not time_df.empty:
-        # 選手別の統計
-        player_time_stats = time_df.groupby(['player_id', 'player_name']).agg({
-            'duration': ['count', 'mean', 'min', 'max']
-        }).reset_index()
-
-        player_time_stats.columns = [
-            'player_id', 'player_name', 'games', 'avg_duration', 'min_duration', 'max_duration']
-
-        # 平均時間でソート
-        player_time_stats = player_time_stats.sort_values(
-            'avg_duration', ascending=True)
-        player_time_stats.insert(0, '順位', range(1, len(player_time_stats) + 1))
-
-        # 時間を時:分形式に変換
-        def format_duration(minutes):
-            hours = int(minutes // 60)
-            mins = int(minutes % 60)
-            return f"{hours}:{mins:02d}"
-
-        # 表示用に整形
-        display_df = player_time_stats[[
-            '順位', 'player_name', 'games', 'avg_duration', 'min_duration', 'max_duration'
-        ]].copy()
-
-        display_df.columns = [
-            '順位', '選手名', '対局数', '平均時間', '最短時間', '最長時間'
-        ]
-
-        display_df['平均時間'] = display_df['平均時間'].apply(format_duration)
-        display_df['最短時間'] = display_df['最短時間'].apply(format_duration)
-        display_df['最長時間'] = display_df['最長時間'].apply(format_duration)
-
-        st.dataframe(display_df, width='stretch', hide_index=True)
-
-        st.info("💡 対局時間は「開始時間」から「終了時間」までの所要時間です。時間が記録されている対局のみが対象となります。")
-    else:
-        st.info("有効な対局時間データがありません。")
+    # 選手別の統計
+    player_time_stats = time_df.groupby(['player_id', 'player_name']).agg({
+        'duration': ['count', 'mean', 'min', 'max']
+    }).reset_index()
+
+    player_time_stats.columns = [
+        'player_id', 'player_name', 'games', 'avg_duration', 'min_duration', 'max_duration']
+
+    # 平均時間でソート
+    player_time_stats = player_time_stats.sort_values(
+        'avg_duration', ascending=True)
+    player_time_stats.insert(0, '順位', range(1, len(player_time_stats) + 1))
+
+    # 表示用に整形
+    display_df = player_time_stats[[
+        '順位', 'player_name', 'games', 'avg_duration', 'min_duration', 'max_duration'
+    ]].copy()
+
+    display_df.columns = [
+        '順位', '選手名', '対局数', '平均時間', '最短時間', '最長時間'
+    ]
+
+    display_df['平均時間'] = display_df['平均時間'].apply(format_duration)
+    display_df['最短時間'] = display_df['最短時間'].apply(format_duration)
+    display_df['最長時間'] = display_df['最長時間'].apply(format_duration)
+
+    show_table(display_df, width='stretch', hide_index=True)
+
+    st.info("💡 対局時間は「開始時間」から「終了時間」までの所要時間です。時間が記録されている対局のみが対象となります。")
 else:
     st.info("対局時間データがありません。「🎮 半荘記録入力」ページで開始・終了時間を記録してください。")
 
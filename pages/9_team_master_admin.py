@@ -1,7 +1,8 @@
 import sys
 import sqlite3
 import streamlit as st
-from db import get_connection, get_teams, show_sidebar_navigation
+from db import get_connection, get_teams
+from navigation import show_sidebar_navigation
 sys.path.append("..")
 
 st.set_page_config(
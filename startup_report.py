@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+起動時間レポート
+モジュールごとのコールドスタート（新しい Python プロセスでの import）時間を計測します
+
+使い方:
+    python startup_report.py                  # 既定の対象（アプリ共通モジュールと CLI スクリプト）
+    python startup_report.py db charts        # 指定したモジュールのみ
+    python startup_report.py --runs 5         # 5回計測して最小値を表示
+
+各対象を `python -X importtime -c "import <対象>"` で別プロセスとして読み込み、
+対象自体の読み込み時間と、その中で読み込まれた重いライブラリ（Streamlit・pandas など）の
+時間を表示します。"-" はそのライブラリが読み込まれなかったことを表します。
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+import unicodedata
+
+# 既定の計測対象（画面共通のモジュールと CLI スクリプト）
+DEFAULT_TARGETS = [
+    "db", "navigation", "tables", "charts", "inference",
+    "init_db", "import_results", "recalculate_ratings",
+]
+
+# 読み込みの有無・時間を個別に表示するライブラリ
+HEAVY_PACKAGES = ["streamlit", "pandas", "numpy", "plotly", "scipy"]
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def measure_import(module):
+    """
+    新しいプロセスで module を import し、読み込み時間を計測
+    Returns:
+        {"wall": プロセス全体の秒数, "total": module の累積秒数, パッケージ名: 累積秒数 ...}
+    """
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT_DIR, capture_output=True, text=True
+    )
+    wall = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(f"{module} の読み込みに失敗しました\n{result.stderr.strip().splitlines()[-1]}")
+
+    # 行の形式: "import time: <self [us]> | <cumulative [us]> | <インデント付きモジュール名>"
+    timings = {"wall": wall}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|", 2)
+        if not cumulative.strip().isdigit():
+            continue  # 見出し行
+        name = name.strip()
+        if name == module:
+            timings["total"] = int(cumulative) / 1e6
+        elif name in HEAVY_PACKAGES and name not in timings:
+            timings[name] = int(cumulative) / 1e6
+    return timings
+
+
+def measure(module, runs):
+    """runs 回計測して項目ごとの最小値を返す（OS のキャッシュ等によるぶれを除く）"""
+    results = [measure_import(module) for _ in range(runs)]
+    keys = set().union(*results)
+    return {key: min(r[key] for r in results if key in r) for key in keys}
+
+
+def _pad(text, width):
+    """全角文字を2桁として width 桁に左詰め"""
+    used = sum(2 if unicodedata.east_asian_width(c) in "WF" else 1 for c in text)
+    return text + " " * max(width - used, 0)
+
+
+def print_report(rows):
+    """計測結果を表形式で表示"""
+    header = ["対象", "プロセス", "import"] + HEAVY_PACKAGES
+    widths = [20] + [10] * (len(header) - 1)
+    print("  ".join(_pad(h, w) for h, w in zip(header, widths)))
+    print("-" * (sum(widths) + 2 * (len(widths) - 1)))
+    for module, timings in rows:
+        cells = [module, f"{timings['wall']:.3f}s", f"{timings.get('total', 0):.3f}s"]
+        cells += [f"{timings[p]:.3f}s" if p in timings else "-" for p in HEAVY_PACKAGES]
+        print("  ".join(_pad(c, w) for c, w in zip(cells, widths)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="モジュールごとのコールドスタート時間を計測")
+    parser.add_argument("targets", nargs="*", default=DEFAULT_TARGETS, help="計測するモジュール名")
+    parser.add_argument("--runs", type=int, default=3, help="計測回数（最小値を表示）")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print(f"⏱️ 起動時間レポート（{args.runs}回計測の最小値）")
+    print("=" * 60)
+
+    rows = []
+    for module in args.targets:
+        try:
+            rows.append((module, measure(module, args.runs)))
+        except RuntimeError as e:
+            print(f"❌ {e}")
+    print_report(rows)
+
+    ui_free = [module for module, timings in rows if "streamlit" not in timings]
+    if ui_free:
+        print(f"\n✓ Streamlit なしで読み込めるモジュール: {', '.join(ui_free)}")
+
+
+if __name__ == "__main__":
+    main()
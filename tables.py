@@ -0,0 +1,63 @@
+"""
+表示用テーブルモジュール
+
+ランキング・分析ページの表を共通の書式で表示する。
+数値列は文字列に変換せず、st.column_config の書式（printf 形式）で
+符号・小数桁・単位を指定するため、表の上で数値として並べ替えできる。
+"""
+
+import streamlit as st
+
+# よく使う書式
+SIGNED_1 = "%+.1f"     # ポイント（符号付き・小数1桁）
+SIGNED_2 = "%+.2f"
+DECIMAL_1 = "%.1f"
+DECIMAL_2 = "%.2f"
+DECIMAL_3 = "%.3f"
+
+# 列名ごとの既定の書式（各ページで共通の列名を使う）
+COLUMN_FORMATS = {
+    "ポイント": SIGNED_1,
+    "累積pt": SIGNED_1,
+    "平均pt": SIGNED_1,
+    "累積pt差": SIGNED_1,
+    "平均pt差": SIGNED_1,
+    "最終ポイント": SIGNED_1,
+    "獲得ポイント": SIGNED_1,
+    "ペナルティ": DECIMAL_1,
+    "平均順位": DECIMAL_2,
+    "1位率(%)": DECIMAL_1,
+    "レート": DECIMAL_1,
+    "対局前": DECIMAL_1,
+    "対局後": DECIMAL_1,
+    "変動Δ": SIGNED_1,
+    "標準偏差(分)": DECIMAL_1,
+}
+
+
+def number_column_config(columns, formats=None):
+    """
+    列名から st.column_config の NumberColumn 設定を作成
+    Args:
+        columns: 表の列名
+        formats: {列名: 書式} で既定の書式を上書き・追加
+    """
+    column_formats = {**COLUMN_FORMATS, **(formats or {})}
+    return {
+        column: st.column_config.NumberColumn(format=column_formats[column])
+        for column in columns
+        if column in column_formats
+    }
+
+
+def show_table(df, formats=None, column_config=None, **kwargs):
+    """
+    数値列に書式を設定して st.dataframe で表示
+    Args:
+        formats: {列名: 書式} で既定の書式（COLUMN_FORMATS）を上書き・追加
+        column_config: 書式以外の列設定（NumberColumn の設定より優先）
+        kwargs: st.dataframe にそのまま渡す（width, hide_index, height など）
+    """
+    config = number_column_config(df.columns, formats)
+    config.update(column_config or {})
+    return st.dataframe(df, column_config=config, **kwargs)
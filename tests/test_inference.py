@@ -0,0 +1,59 @@
+"""
+inference.py の検定が、席による差がないときに有意水準どおりの偽陽性率になるかを確認する
+1対局で各席・各順位が1回ずつ現れ、素点の合計が0になる半荘記録を合成して検定する
+"""
+
+import numpy as np
+import pytest
+
+from inference import bootstrap_group_means, permutation_chi_square_test, permutation_test_groups
+
+SEATS = np.array(['東', '南', '西', '北'])
+LEAGUES = 200
+GAMES = 400
+N_PERM = 199
+
+
+def _simulate_league(rng, games=GAMES):
+    """席による差のない1リーグ分の半荘記録（素点、着順、席、対局ID）"""
+    raw = rng.normal(0, 30, size=(games, 4))
+    points = raw - raw.mean(axis=1, keepdims=True)
+    ranks = (-points).argsort(axis=1).argsort(axis=1) + 1
+    return points.ravel(), ranks.ravel(), np.tile(SEATS, games), np.repeat(np.arange(games), 4)
+
+
+def _false_positive_rate(test):
+    rng = np.random.default_rng(2024)
+    hits = 0
+    for i in range(LEAGUES):
+        points, ranks, seats, game_ids = _simulate_league(rng)
+        hits += test(points, ranks, seats, game_ids, i) < 0.05
+    return hits / LEAGUES
+
+
+@pytest.mark.parametrize("test", [
+    lambda points, ranks, seats, game_ids, seed: permutation_test_groups(
+        points, seats, n_perm=N_PERM, seed=seed, blocks=game_ids)['p_value'],
+    lambda points, ranks, seats, game_ids, seed: permutation_chi_square_test(
+        seats, ranks, blocks=game_ids, n_perm=N_PERM, seed=seed)['p_value'],
+], ids=["permutation", "chi_square"])
+def test_no_seat_effect_false_positive_rate(test):
+    """席による差がなければ、p < 0.05 となる割合は 5% 前後（200リーグで ±3.5%程度）"""
+    assert 0.01 <= _false_positive_rate(test) <= 0.09
+
+
+def test_shuffle_handles_incomplete_games():
+    """4人そろっていない対局が混ざっていても、対局内の並べ替えで検定できる"""
+    points, ranks, seats, game_ids = _simulate_league(np.random.default_rng(0), games=50)
+    result = permutation_test_groups(points[:-1], seats[:-1], n_perm=N_PERM, blocks=game_ids[:-1])
+    assert 0 < result['p_value'] <= 1
+
+
+def test_bootstrap_resamples_whole_games():
+    """対局単位のブートストラップは、席別平均を信頼区間に含む"""
+    points, _, seats, game_ids = _simulate_league(np.random.default_rng(1))
+    result = bootstrap_group_means(points, seats, n_boot=500, blocks=game_ids)
+    for seat in SEATS:
+        mean, lower, upper = result[seat]
+        assert mean == pytest.approx(points[seats == seat].mean())
+        assert lower <= mean <= upper
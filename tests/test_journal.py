@@ -0,0 +1,69 @@
+"""
+変更ジャーナル（change_journal）が半荘記録の保存を繰り返しても増え続けないことを確認する
+同梱のデータベースをコピーして使う
+"""
+
+import shutil
+from pathlib import Path
+
+import pytest
+
+import db
+
+DB_SOURCE = Path(__file__).resolve().parent.parent / "data" / "mleague.db"
+
+
+@pytest.fixture
+def league_db(tmp_path, monkeypatch):
+    path = tmp_path / "mleague.db"
+    shutil.copy(DB_SOURCE, path)
+    monkeypatch.setattr(db, "DB_PATH", str(path))
+    return path
+
+
+def _journal_size():
+    conn = db.get_connection()
+    size = conn.execute("SELECT COUNT(*) FROM change_journal").fetchone()[0]
+    conn.close()
+    return size
+
+
+def _entries(season):
+    """シーズンの所属選手4人で、素点合計0の1対局分"""
+    conn = db.get_connection()
+    players = [row[0] for row in conn.execute(
+        "SELECT player_id FROM player_teams WHERE season = ? ORDER BY player_id LIMIT 4", (season,))]
+    conn.close()
+    points = [45.0, 5.0, -15.0, -35.0]
+    return [
+        {'seat': seat, 'player_id': player_id, 'points': point, 'rank': rank}
+        for rank, (seat, player_id, point) in enumerate(zip(['東', '南', '西', '北'], players, points), 1)
+    ]
+
+
+def test_journal_stays_bounded(league_db):
+    """対局を保存し続けても、変更ジャーナルはテーブル・シーズンごとの最新の記録程度に収まる"""
+    season = 2018
+    entries = _entries(season)
+    sizes = []
+    for game_number in range(1, 31):
+        status = db.record_game(season, "2019-06-01", "レギュラー", game_number, entries, "19:00", "20:30")
+        assert status == 'inserted'
+        sizes.append(_journal_size())
+
+    assert max(sizes) == sizes[0]
+    assert sizes[-1] <= 10
+
+
+def test_versions_move_only_on_changes(league_db):
+    """保存のたびにバージョンが進み、同じ内容の再送信では進まない（圧縮後もキャッシュキーとして使える）"""
+    season = 2018
+    entries = _entries(season)
+    db.record_game(season, "2019-06-01", "レギュラー", 1, entries)
+    first = db.get_table_versions("game_results")[season]
+
+    assert db.record_game(season, "2019-06-01", "レギュラー", 1, entries) == 'unchanged'
+    assert db.get_table_versions("game_results")[season] == first
+
+    db.record_game(season, "2019-06-01", "レギュラー", 2, entries)
+    assert db.get_table_versions("game_results")[season] > first